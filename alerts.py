@@ -0,0 +1,281 @@
+import bisect
+import collections
+import time
+
+import numpy as np
+
+import metrics
+
+# ==========================================
+# [조건 알림] 종목별/관심종목 전체 규칙을 시세가 들어올 때마다 검사 -> 카카오 알림 또는 주문
+#   - 모든 조건을 "오늘 가격/등락률/누적 거래량이 기준값 이상(이하)" 으로 바꿔서 평가 계획을 만듦
+#       price      : 가격 그대로
+#       change_pct : 등락률 그대로 (전일 대비 %)
+#       rsi        : RSI(14) 는 오늘 가격에 대해 단조 증가 -> 목표 RSI 가 되는 가격을 풀어서 가격 기준으로
+#       ma_cross   : MA(fast) - MA(slow) 도 오늘 가격의 1차식 -> 교차 가격 (fast=1 이면 가격 vs 이동평균)
+#       vol_ratio  : 오늘 거래량 / 5일 평균(오늘 포함) x 100 도 거래량에 단조 증가 -> 거래량 기준으로
+#     (RSI/거래량 비율/MA 는 analyze_market_signal 과 같은 정의, 이력은 어제까지 일봉)
+#   - 종목 x (값 종류, 방향) 마다 기준값 정렬 목록 -> 틱마다 이전 값과 현재 값 사이를
+#     이분 탐색해서 새로 넘은 규칙만 꺼냄 (규칙 수와 무관하게 O(log n + 발생 수))
+#   - 넘는 순간에만 발생 (엣지) -> 조건이 풀렸다가 다시 넘어야 재발생
+#   - debounce_sec: 조건이 그 시간 동안 유지돼야 발생 / cooldown_sec: 같은 규칙/종목 재발생 최소 간격
+#   - 발생한 이벤트는 돌려주기만 함 (알림/주문 실행은 engine.py)
+# ==========================================
+KINDS = {
+    "price": "가격",
+    "change_pct": "등락률(%)",
+    "rsi": "RSI(14)",
+    "vol_ratio": "거래량 비율(%)",
+    "ma_cross": "이동평균 교차",
+}
+OPS = {"above": "이상", "below": "이하"}
+ACTIONS = {"notify": "카카오 알림", "buy": "매수 주문", "sell": "매도 주문"}
+HISTORY_KINDS = ("rsi", "vol_ratio", "ma_cross") # 일봉 이력이 필요한 조건
+FIELDS = ("price", "change", "volume")
+RSI_N = 14
+VOL_N = 5
+HISTORY_DAYS = 180 # 일봉 조회 일수 (달력 기준, MA120 까지)
+DEFAULT_COOLDOWN_SEC = 300.0
+
+# 평가 계획 한 칸: 기준값 / 규칙 / 값 종류 / 방향
+Trigger = collections.namedtuple("Trigger", ["threshold", "rule", "field", "op"])
+
+# -----------------------------------------------------------
+# [규칙 검사] 화면/저장 전에 기본값 채우고 잘못된 값은 ValueError
+# -----------------------------------------------------------
+def normalize_rule(rule):
+    rule = dict(rule)
+    if rule.get("kind") not in KINDS: raise ValueError(f"알 수 없는 조건: {rule.get('kind')}")
+    if rule.get("op") not in OPS: raise ValueError(f"알 수 없는 방향: {rule.get('op')}")
+    rule.setdefault("action", "notify")
+    if rule["action"] not in ACTIONS: raise ValueError(f"알 수 없는 동작: {rule['action']}")
+    rule["code"] = rule.get("code") or None
+    rule["value"] = float(rule["value"])
+    rule["qty"] = int(rule.get("qty") or 0)
+    rule["debounce_sec"] = float(rule.get("debounce_sec") or 0)
+    cooldown = rule.get("cooldown_sec")
+    rule["cooldown_sec"] = DEFAULT_COOLDOWN_SEC if cooldown is None else float(cooldown)
+    rule["enabled"] = bool(rule.get("enabled", True))
+
+    kind, value = rule["kind"], rule["value"]
+    if kind == "price" and value <= 0: raise ValueError("가격은 0 보다 커야 합니다")
+    if kind == "rsi" and not 0 < value < 100: raise ValueError("RSI 는 0~100 사이")
+    if kind == "vol_ratio":
+        # 오늘 거래량이 5일 평균에 포함되므로 비율은 500% 를 넘을 수 없음
+        if rule["op"] != "above": raise ValueError("거래량 비율은 '이상' 만 가능합니다 (누적 거래량은 줄지 않음)")
+        if not 0 < value < 100 * VOL_N: raise ValueError(f"거래량 비율은 0~{100 * VOL_N}% 사이")
+    if kind == "ma_cross":
+        rule["fast"], rule["slow"] = int(rule.get("fast") or 5), int(rule.get("slow") or 20)
+        if not 1 <= rule["fast"] < rule["slow"]: raise ValueError("이동평균은 fast < slow (fast=1 은 현재가)")
+    else:
+        rule["fast"] = rule["slow"] = None
+    if rule["action"] != "notify" and rule["qty"] <= 0: raise ValueError("주문 수량을 입력하세요")
+    return rule
+
+def describe_rule(rule):
+    kind, value, op = rule["kind"], rule["value"], OPS[rule["op"]]
+    if kind == "price": return f"가격 {value:,.0f}원 {op}"
+    if kind == "change_pct": return f"등락률 {value:+.2f}% {op}"
+    if kind == "rsi": return f"RSI({RSI_N}) {value:g} {op}"
+    if kind == "vol_ratio": return f"거래량 {VOL_N}일 평균 대비 {value:g}% {op}"
+    fast = "현재가" if rule["fast"] == 1 else f"MA{rule['fast']}"
+    cross = "상향 돌파" if rule["op"] == "above" else "하향 돌파"
+    return f"{fast} / MA{rule['slow']} {cross}"
+
+def format_event(event, name=None):
+    rule = event["rule"]
+    title = rule.get("name") or describe_rule(rule)
+    return f"[알림] {name or event['code']} {title}\n현재가: {event['price']:,}원"
+
+# -----------------------------------------------------------
+# [기준값 계산] 어제까지 종가/거래량 -> (값 종류, 기준값), 못 구하면 None
+# -----------------------------------------------------------
+def history_from_daily(df, today):
+    # 오늘 행(장중 일봉)은 틱 값으로 대신하므로 제외
+    if df is None or df.empty: return np.empty(0), np.empty(0)
+    df = df[df['Date'].dt.date < today]
+    return df['Close'].to_numpy(dtype=float), df['Volume'].to_numpy(dtype=float)
+
+def rsi_price(closes, target, n=RSI_N):
+    # 오늘 가격 p 를 넣은 RSI(n) 가 target 이 되는 p (단순평균 RSI, indicators.rsi 와 같은 정의)
+    if len(closes) < n: return None
+    delta = np.diff(closes[-n:])
+    gain, loss = delta[delta > 0].sum(), -delta[delta < 0].sum()
+    last, q = closes[-1], target / 100.0
+    if gain + loss > 0 and q >= gain / (gain + loss):
+        return last + (q * (gain + loss) - gain) / (1 - q) # p >= 어제 종가: 오늘 상승분이 gain 에 더해짐
+    return last - (gain / q - gain - loss) # p < 어제 종가: 오늘 하락분이 loss 에 더해짐
+
+def ma_cross_price(closes, fast, slow):
+    # (fast-1 일 합 + p)/fast = (slow-1 일 합 + p)/slow 가 되는 p
+    if len(closes) < slow - 1: return None
+    fast_sum = closes[len(closes) - (fast - 1):].sum() if fast > 1 else 0.0
+    slow_sum = closes[len(closes) - (slow - 1):].sum()
+    return (slow_sum / slow - fast_sum / fast) / (1.0 / fast - 1.0 / slow)
+
+def vol_ratio_volume(volumes, ratio, n=VOL_N):
+    # v / ((n-1 일 합 + v)/n) x 100 = ratio 가 되는 오늘 누적 거래량 v
+    if len(volumes) < n - 1: return None
+    prev_sum = volumes[len(volumes) - (n - 1):].sum()
+    return ratio * prev_sum / (100.0 * n - ratio)
+
+def rule_threshold(rule, history=None):
+    kind, value = rule["kind"], rule["value"]
+    if kind == "price": return "price", value
+    if kind == "change_pct": return "change", value
+    closes, volumes = history if history is not None else (np.empty(0), np.empty(0))
+    if kind == "rsi": field, threshold = "price", rsi_price(closes, value)
+    elif kind == "ma_cross": field, threshold = "price", ma_cross_price(closes, rule["fast"], rule["slow"])
+    else: field, threshold = "volume", vol_ratio_volume(volumes, value)
+    if threshold is None or not np.isfinite(threshold): return None
+    if threshold <= 0: # 어떤 가격/거래량이어도 만족(이상) 또는 불가능(이하)
+        return (field, 0.0) if rule["op"] == "above" else None
+    return field, float(threshold)
+
+def _satisfied(value, trigger):
+    return value >= trigger.threshold if trigger.op == "above" else value <= trigger.threshold
+
+# -----------------------------------------------------------
+# [평가기] 규칙/이력을 받아 평가 계획을 만들고 시세마다 발생 이벤트를 돌려줌
+#   엔진 스레드 하나에서만 호출 (잠금 없음)
+# -----------------------------------------------------------
+class AlertEngine:
+    def __init__(self):
+        self.rules = []
+        self.watchlist = []
+        self.history = {} # 종목 -> (어제까지 종가, 거래량)
+        self.plan = {} # 종목 -> {(값 종류, 방향): (기준값 목록, Trigger 목록)} 기준값 순 정렬
+        self.compiled = set() # (규칙 id, 종목) - 다시 만들 때 새로 생긴 규칙 구분
+        self.fresh = {} # 종목 -> 새로 생긴 Trigger (다음 시세에서 현재 상태로 바로 판단)
+        self.last = {} # 종목 -> {값 종류: 마지막 값}
+        self.pending = {} # 종목 -> {규칙 id: (Trigger, 조건 충족 시작 시각)} - debounce 대기
+        self.last_fired = {} # (규칙 id, 종목) -> 마지막 발생 시각
+        self.skipped = {} # (규칙 id, 종목) -> 기준값을 못 구한 이유
+        self.trade_date = None
+        self.fired = 0
+
+    def roll(self, trade_date):
+        # 날짜가 바뀌면 이력 기반 기준값과 마지막 값/대기/재발생 기록을 새로
+        if trade_date == self.trade_date: return
+        self.trade_date = trade_date
+        self.history, self.last, self.pending, self.last_fired = {}, {}, {}, {}
+        self.compiled = set()
+
+    def seed_fired(self, rows):
+        # 재시작해도 오늘 이미 보낸 알림은 cooldown 적용 (alert_log)
+        for row in rows:
+            key = (row["rule_id"], row["code"])
+            self.last_fired[key] = max(self.last_fired.get(key, 0.0), row["ts"])
+
+    def set_rules(self, rules, watchlist):
+        self.rules = [r for r in rules if r.get("enabled", True)]
+        self.watchlist = list(watchlist)
+
+    def _rule_codes(self):
+        for rule in self.rules:
+            for code in ([rule["code"]] if rule["code"] else self.watchlist):
+                yield rule, code
+
+    def codes(self):
+        return {code for _, code in self._rule_codes()}
+
+    def history_codes(self):
+        # 일봉 이력이 필요한데 아직 없는 종목
+        return sorted({code for rule, code in self._rule_codes()
+                       if rule["kind"] in HISTORY_KINDS and code not in self.history})
+
+    def set_history(self, code, closes, volumes):
+        self.history[code] = (np.asarray(closes, dtype=float), np.asarray(volumes, dtype=float))
+
+    def compile(self):
+        triggers, skipped, compiled = {}, {}, set()
+        for rule, code in self._rule_codes():
+            key = (rule["id"], code)
+            found = rule_threshold(rule, self.history.get(code))
+            if found is None:
+                skipped[key] = "일봉 이력 부족 또는 도달할 수 없는 값"
+                continue
+            field, threshold = found
+            triggers.setdefault(code, {}).setdefault((field, rule["op"]), []).append(
+                Trigger(threshold, rule, field, rule["op"]))
+            compiled.add(key)
+
+        plan, fresh = {}, {}
+        for code, groups in triggers.items():
+            plan[code] = {}
+            for side, items in groups.items():
+                items.sort(key=lambda t: t.threshold)
+                plan[code][side] = ([t.threshold for t in items], items)
+                new = [t for t in items if (t.rule["id"], code) not in self.compiled]
+                if new: fresh.setdefault(code, []).extend(new)
+        ids = {rule["id"] for rule in self.rules}
+        for code, waiting in self.pending.items():
+            for rule_id in [r for r in waiting if r not in ids]: del waiting[rule_id]
+        self.plan, self.fresh, self.compiled, self.skipped = plan, fresh, compiled, skipped
+        return len(compiled)
+
+    # -----------------------------------------------------------
+    # [시세 평가] 이전 값 -> 현재 값 사이에서 새로 넘은 기준값만 이분 탐색
+    # -----------------------------------------------------------
+    def on_quote(self, code, price, change=None, volume=None, now=None):
+        plan = self.plan.get(code)
+        if plan is None: return []
+        now = time.time() if now is None else now
+        last = self.last.setdefault(code, {})
+        hits = []
+        for field, value in zip(FIELDS, (price, change, volume)):
+            if value is None: continue
+            prev = last.get(field)
+            last[field] = value
+            up = plan.get((field, "above"))
+            if up and (prev is None or value > prev): # 기준값 t: prev < t <= value
+                keys, items = up
+                lo = 0 if prev is None else bisect.bisect_right(keys, prev)
+                hits += items[lo:bisect.bisect_right(keys, value)]
+            down = plan.get((field, "below"))
+            if down and (prev is None or value < prev): # 기준값 t: value <= t < prev
+                keys, items = down
+                hi = len(keys) if prev is None else bisect.bisect_left(keys, prev)
+                hits += items[bisect.bisect_left(keys, value):hi]
+        fresh = self.fresh.pop(code, None)
+        if fresh: # 규칙이 새로 생겼을 때 이미 조건을 만족하고 있으면 바로 발생
+            hits += [t for t in fresh if t.field in last and _satisfied(last[t.field], t) and t not in hits]
+
+        events = []
+        waiting = self.pending.get(code)
+        for trigger in hits:
+            if trigger.rule["debounce_sec"] > 0:
+                waiting = self.pending.setdefault(code, {})
+                waiting.setdefault(trigger.rule["id"], (trigger, now))
+            else:
+                self._fire(trigger, code, price, now, events)
+        if waiting:
+            for rule_id, (trigger, since) in list(waiting.items()):
+                if not _satisfied(last.get(trigger.field, 0), trigger):
+                    del waiting[rule_id] # 유지 시간 전에 조건이 풀림
+                elif now - since >= trigger.rule["debounce_sec"]:
+                    del waiting[rule_id]
+                    self._fire(trigger, code, price, now, events)
+        return events
+
+    def _fire(self, trigger, code, price, now, events):
+        rule = trigger.rule
+        key = (rule["id"], code)
+        if now - self.last_fired.get(key, -1e18) < rule["cooldown_sec"]:
+            metrics.inc("alerts_suppressed_total", kind=rule["kind"])
+            return
+        self.last_fired[key] = now
+        self.fired += 1
+        metrics.inc("alerts_fired_total", kind=rule["kind"], action=rule["action"])
+        events.append({"rule": rule, "code": code, "price": price, "threshold": trigger.threshold, "ts": now})
+
+    def status(self):
+        return {
+            "rules": len(self.rules),
+            "codes": len(self.plan),
+            "triggers": len(self.compiled),
+            "skipped": len(self.skipped),
+            "pending": sum(len(w) for w in self.pending.values()),
+            "fired": self.fired,
+            "trade_date": self.trade_date,
+        }
@@ -0,0 +1,49 @@
+import os
+import sys
+
+# ==========================================
+# [설정 읽기] 시크릿 -> config.py 순서 (화면/엔진/스크립트 공용)
+#   - Streamlit 화면에서는 st.secrets (이미 import 된 경우에만 사용)
+#   - 그 밖의 프로세스는 .streamlit/secrets.toml 을 직접 읽음 -> streamlit 을 import 하지 않음
+#   - 둘 다 없으면 config.py
+# ==========================================
+SECRETS_PATHS = (
+    os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+    os.path.join(".streamlit", "secrets.toml"), # 나중 파일이 우선 (streamlit 과 같음)
+)
+_MISSING = object()
+_secrets = None
+
+def _load_secrets():
+    global _secrets
+    if _secrets is None:
+        secrets = {}
+        try:
+            import tomllib
+        except ImportError: # 3.10 이하
+            tomllib = None
+        for path in SECRETS_PATHS:
+            if tomllib and os.path.exists(path):
+                with open(path, "rb") as f:
+                    secrets.update(tomllib.load(f))
+        _secrets = secrets
+    return _secrets
+
+def get_config(key, default=_MISSING):
+    st = sys.modules.get("streamlit")
+    if st is not None:
+        try:
+            return st.secrets[key]
+        except (KeyError, FileNotFoundError):
+            pass
+    else:
+        secrets = _load_secrets()
+        if key in secrets: return secrets[key]
+    try:
+        import config
+        if hasattr(config, key): return getattr(config, key)
+    except ImportError:
+        pass
+    if default is _MISSING:
+        raise KeyError(f"설정 없음: {key} (.streamlit/secrets.toml 또는 config.py)")
+    return default
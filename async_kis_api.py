@@ -0,0 +1,166 @@
+import asyncio
+import datetime
+import time
+
+import aiohttp
+
+import metrics
+from kis_api import (KisApiError, PRICE_PATH, PRICE_TR_ID, DAILY_CHART_PATH, DAILY_CHART_TR_ID,
+                     MINUTE_CHART_PATH, MINUTE_CHART_TR_ID,
+                     THROTTLE_MSG_CD, THROTTLE_RETRIES, TOKEN_EXPIRED_MSG_CDS, REQUEST_TIMEOUT,
+                     daily_price_params, minute_params, parse_current_price, parse_daily_chart, parse_minute_chart,
+                     endpoint_name, record_response)
+
+# ==========================================
+# [비동기 KIS 클라이언트] 관심종목 일괄 시세 조회용
+#   - 키/토큰(토큰 관리자)/속도 제한은 동기 KisApi 와 공유
+#   - 종목별 오류는 errors 에 담고 나머지 결과는 그대로 반환
+# ==========================================
+DEFAULT_CONCURRENCY = 10
+SERVER_ERROR_RETRIES = 2
+
+class AsyncKisApi:
+    def __init__(self, api, concurrency=DEFAULT_CONCURRENCY):
+        self.api = api # 키/토큰/버킷 공유용 동기 클라이언트
+        self.base_url = api.base_url
+        self.concurrency = concurrency
+        self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(sock_connect=REQUEST_TIMEOUT[0], sock_read=REQUEST_TIMEOUT[1])
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _headers(self, tr_id, token):
+        return {
+            "content-type": "application/json",
+            "authorization": f"Bearer {token}",
+            "appkey": self.api.app_key,
+            "appsecret": self.api.app_secret,
+            "tr_id": tr_id
+        }
+
+    # -----------------------------------------------------------
+    # [공통 GET] 속도 제한 + 스로틀/5xx 재시도
+    # -----------------------------------------------------------
+    async def _get(self, path, tr_id, params):
+        await self.open()
+        url = f"{self.base_url}/{path}"
+        endpoint = endpoint_name(path)
+        throttled = 0
+        server_errors = 0
+        token_retried = False
+        while True:
+            # 유효한 토큰은 메모리에서 바로 (재발급이 필요할 때만 다른 스레드에서 대기)
+            token = self.api.tokens.token if self.api.tokens.valid() else \
+                await asyncio.get_running_loop().run_in_executor(None, self.api.tokens.get)
+            waited = await self.api.limiter.acquire_async()
+            if waited: metrics.observe("kis_rate_wait_seconds", waited, endpoint=endpoint)
+            metrics.inc("kis_requests_total", endpoint=endpoint)
+            started = time.perf_counter()
+            try:
+                async with self.session.get(url, headers=self._headers(tr_id, token), params=params) as res:
+                    status = res.status
+                    payload = await res.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                metrics.inc("kis_errors_total", endpoint=endpoint, status="", rt_cd="", msg_cd=type(e).__name__)
+                if server_errors >= SERVER_ERROR_RETRIES: raise
+                server_errors += 1
+                await asyncio.sleep(0.3 * server_errors)
+                continue
+            finally:
+                metrics.observe("kis_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+            record_response(endpoint, status, payload)
+
+            if payload.get('msg_cd') == THROTTLE_MSG_CD and throttled < THROTTLE_RETRIES:
+                metrics.inc("kis_throttled_total", endpoint=endpoint)
+                throttled += 1
+                self.api.limiter.penalize()
+                await asyncio.sleep(0.2 * throttled)
+                continue
+            if payload.get('msg_cd') in TOKEN_EXPIRED_MSG_CDS and not token_retried:
+                token_retried = True
+                self.api.tokens.invalidate(token)
+                continue
+            if status >= 500 and server_errors < SERVER_ERROR_RETRIES:
+                server_errors += 1
+                await asyncio.sleep(0.3 * server_errors)
+                continue
+            break
+
+        if status != 200 or payload.get('rt_cd', '0') != '0':
+            raise KisApiError(payload.get('msg_cd', str(status)), payload.get('msg1', ''), status)
+        return payload
+
+    async def get_current_price(self, stock_code):
+        params = {"fid_cond_mrkt_div_code": "J", "fid_input_iscd": stock_code}
+        data = await self._get(PRICE_PATH, PRICE_TR_ID, params)
+        return parse_current_price(data)
+
+    async def get_daily_price(self, stock_code, n_days=100):
+        data = await self._get(DAILY_CHART_PATH, DAILY_CHART_TR_ID, daily_price_params(stock_code, n_days))
+        return parse_daily_chart(data)
+
+    async def get_minute_price(self, stock_code, hhmmss=None):
+        # 최근 30분 1분봉 (한 페이지만 - 장중 갱신용, 하루치는 동기 KisApi.get_minute_price)
+        hhmmss = hhmmss or datetime.datetime.now().strftime("%H%M%S")
+        data = await self._get(MINUTE_CHART_PATH, MINUTE_CHART_TR_ID, minute_params(stock_code, hhmmss))
+        return parse_minute_chart(data)
+
+    # -----------------------------------------------------------
+    # [일괄 조회] 동시 요청 수 제한, (결과, 오류) 딕셔너리 반환
+    # -----------------------------------------------------------
+    async def _gather(self, codes, fetch):
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def run(code):
+            async with sem:
+                try:
+                    return code, await fetch(code), None
+                except Exception as e:
+                    return code, None, e
+
+        results, errors = {}, {}
+        for code, value, error in await asyncio.gather(*(run(code) for code in dict.fromkeys(codes))):
+            if error is None:
+                results[code] = value
+            else:
+                errors[code] = error
+        return results, errors
+
+    async def get_current_prices(self, codes):
+        return await self._gather(codes, self.get_current_price)
+
+    async def get_daily_prices(self, codes, n_days=100):
+        return await self._gather(codes, lambda code: self.get_daily_price(code, n_days))
+
+    async def get_minute_prices(self, codes, hhmmss=None):
+        return await self._gather(codes, lambda code: self.get_minute_price(code, hhmmss))
+
+# -----------------------------------------------------------
+# [동기 래퍼] 일회성 호출용 (엔진처럼 반복 호출하면 AsyncKisApi 를 유지할 것)
+# -----------------------------------------------------------
+def fetch_current_prices(api, codes, concurrency=DEFAULT_CONCURRENCY):
+    async def run():
+        async with AsyncKisApi(api, concurrency) as client:
+            return await client.get_current_prices(codes)
+    return asyncio.run(run())
+
+def fetch_daily_prices(api, codes, n_days=100, concurrency=DEFAULT_CONCURRENCY):
+    async def run():
+        async with AsyncKisApi(api, concurrency) as client:
+            return await client.get_daily_prices(codes, n_days)
+    return asyncio.run(run())
@@ -0,0 +1,255 @@
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_store import DEFAULT_SETTINGS
+from strategy import calc_target_prices, decide_orders
+
+# ==========================================
+# [백테스트] 종목별 설정(buy_pct/sell_pct/manual_buy/manual_sell/qty)을 과거 시세로 검증
+#   - Backtester: 봉 하나씩 재생하면서 engine.py 와 같은 판단 함수(decide_orders)로 주문
+#   - run_vectorized: 같은 규칙을 (파라미터 x 종목) 배열로 한 번에 계산 (최적화용)
+#
+# 봉 안의 가격 경로 가정: 시가 -> 시가에서 가까운 쪽 극값 -> 반대쪽 극값
+#   시가에서 조건을 만족하면 시가 체결, 장중에 목표가를 지나가면 목표가 체결
+# 매도는 보유 수량이 있을 때만, 매수는 현금이 있을 때만 체결 (없으면 증권사 거부와 동일하게 미체결)
+# ==========================================
+FEE_RATE = 0.00015 # 증권사 수수료 (매수/매도 각각)
+TAX_RATE = 0.0020 # 증권거래세 (매도 시, 2026년 기준)
+INITIAL_CASH = 10_000_000
+
+def bar_path(o, h, l):
+    if (o - l) <= (h - o):
+        return (o, l, h)
+    return (o, h, l)
+
+class Backtester:
+    def __init__(self, setting=None, fee_rate=FEE_RATE, tax_rate=TAX_RATE, initial_cash=INITIAL_CASH):
+        self.setting = dict(DEFAULT_SETTINGS, **(setting or {}))
+        self.fee_rate = fee_rate
+        self.tax_rate = tax_rate
+        self.initial_cash = initial_cash
+
+    # -----------------------------------------------------------
+    # [재생] df: Date/Open/High/Low/Close (일봉 또는 분봉)
+    # -----------------------------------------------------------
+    def run(self, df):
+        cash = float(self.initial_cash)
+        position = 0
+        avg_cost = 0.0
+        qty = int(self.setting['qty'])
+
+        trades = []
+        equity = []
+        trade_date = None
+        yesterday_price = None
+        day_close = None
+        history = None
+        buy_price = sell_price = None
+
+        for date, o, h, l, c in zip(df['Date'], df['Open'], df['High'], df['Low'], df['Close']):
+            day = pd.Timestamp(date).date()
+            if day != trade_date:
+                # 날짜가 바뀌면 전일 종가 기준으로 목표가 재계산 + 주문 기록 초기화 (엔진과 동일)
+                if day_close is not None: yesterday_price = day_close
+                trade_date = day
+                history = {'buy_ordered': False, 'sell_ordered': False}
+                if yesterday_price is not None:
+                    buy_price, sell_price = calc_target_prices(self.setting, yesterday_price)
+            day_close = c
+            if yesterday_price is None:
+                equity.append(cash + position * c)
+                continue
+
+            for k, p in enumerate(bar_path(o, h, l)):
+                for side in decide_orders(p, buy_price, sell_price, history):
+                    fill = p if k == 0 else (buy_price if side == 'buy' else sell_price)
+                    notional = fill * qty
+                    if side == 'buy':
+                        fee = notional * self.fee_rate
+                        if cash < notional + fee: continue # 잔고 부족 -> 거부
+                        cash -= notional + fee
+                        avg_cost = (avg_cost * position + notional + fee) / (position + qty)
+                        position += qty
+                        trades.append((date, 'buy', fill, qty, fee, 0.0, 0.0, cash, position))
+                    else:
+                        if position < qty: continue # 보유 수량 부족 -> 거부
+                        fee = notional * self.fee_rate
+                        tax = notional * self.tax_rate
+                        cash += notional - fee - tax
+                        realized = notional - fee - tax - avg_cost * qty
+                        position -= qty
+                        if position == 0: avg_cost = 0.0
+                        trades.append((date, 'sell', fill, qty, fee, tax, realized, cash, position))
+                    history[f'{side}_ordered'] = True
+            equity.append(cash + position * c)
+
+        return BacktestResult(
+            pd.DataFrame(trades, columns=['Date', 'Side', 'Price', 'Qty', 'Fee', 'Tax', 'Realized', 'Cash', 'Position']),
+            pd.Series(equity, index=pd.to_datetime(df['Date']).to_numpy(), name='Equity'),
+            self.initial_cash)
+
+class BacktestResult:
+    def __init__(self, trades, equity, initial_cash):
+        self.trades = trades
+        self.equity = equity
+        self.initial_cash = initial_cash
+
+    def summary(self):
+        final = float(self.equity.iloc[-1]) if len(self.equity) else float(self.initial_cash)
+        sells = self.trades[self.trades['Side'] == 'sell']
+        return {
+            "final_equity": final,
+            "pnl": final - self.initial_cash,
+            "return_pct": (final / self.initial_cash - 1) * 100,
+            "max_drawdown_pct": max_drawdown(self.equity.to_numpy()) * 100,
+            "trades": len(self.trades),
+            "win_rate_pct": float((sells['Realized'] > 0).mean() * 100) if len(sells) else 0.0,
+            "fees": float(self.trades['Fee'].sum() + self.trades['Tax'].sum()),
+        }
+
+def max_drawdown(equity):
+    if len(equity) == 0: return 0.0
+    peak = np.maximum.accumulate(equity)
+    return float(np.max((peak - equity) / peak))
+
+# ==========================================
+# [벡터화 백테스트] 일봉 전용, 파라미터 P 개 x 종목 S 개를 한 번에
+#   open/high/low/close: (S, T) 배열 (거래 없는 날은 NaN)
+#   buy_pct/sell_pct/qty/manual_buy/manual_sell: (P,) 또는 (P, S) 또는 스칼라
+#   반환: (P, S) 배열 딕셔너리
+# ==========================================
+def run_vectorized(open_, high, low, close, buy_pct, sell_pct, qty=1, manual_buy=0, manual_sell=0,
+                   fee_rate=FEE_RATE, tax_rate=TAX_RATE, initial_cash=INITIAL_CASH):
+    S, T = close.shape
+
+    def param(x):
+        x = np.asarray(x, dtype=float)
+        if x.ndim == 0: x = x.reshape(1, 1)
+        elif x.ndim == 1: x = x[:, np.newaxis]
+        return x
+
+    buy_pct, sell_pct, qty = param(buy_pct), param(sell_pct), param(qty)
+    manual_buy, manual_sell = param(manual_buy), param(manual_sell)
+    P = max(buy_pct.shape[0], sell_pct.shape[0], qty.shape[0], manual_buy.shape[0], manual_sell.shape[0])
+    shape = (P, S)
+    qty = np.broadcast_to(qty, shape)
+
+    cash = np.full(shape, float(initial_cash))
+    position = np.zeros(shape)
+    trades = np.zeros(shape, dtype=int)
+    fees = np.zeros(shape)
+    peak = cash.copy()
+    max_dd = np.zeros(shape)
+    last_close = np.full(S, np.nan)
+    mark = np.zeros(S) # 평가용 마지막 종가
+
+    def buy(mask, fill):
+        nonlocal cash, position
+        notional = fill * qty
+        fee = notional * fee_rate
+        ok = mask & (cash >= notional + fee)
+        cash = np.where(ok, cash - notional - fee, cash)
+        position = np.where(ok, position + qty, position)
+        trades[ok] += 1
+        fees[ok] += fee[ok]
+        return ok
+
+    def sell(mask, fill):
+        nonlocal cash, position
+        notional = fill * qty
+        cost = notional * (fee_rate + tax_rate)
+        ok = mask & (position >= qty)
+        cash = np.where(ok, cash + notional - cost, cash)
+        position = np.where(ok, position - qty, position)
+        trades[ok] += 1
+        fees[ok] += cost[ok]
+        return ok
+
+    for t in range(T):
+        o, h, l, c = open_[:, t], high[:, t], low[:, t], close[:, t]
+        traded = ~np.isnan(c)
+        if np.any(~np.isnan(last_close)):
+            # calc_target_prices 와 같은 계산 (int() 절사)
+            y = last_close[np.newaxis, :]
+            buy_target = np.where(manual_buy > 0, manual_buy, np.trunc(y * (1 + buy_pct / 100)))
+            sell_target = np.where(manual_sell > 0, manual_sell, np.trunc(y * (1 + sell_pct / 100)))
+            buy_target = np.broadcast_to(buy_target, shape)
+            sell_target = np.broadcast_to(sell_target, shape)
+            active = traded & ~np.isnan(last_close)
+
+            # 1) 시가 체결 (판단 순서: 매수 -> 매도)
+            bought = buy(active & (o <= buy_target), np.broadcast_to(o, shape))
+            sold = sell(active & (o >= sell_target), np.broadcast_to(o, shape))
+
+            # 2) 장중: 시가에서 가까운 극값을 먼저 지남
+            low_first = np.broadcast_to((o - l) <= (h - o), shape)
+            hit_buy = active & ~bought & (l <= buy_target)
+            hit_sell = active & ~sold & (h >= sell_target)
+            buy(hit_buy & low_first, buy_target)
+            sell(hit_sell, sell_target)
+            buy(hit_buy & ~low_first, buy_target)
+
+        last_close = np.where(traded, c, last_close)
+        mark = np.where(traded, c, mark)
+        equity = cash + position * mark
+        peak = np.maximum(peak, equity)
+        max_dd = np.maximum(max_dd, (peak - equity) / peak)
+
+    equity = cash + position * mark
+    return {
+        "final_equity": equity,
+        "pnl": equity - initial_cash,
+        "return_pct": (equity / initial_cash - 1) * 100,
+        "max_drawdown_pct": max_dd * 100,
+        "trades": trades,
+        "fees": fees,
+    }
+
+def ohlc_matrix(frames, codes):
+    # 종목별 DataFrame -> 날짜 정렬된 (종목 x 일자) OHLC 배열
+    codes = [c for c in codes if c in frames and not frames[c].empty]
+    dates = sorted(set().union(*(frames[c]['Date'] for c in codes))) if codes else []
+    date_idx = {d: i for i, d in enumerate(dates)}
+    arrays = {k: np.full((len(codes), len(dates)), np.nan) for k in ('Open', 'High', 'Low', 'Close')}
+    for row, code in enumerate(codes):
+        df = frames[code]
+        cols = np.fromiter((date_idx[d] for d in df['Date']), dtype=int, count=len(df))
+        for k, arr in arrays.items():
+            arr[row, cols] = df[k].to_numpy(dtype=float)
+    return codes, dates, arrays
+
+def main():
+    from kis_api import KisApi
+    from candle_store import CandleStore, to_yyyymmdd
+    from state_store import StateStore
+
+    parser = argparse.ArgumentParser(description="종목별 설정 백테스트")
+    parser.add_argument("--codes", help="쉼표 구분 종목코드 (기본: 관심종목)")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--trades", action="store_true", help="거래 내역 출력")
+    args = parser.parse_args()
+
+    data = StateStore().load_all()
+    codes = args.codes.split(",") if args.codes else data['watchlist']
+    api = KisApi()
+    if not api.get_access_token():
+        raise SystemExit("API 토큰 발급 실패! 키 값을 확인하세요.")
+    store = CandleStore(api)
+    start = to_yyyymmdd(datetime.datetime.now() - datetime.timedelta(days=args.days))
+    end = to_yyyymmdd(datetime.datetime.now())
+
+    rows = []
+    for code in codes:
+        store.sync(code, start, end)
+        df = store.load(code, start, end)
+        if df.empty: continue
+        result = Backtester(data['stock_settings'].get(code)).run(df)
+        rows.append(dict(code=code, name=data['stock_names'].get(code, code), **result.summary()))
+        if args.trades: print(code, result.trades.to_string(index=False), sep="\n")
+    print(pd.DataFrame(rows).round(2).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+# ==========================================
+# [분봉/주봉/월봉] 분봉 시세나 실시간 체결을 여러 주기 봉으로 묶음
+#   - BarBuffer: 종목 x 봉 링버퍼 (체결 1건 반영은 O(1), 오래된 봉은 덮어씀)
+#   - BarAggregator: 1/5/15/60분 BarBuffer 를 같이 갱신, 새 봉이 시작되면 리스너 호출
+#   - matrix()/scores(): 관심종목 전체를 (종목 x 봉) 배열로 -> indicators 로 한 번에 계산
+#   - resample_minutes/resample_daily: 분봉 DataFrame -> N분봉, 일봉 -> 주봉/월봉
+#   봉 구간은 한국시간(UTC+9) 기준 정각에 맞춤 (09:00 시작 -> 60분봉은 09:00, 10:00 ...)
+# ==========================================
+KST_OFFSET = 9 * 3600
+TIMEFRAMES = (1, 5, 15, 60) # 분
+DEFAULT_CAPACITY = 400 # 주기별 보관 봉 수 (1분봉 하루 390개)
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+SCORE_WINDOW = 21 # signal_scores 가 보는 봉 수 (MA20 + 직전 봉)
+
+def bucket_start(ts, minutes):
+    step = minutes * 60
+    return (int(ts) + KST_OFFSET) // step * step - KST_OFFSET
+
+def kst_day_start(ts=None):
+    ts = time.time() if ts is None else ts
+    return (int(ts) + KST_OFFSET) // 86400 * 86400 - KST_OFFSET
+
+def hhmmss_to_ts(hhmmss, day_start):
+    return day_start + int(hhmmss[0:2]) * 3600 + int(hhmmss[2:4]) * 60 + int(hhmmss[4:6])
+
+def to_datetime(ts):
+    # 봉 시작 시각 (epoch 초) -> 한국시간 naive datetime (다른 화면의 Date 열과 같은 형태)
+    return pd.to_datetime(np.asarray(ts, dtype=np.int64) + KST_OFFSET, unit='s')
+
+class BarBuffer:
+    def __init__(self, codes, minutes=1, capacity=DEFAULT_CAPACITY):
+        self.minutes = minutes
+        self.capacity = capacity
+        self.codes = []
+        self.index = {}
+        self.start = np.empty((0, capacity), dtype=np.int64)
+        self.data = np.empty((5, 0, capacity))
+        self.head = np.empty(0, dtype=int) # 종목별 가장 최근 봉 위치 (-1: 없음)
+        self.count = np.empty(0, dtype=int)
+        self.add_codes(codes)
+
+    def add_codes(self, codes):
+        new = [c for c in dict.fromkeys(codes) if c not in self.index]
+        if not new: return
+        for code in new:
+            self.index[code] = len(self.codes)
+            self.codes.append(code)
+        k = len(new)
+        self.start = np.concatenate([self.start, np.full((k, self.capacity), -1, dtype=np.int64)])
+        self.data = np.concatenate([self.data, np.full((5, k, self.capacity), np.nan)], axis=1)
+        self.head = np.concatenate([self.head, np.full(k, -1, dtype=int)])
+        self.count = np.concatenate([self.count, np.zeros(k, dtype=int)])
+
+    # -----------------------------------------------------------
+    # [체결 반영] O(1) - 같은 구간이면 고가/저가/종가/거래량만, 새 구간이면 링버퍼 한 칸 전진
+    #   반환: True(새 봉 시작), False(기존 봉 갱신), None(모르는 종목/지난 구간 체결)
+    # -----------------------------------------------------------
+    def update(self, code, ts, price, volume=0.0):
+        return self.merge(code, bucket_start(ts, self.minutes), price, price, price, price, volume)
+
+    def merge(self, code, start, o, h, l, c, v):
+        i = self.index.get(code)
+        if i is None: return None
+        slot = self.head[i]
+        d = self.data
+        if slot >= 0:
+            last = self.start[i, slot]
+            if start == last:
+                if h > d[HIGH, i, slot]: d[HIGH, i, slot] = h
+                if l < d[LOW, i, slot]: d[LOW, i, slot] = l
+                d[CLOSE, i, slot] = c
+                d[VOLUME, i, slot] += v
+                return False
+            if start < last:
+                return None
+        slot = (slot + 1) % self.capacity
+        self.head[i] = slot
+        self.start[i, slot] = start
+        d[OPEN, i, slot], d[HIGH, i, slot], d[LOW, i, slot], d[CLOSE, i, slot], d[VOLUME, i, slot] = o, h, l, c, v
+        if self.count[i] < self.capacity: self.count[i] += 1
+        return True
+
+    def last_bar(self, code):
+        i = self.index.get(code)
+        if i is None or self.head[i] < 0: return None
+        slot = self.head[i]
+        return {"start": int(self.start[i, slot]), **{k: float(self.data[j, i, slot]) for j, k in enumerate(FIELDS)}}
+
+    # -----------------------------------------------------------
+    # [배열] 시간순 정렬 (종목 x capacity), 봉이 모자란 종목은 앞쪽이 NaN
+    # -----------------------------------------------------------
+    def _order(self, window):
+        offsets = np.arange(window - 1, -1, -1)
+        order = (self.head[:, np.newaxis] - offsets[np.newaxis, :]) % self.capacity
+        missing = offsets[np.newaxis, :] >= self.count[:, np.newaxis]
+        return order, missing
+
+    def matrix(self, window=None):
+        # window: 최근 몇 개 봉만 (지표 계산에 필요한 만큼만 복사)
+        order, missing = self._order(min(window or self.capacity, self.capacity))
+        rows = np.arange(len(self.codes))[:, np.newaxis]
+        out = {k: np.where(missing, np.nan, self.data[j][rows, order]) for j, k in enumerate(FIELDS)}
+        out["start"] = np.where(missing, -1, self.start[rows, order])
+        return out
+
+    def frame(self, code):
+        i = self.index.get(code)
+        if i is None or self.count[i] == 0: return pd.DataFrame(columns=['Date', *FIELDS])
+        n = self.count[i]
+        slots = (self.head[i] - np.arange(n - 1, -1, -1)) % self.capacity
+        df = pd.DataFrame({k: self.data[j, i, slots] for j, k in enumerate(FIELDS)})
+        df.insert(0, 'Date', to_datetime(self.start[i, slots]))
+        return df
+
+class BarAggregator:
+    def __init__(self, codes=(), timeframes=TIMEFRAMES, capacity=DEFAULT_CAPACITY):
+        self.buffers = {tf: BarBuffer(codes, tf, capacity) for tf in timeframes}
+        self.listeners = []
+        self.day_start = kst_day_start()
+
+    def add_codes(self, codes):
+        for buf in self.buffers.values(): buf.add_codes(codes)
+
+    def add_listener(self, fn):
+        # fn(code, minutes) - 새 봉이 시작될 때 (직전 봉 확정)
+        self.listeners.append(fn)
+
+    def on_tick(self, tick):
+        # kis_stream.Tick: 체결 시각(HHMMSS) + 체결가 + 체결량
+        now = time.time()
+        if now - self.day_start >= 86400: self.day_start = kst_day_start(now)
+        self.update(tick.code, hhmmss_to_ts(tick.time, self.day_start), tick.price, tick.volume)
+
+    def update(self, code, ts, price, volume=0.0):
+        for tf, buf in self.buffers.items():
+            if buf.update(code, ts, price, volume) and self.listeners:
+                for fn in self.listeners: fn(code, tf)
+
+    def load_minutes(self, code, df):
+        # 분봉 DataFrame (Date/Open/High/Low/Close/Volume, 시간순) 으로 채움
+        self.add_codes([code])
+        starts = (df['Date'].to_numpy().astype('datetime64[s]').astype(np.int64) - KST_OFFSET)
+        values = df[list(FIELDS)].to_numpy(dtype=float)
+        for tf, buf in self.buffers.items():
+            for ts, (o, h, l, c, v) in zip(starts, values):
+                buf.merge(code, bucket_start(ts, tf), o, h, l, c, v)
+
+    def frame(self, code, minutes):
+        return self.buffers[minutes].frame(code)
+
+    def scores(self, minutes, current_prices=None):
+        # 관심종목 전체의 해당 주기 AI 점수 (indicators.signal_scores 한 번 호출, 최근 SCORE_WINDOW 봉)
+        buf = self.buffers[minutes]
+        m = buf.matrix(SCORE_WINDOW)
+        return buf.codes, indicators.signal_scores(m["Close"], m["Volume"], current_prices)
+
+# -----------------------------------------------------------
+# [DataFrame 변환] 분봉 -> N분봉, 일봉 -> 주봉/월봉 (구간별 첫 시가/최고/최저/마지막 종가/합계)
+# -----------------------------------------------------------
+def _aggregate(df, keys):
+    if df.empty: return df
+    keys = np.asarray(keys)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(df)] - 1
+    return pd.DataFrame({
+        'Date': df['Date'].to_numpy()[starts],
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(df['High'].to_numpy(dtype=float), starts),
+        'Low': np.minimum.reduceat(df['Low'].to_numpy(dtype=float), starts),
+        'Close': df['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(df['Volume'].to_numpy(dtype=float), starts),
+    })
+
+def resample_minutes(df, minutes):
+    if minutes == 1 or df.empty: return df
+    ts = df['Date'].to_numpy().astype('datetime64[s]').astype(np.int64) - KST_OFFSET
+    step = minutes * 60
+    keys = (ts + KST_OFFSET) // step
+    out = _aggregate(df, keys)
+    out['Date'] = to_datetime(keys[np.r_[True, keys[1:] != keys[:-1]]] * step - KST_OFFSET)
+    return out
+
+RESAMPLE_RULES = {"W": "W-FRI", "M": "M"}
+
+def resample_daily(df, rule):
+    # rule: "W" (주봉, 금요일 마감 주) / "M" (월봉) - 봉 날짜는 구간의 첫 거래일
+    if df.empty: return df
+    periods = pd.to_datetime(df['Date']).dt.to_period(RESAMPLE_RULES[rule]).to_numpy()
+    return _aggregate(df, periods)
@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+import indicators
+from async_kis_api import fetch_current_prices
+from candle_store import CandleStore
+from kis_api import KisApi
+from mock_kis_server import MockKis
+from order_manager import OrderManager
+from state_store import StateStore
+from strategy import analyze_market_signal
+
+# ==========================================
+# [벤치마크] 가짜 KIS 서버(mock_kis_server.py)로 주요 경로의 처리량/지연 측정
+#   실행: python bench.py --sizes 10,100,1000 --latency 0.01 --json bench.json
+#   비교: python bench.py --baseline bench.json --tolerance 0.2  (20% 넘게 느려진 항목이 있으면 종료코드 1)
+#   - quotes_sync: 종목별 현재가 순차 조회 / quotes_async: 비동기 일괄 조회
+#   - candles_cold: 빈 일봉 저장소 동기화 / candles_warm: 동기화된 저장소에서 읽기
+#   - scoring_loop: 종목별 analyze_market_signal / scoring_batch: 전 종목 signal_scores 한 번
+#   - orders: 주문 접수(submit) 지연 + 전송 스레드가 전부 접수 완료할 때까지
+#   모든 파일(DB, 토큰 캐시)은 임시 폴더에 만들고 끝나면 지움
+# ==========================================
+DEFAULT_SIZES = (10, 100, 1000)
+CHART_DAYS = 150
+
+def make_codes(n):
+    return [f"{i:06d}" for i in range(1, n + 1)]
+
+def summarize(name, size, wall, samples=None, ops=None):
+    ops = ops if ops is not None else size
+    row = {"case": name, "size": size, "wall_s": round(wall, 4), "ops_per_s": round(ops / wall, 1) if wall else None}
+    if samples:
+        samples = sorted(samples)
+        row["p50_ms"] = round(statistics.median(samples) * 1000, 3)
+        row["p95_ms"] = round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3)
+    return row
+
+def timed_each(fn, items):
+    samples = []
+    started = time.perf_counter()
+    for item in items:
+        t = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - t)
+    return time.perf_counter() - started, samples
+
+# -----------------------------------------------------------
+# [측정 항목]
+# -----------------------------------------------------------
+def bench_quotes(api, codes, concurrency):
+    wall, samples = timed_each(api.get_current_price, codes)
+    rows = [summarize("quotes_sync", len(codes), wall, samples)]
+    started = time.perf_counter()
+    _, errors = fetch_current_prices(api, codes, concurrency)
+    rows.append(summarize("quotes_async", len(codes), time.perf_counter() - started))
+    if errors: rows[-1]["errors"] = len(errors)
+    return rows
+
+def bench_candles(api, codes, workdir):
+    store = CandleStore(api, os.path.join(workdir, f"candles_{len(codes)}.db"))
+    try:
+        wall, samples = timed_each(lambda c: store.get_daily(c, CHART_DAYS), codes)
+        rows = [summarize("candles_cold", len(codes), wall, samples)]
+        wall, samples = timed_each(lambda c: store.get_daily(c, CHART_DAYS), codes)
+        rows.append(summarize("candles_warm", len(codes), wall, samples))
+        frames = {c: store.load(c, "00000000", "99999999") for c in codes}
+    finally:
+        store.close()
+    return rows, frames
+
+def bench_scoring(frames):
+    codes = list(frames)
+    prices = {c: float(df['Close'].iloc[-1]) for c, df in frames.items()}
+    wall, samples = timed_each(lambda c: analyze_market_signal(frames[c], prices[c]), codes)
+    rows = [summarize("scoring_loop", len(codes), wall, samples)]
+
+    n = min(len(df) for df in frames.values())
+    close = np.stack([frames[c]['Close'].to_numpy(dtype=float)[-n:] for c in codes])
+    volume = np.stack([frames[c]['Volume'].to_numpy(dtype=float)[-n:] for c in codes])
+    started = time.perf_counter()
+    indicators.signal_scores(close, volume, np.array([prices[c] for c in codes]))
+    rows.append(summarize("scoring_batch", len(codes), time.perf_counter() - started))
+    return rows
+
+def bench_orders(api, codes, workdir, timeout=120.0):
+    store = StateStore(os.path.join(workdir, f"state_{len(codes)}.db"), legacy_json=None)
+    manager = OrderManager(api, store, poll_sec=3600) # 체결 대조는 측정에서 제외
+    manager.start()
+    try:
+        started = time.perf_counter()
+        _, samples = timed_each(lambda c: manager.submit(c, "buy", 1, 10000), codes)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            counts = manager.metrics()["counts"]
+            if counts.get("new", 0) + counts.get("sending", 0) == 0: break
+            time.sleep(0.005)
+        wall = time.perf_counter() - started
+        row = summarize("orders", len(codes), wall, samples)
+        row["submitted"] = manager.metrics()["counts"].get("submitted", 0)
+    finally:
+        manager.stop()
+        store.close()
+    return [row]
+
+# -----------------------------------------------------------
+# [실행/비교]
+# -----------------------------------------------------------
+def run(sizes, latency=0.0, rate=0, client_rate=1000, concurrency=10, cases=None):
+    workdir = tempfile.mkdtemp(prefix="kis_bench_")
+    mock = MockKis(port=0, latency=latency, rate=rate, cash=10 ** 12).start() # 주문이 잔고 부족으로 거부되지 않도록
+    results = []
+    try:
+        api = KisApi(app_key="bench", app_secret="bench", base_url=mock.url, cano="00000000",
+                     rate=client_rate, token_path=os.path.join(workdir, "token.json"))
+        for size in sizes:
+            codes = make_codes(size)
+            rows = []
+            if not cases or "quotes" in cases: rows += bench_quotes(api, codes, concurrency)
+            if not cases or "candles" in cases or "scoring" in cases:
+                candle_rows, frames = bench_candles(api, codes, workdir)
+                if not cases or "candles" in cases: rows += candle_rows
+                if not cases or "scoring" in cases: rows += bench_scoring(frames)
+            if not cases or "orders" in cases: rows += bench_orders(api, codes, workdir)
+            for row in rows: print(format_row(row))
+            results += rows
+    finally:
+        mock.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def format_row(row):
+    line = f"{row['case']:<14}{row['size']:>6}  {row['wall_s']:>9.4f}s  {row['ops_per_s'] or 0:>10.1f}/s"
+    if "p50_ms" in row:
+        line += f"  p50 {row['p50_ms']:>8.3f}ms  p95 {row['p95_ms']:>8.3f}ms"
+    return line
+
+def compare(results, baseline, tolerance):
+    # 같은 (항목, 종목 수) 의 wall_s 가 tolerance 넘게 늘어나면 회귀
+    base = {(r["case"], r["size"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = base.get((r["case"], r["size"]))
+        if b and b["wall_s"] > 0 and r["wall_s"] > b["wall_s"] * (1 + tolerance):
+            regressions.append((r["case"], r["size"], b["wall_s"], r["wall_s"]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="KIS 경로 벤치마크 (가짜 서버 사용)")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="종목 수 (쉼표 구분)")
+    parser.add_argument("--cases", help="quotes,candles,scoring,orders 중 일부만")
+    parser.add_argument("--latency", type=float, default=0.0, help="가짜 서버 응답 지연 (초)")
+    parser.add_argument("--rate", type=int, default=0, help="가짜 서버 초당 호출 제한 (0 = 없음)")
+    parser.add_argument("--client-rate", type=float, default=1000, help="클라이언트 호출 속도 제한 (초당)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--json", help="결과 저장 파일")
+    parser.add_argument("--baseline", help="이전 결과 파일과 비교")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="허용 지연 증가 비율")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    cases = set(args.cases.split(",")) if args.cases else None
+    print(f"{'case':<14}{'size':>6}  {'wall':>10}  {'throughput':>12}")
+    results = run(sizes, args.latency, args.rate, args.client_rate, args.concurrency, cases)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for case, size, before, after in regressions:
+            print(f"[회귀] {case} x{size}: {before:.4f}s -> {after:.4f}s")
+        if regressions: raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
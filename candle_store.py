@@ -0,0 +1,198 @@
+import datetime
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+import metrics
+
+# ==========================================
+# [일봉 저장소] SQLite 로컬 캐시 + 빠진 구간만 증분 동기화
+#   - 이미 받은 구간(covered_start ~ covered_end)을 종목별로 기록
+#   - 요청 구간 중 비어 있는 앞/뒤 구간만 API 로 받아서 저장
+#   - 오늘 봉은 장중에만 REFRESH_SEC 주기로 다시 받음 (장 마감 후엔 확정)
+# ==========================================
+CANDLE_DB = "candles.db"
+REFRESH_SEC = 60
+MARKET_CLOSE_FINAL = datetime.time(15, 40) # 이 시각 이후 동기화한 오늘 봉은 확정으로 봄
+
+COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+def to_yyyymmdd(d):
+    return d.strftime("%Y%m%d")
+
+def shift_day(yyyymmdd, days):
+    d = datetime.datetime.strptime(yyyymmdd, "%Y%m%d") + datetime.timedelta(days=days)
+    return to_yyyymmdd(d)
+
+def day_final(yyyymmdd, synced_at):
+    # 그날 장 마감(MARKET_CLOSE_FINAL) 이후에 받은 봉이면 확정
+    close = datetime.datetime.combine(datetime.datetime.strptime(yyyymmdd, "%Y%m%d").date(), MARKET_CLOSE_FINAL)
+    return synced_at >= close.timestamp()
+
+class CandleStore:
+    def __init__(self, api=None, path=CANDLE_DB):
+        self.api = api
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS candles (
+                code TEXT NOT NULL, date TEXT NOT NULL,
+                open INTEGER, high INTEGER, low INTEGER, close INTEGER, volume INTEGER,
+                PRIMARY KEY (code, date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sync_state (
+                code TEXT PRIMARY KEY,
+                covered_start TEXT NOT NULL,
+                covered_end TEXT NOT NULL,
+                synced_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS market_dates (
+                market TEXT NOT NULL, date TEXT NOT NULL, synced_at REAL NOT NULL,
+                PRIMARY KEY (market, date)
+            );
+            CREATE TABLE IF NOT EXISTS market_sync (
+                market TEXT PRIMARY KEY,
+                covered_start TEXT NOT NULL,
+                covered_end TEXT NOT NULL,
+                synced_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # -----------------------------------------------------------
+    # [조회] 최근 n일 일봉 (필요한 구간만 동기화 후 디스크에서 읽음)
+    # -----------------------------------------------------------
+    @metrics.timed("call_seconds", fn="candle_get_daily")
+    def get_daily(self, code, n_days=150):
+        end = to_yyyymmdd(datetime.datetime.now())
+        start = to_yyyymmdd(datetime.datetime.now() - datetime.timedelta(days=n_days))
+        self.sync(code, start, end)
+        return self.load(code, start, end)
+
+    def load(self, code, start, end):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT date, open, high, low, close, volume FROM candles "
+                "WHERE code = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (code, start, end)).fetchall()
+        if not rows: return pd.DataFrame()
+        df = pd.DataFrame(rows, columns=COLUMNS)
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y%m%d')
+        return df
+
+    def load_many(self, codes, start, end):
+        # 여러 종목을 한 번에 읽기 (스캐너/백테스트용), 종목코드 -> DataFrame
+        codes = list(codes)
+        if not codes: return {}
+        placeholders = ",".join("?" * len(codes))
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT code, date, open, high, low, close, volume FROM candles "
+                f"WHERE code IN ({placeholders}) AND date BETWEEN ? AND ? ORDER BY code, date",
+                (*codes, start, end)).fetchall()
+        if not rows: return {}
+        df = pd.DataFrame(rows, columns=['Code'] + COLUMNS)
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y%m%d')
+        return {code: g.drop(columns='Code').reset_index(drop=True) for code, g in df.groupby('Code', sort=False)}
+
+    def coverage(self, code):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT covered_start, covered_end, synced_at FROM sync_state WHERE code = ?", (code,)).fetchone()
+        return row
+
+    # -----------------------------------------------------------
+    # [동기화] 빠진 구간 계산 후 API 로 받아서 저장
+    # -----------------------------------------------------------
+    def missing_ranges(self, code, start, end, now=None):
+        now = now or datetime.datetime.now()
+        today = to_yyyymmdd(now)
+        state = self.coverage(code)
+        if state is None:
+            return [(start, end)]
+
+        covered_start, covered_end, synced_at = state
+        ranges = []
+        if start < covered_start:
+            ranges.append((start, shift_day(covered_start, -1)))
+        if end > covered_end:
+            # 마지막 봉은 장중 미완성일 수 있어 겹쳐서 다시 받음
+            ranges.append((covered_end, end))
+        elif covered_end == today and end == today and self._today_stale(synced_at, now):
+            ranges.append((today, today))
+        return ranges
+
+    def _today_stale(self, synced_at, now):
+        return self.day_stale(to_yyyymmdd(now), synced_at, now)
+
+    def day_stale(self, date, synced_at, now):
+        # 확정 전에 받은 봉: 지난 날짜는 바로, 오늘은 REFRESH_SEC 주기로 다시 받음
+        if day_final(date, synced_at):
+            return False
+        return date != to_yyyymmdd(now) or now.timestamp() - synced_at > REFRESH_SEC
+
+    def sync(self, code, start, end):
+        ranges = self.missing_ranges(code, start, end)
+        if not ranges or self.api is None: return 0
+        count = 0
+        for r_start, r_end in ranges:
+            df = self.api.get_daily_price_range(code, r_start, r_end)
+            self.upsert(code, df)
+            count += len(df)
+
+        state = self.coverage(code)
+        new_start = min(start, state[0]) if state else start
+        new_end = max(end, state[1]) if state else end
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (code, covered_start, covered_end, synced_at) VALUES (?, ?, ?, ?)",
+                (code, new_start, new_end, time.time()))
+            self.conn.commit()
+        return count
+
+    # -----------------------------------------------------------
+    # [시장 전체 일봉] 날짜 하나에 전 종목 (pykrx 일괄 조회 결과) 저장
+    # -----------------------------------------------------------
+    def market_dates(self, market):
+        # 받은 날짜 -> 받은 시각 (장중에 받은 날짜는 day_stale 로 골라 다시 받음)
+        with self.lock:
+            rows = self.conn.execute("SELECT date, synced_at FROM market_dates WHERE market = ?", (market,)).fetchall()
+        return dict(rows)
+
+    def market_coverage(self, market):
+        # 이미 확인한 달력 구간 (휴장일 포함) -> (시작, 끝) 또는 None
+        with self.lock:
+            return self.conn.execute("SELECT covered_start, covered_end FROM market_sync WHERE market = ?",
+                                     (market,)).fetchone()
+
+    def set_market_coverage(self, market, start, end):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO market_sync VALUES (?, ?, ?, ?)", (market, start, end, time.time()))
+            self.conn.commit()
+
+    def upsert_market_day(self, market, date, rows):
+        # rows: (code, open, high, low, close, volume) 목록, date: YYYYMMDD
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(code, date, o, h, l, c, v) for code, o, h, l, c, v in rows])
+            self.conn.execute("INSERT OR REPLACE INTO market_dates VALUES (?, ?, ?)", (market, date, time.time()))
+            self.conn.commit()
+
+    def upsert(self, code, df):
+        if df is None or df.empty: return
+        rows = [
+            (code, d.strftime("%Y%m%d"), int(o), int(h), int(l), int(c), int(v))
+            for d, o, h, l, c, v in zip(df['Date'], df['Open'], df['High'], df['Low'], df['Close'], df['Volume'])
+        ]
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.commit()
@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from indicators import sma
+
+# ==========================================
+# [차트] 캔들 + MA20 + 거래량 Figure 생성 (화면 재실행마다 다시 만들지 않도록 캐시)
+#   - 캐시 키: (종목, 마지막 봉 날짜/종가, 봉 개수, 매수/매도 목표가)
+#     -> 숫자 입력만 바꾼 재실행은 같은 Figure 재사용 (목표가가 바뀔 때만 새로 만듦)
+#   - 봉이 MAX_BARS 보다 많으면 구간별로 묶어서 표시 (시가/고가/저가/종가/거래량 보존)
+#   - 이동평균선은 LTTB 로 점 개수를 줄임 (모양을 유지하는 샘플링)
+#   - plotly 는 Figure 를 처음 만들 때 import (샘플링 함수만 쓰는 쪽은 불러오지 않음)
+# ==========================================
+UP_COLOR = '#ef404a'
+DOWN_COLOR = '#2c56a8'
+MAX_BARS = 400
+MAX_LINE_POINTS = 800
+CACHE_SIZE = 32
+
+def lttb_indices(y, n_out):
+    # Largest-Triangle-Three-Buckets: 구간마다 앞 점/다음 구간 평균과 만드는 삼각형이 가장 큰 점 선택
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nlo, nhi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[nlo:max(nhi, nlo + 1)].mean()
+        avg_y = y[nlo:max(nhi, nlo + 1)].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+def lttb(x, y, n_out=MAX_LINE_POINTS):
+    # NaN(이동평균 초기 구간)은 빼고 샘플링
+    y = np.asarray(y, dtype=float)
+    valid = np.flatnonzero(~np.isnan(y))
+    keep = valid[lttb_indices(y[valid], n_out)]
+    return np.asarray(x)[keep], y[keep]
+
+def downsample_ohlc(df, max_bars=MAX_BARS):
+    # 연속된 봉을 묶음 (마지막 묶음이 최신 봉으로 끝나도록 앞쪽에서 나머지를 처리)
+    n = len(df)
+    if n <= max_bars:
+        return df
+    size = -(-n // max_bars)
+    groups = (np.arange(n) + (-n) % size) // size
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return pd.DataFrame({
+        'Date': df['Date'].to_numpy()[starts],
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(df['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        'Close': df['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(df['Volume'].to_numpy(), starts),
+    })
+
+def build_figure(df, buy_price, sell_price, max_bars=MAX_BARS, max_line_points=MAX_LINE_POINTS):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    ma20 = sma(df['Close'].to_numpy(dtype=float), 20) # 원본 봉 기준으로 계산 후 샘플링
+    ma_x, ma_y = lttb(df['Date'].to_numpy(), ma20, max_line_points)
+    bars = downsample_ohlc(df, max_bars)
+    colors = np.where(bars['Close'].to_numpy() >= bars['Open'].to_numpy(), UP_COLOR, DOWN_COLOR)
+
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.7, 0.3])
+    fig.add_trace(go.Candlestick(x=bars['Date'], open=bars['Open'], high=bars['High'], low=bars['Low'], close=bars['Close'], name="Price", increasing_line_color=UP_COLOR, decreasing_line_color=DOWN_COLOR), row=1, col=1)
+    fig.add_trace(go.Scatter(x=ma_x, y=ma_y, line=dict(color='orange', width=1), name="MA20"), row=1, col=1)
+    fig.add_trace(go.Bar(x=bars['Date'], y=bars['Volume'], name="Volume", marker_color=colors), row=2, col=1)
+    fig.add_hline(y=buy_price, line_dash="dot", line_color="red", row=1, col=1)
+    fig.add_hline(y=sell_price, line_dash="dot", line_color="blue", row=1, col=1)
+    fig.update_layout(height=600, xaxis_rangeslider_visible=False, margin=dict(t=10, b=10, l=10, r=10), showlegend=False)
+    return fig
+
+# -----------------------------------------------------------
+# [캐시] 최근 CACHE_SIZE 개 Figure (프로세스 공용, LRU)
+# -----------------------------------------------------------
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def cached_figure(code, df, buy_price, sell_price, max_bars=MAX_BARS):
+    if df.empty:
+        return build_figure(df, buy_price, sell_price, max_bars)
+    key = (code, len(df), df['Date'].iloc[0], df['Date'].iloc[-1], float(df['Close'].iloc[-1]),
+           int(df['Volume'].iloc[-1]), buy_price, sell_price, max_bars)
+    with _cache_lock:
+        fig = _cache.get(key)
+        if fig is not None:
+            _cache.move_to_end(key)
+            return fig
+    fig = build_figure(df, buy_price, sell_price, max_bars)
+    with _cache_lock:
+        _cache[key] = fig
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return fig
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+
+# ==========================================
+# [데이터 저장/로드] 기본 설정값 + JSON 파일 도우미
+# (관심종목/종목명/종목별 설정은 state_store.py 의 stock_bot.db 에 저장,
+#  load_data 는 예전 stock_data.json 을 옮겨 올 때만 사용)
+# ==========================================
+DATA_FILE = "stock_data.json"
+# 엔진 상태/제어 파일 (engine.py 가 쓰고 화면이 읽음 - 화면은 engine.py 를 import 하지 않음)
+STATE_FILE = "engine_state.json"
+CONTROL_FILE = "engine_control.json"
+
+# 기본 설정값 (신규 종목 추가 시 사용)
+DEFAULT_SETTINGS = {
+    "buy_pct": -3.0,       # 매수 기준 (%)
+    "sell_pct": 5.0,       # 매도 기준 (%)
+    "manual_buy": 0,       # 직접 입력 매수거
+    "manual_sell": 0,      # 직접 입력 매도가
+    "qty": 1,              # 주문 수량
+    "auto_on": False       # 자동매매 켜짐 여부
+}
+
+def load_data(path=DATA_FILE):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+            # 예전 버전 파일 호환성 처리 (stock_settings가 없으면 생성)
+            if "stock_settings" not in data:
+                data["stock_settings"] = {}
+                for code in data.get("watchlist", []):
+                    data["stock_settings"][code] = DEFAULT_SETTINGS.copy()
+            data.setdefault("stock_names", {})
+            return data
+    else:
+        return {"watchlist": ["005930"], "stock_names": {}, "stock_settings": {}}
+
+def write_json_atomic(path, data, indent=None):
+    # 임시 파일에 쓴 뒤 교체 -> 엔진이 쓰는 도중의 파일을 읽지 않도록
+    # 임시 파일은 쓸 때마다 새 이름 (여러 세션이 동시에 저장해도 서로의 내용이 섞이지 않음)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def read_json(path, default=None):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+# -----------------------------------------------------------
+# [엔진 상태/제어 파일]
+# -----------------------------------------------------------
+def read_engine_state(path=STATE_FILE):
+    return read_json(path, default={})
+
+def read_engine_control(path=CONTROL_FILE):
+    return read_json(path, default={"paused": False})
+
+def write_engine_control(control, path=CONTROL_FILE):
+    write_json_atomic(path, control)
@@ -0,0 +1,513 @@
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import time
+
+import alerts
+from bars import BarAggregator
+from candle_store import CandleStore
+import indicators
+from kis_api import KisApi
+from async_kis_api import AsyncKisApi, DEFAULT_CONCURRENCY
+from kis_stream import MAX_SUBSCRIPTIONS, KisStream, tick_to_price_output
+import metrics
+from notifier import Notifier
+from order_manager import OrderManager
+from portfolio import Portfolio, DEFAULT_LIMITS
+from data_store import (DEFAULT_SETTINGS, STATE_FILE, CONTROL_FILE, write_json_atomic,
+                        read_engine_state, read_engine_control, write_engine_control)
+from state_store import StateStore, SETTING_TABLES, ALERT_TABLES
+from strategy import calc_target_prices, decide_orders
+
+# ==========================================
+# [자동매매 엔진] Streamlit 화면과 별도로 돌아가는 프로세스
+#   실행: python engine.py --interval 5
+#         python engine.py --stream   (웹소켓 실시간 체결가로 즉시 판단)
+#   - stock_bot.db 의 auto_on 종목 전체를 일정 주기로 검사
+#   - 상태는 engine_state.json 에 기록 (화면은 이 파일을 읽어서 표시)
+#   - 일시정지 등 제어는 engine_control.json 으로 받음
+#   - 주문/체결 상태는 order_manager.py 가 stock_bot.db 에 기록 (재시작해도 중복 주문 없음)
+# ==========================================
+MARKET_OPEN = datetime.time(9, 0)
+MARKET_CLOSE = datetime.time(15, 30)
+
+logger = logging.getLogger("engine")
+
+def is_market_open(now):
+    if now.weekday() >= 5: return False
+    return MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
+class TradingEngine:
+    def __init__(self, api=None, interval=5.0, store=None, state_file=STATE_FILE,
+                 control_file=CONTROL_FILE, ignore_market_hours=False, concurrency=DEFAULT_CONCURRENCY,
+                 order_type="market", risk_limits=None):
+        self.api = api or KisApi()
+        self.notifier = Notifier() # 카카오 알림은 백그라운드 발송 (주문 경로 비차단)
+        # 관심종목 시세는 비동기 클라이언트로 한 번에 조회 (루프/세션은 틱 사이에 유지)
+        self.loop = asyncio.new_event_loop()
+        self.async_api = AsyncKisApi(self.api, concurrency)
+        self.interval = interval
+        self.store = store or StateStore()
+        # 주문 전송/체결 대조는 주문 관리자 스레드가 담당 (판단 루프 비차단)
+        self.orders = OrderManager(self.api, self.store, order_type=order_type,
+                                   on_fill=self.on_fill, on_reject=self.on_reject)
+        # 잔고/보유종목 장부 + 주문 전 한도 검사 (잔고는 백그라운드로 주기 동기화)
+        self.portfolio = Portfolio(self.api, risk_limits)
+        self.risk_blocks = {} # (종목, 방향) -> 마지막 차단 사유 (같은 사유는 한 번만 기록)
+        # 조건 알림 (alert_rules) - 규칙/관심종목이 바뀌거나 날짜가 바뀔 때만 평가 계획을 다시 만듦
+        self.alerts = alerts.AlertEngine()
+        self.alert_version = None
+        self.state_file = state_file
+        self.control_file = control_file
+        self.ignore_market_hours = ignore_market_hours
+
+        self.data = None
+        self.data_version = None
+
+        # 오늘 주문은 DB 에서 복원 (재시작해도 같은 날 중복 주문이 나가지 않음)
+        self.trade_date = datetime.date.today().isoformat()
+        self.orders.roll(self.trade_date)
+        self.quotes = {}
+        self.last_tick = None
+        self.last_error = None
+
+        # 실시간 모드 (--stream)
+        self.stream = None
+        self.stream_targets = {}
+        self.stream_overflow = [] # 구독 한도를 넘어 REST 로 조회하는 종목
+        self.bars = BarAggregator() # 실시간 체결 -> 1/5/15/60분봉 (종목 전체, 틱당 O(1))
+        self.status = None
+        self.latency_last_ms = None
+        self.latency_max_ms = 0.0
+        self.tick_started = None # 시세 수신 시각 (perf_counter) -> 주문 접수까지 지연 측정
+
+    # -----------------------------------------------------------
+    # [설정 로드] 저장소 버전이 바뀐 경우에만 다시 읽음
+    # -----------------------------------------------------------
+    def reload_data(self):
+        version = self.store.version(SETTING_TABLES)
+        if self.data is None or version != self.data_version:
+            self.data = self.store.load_all()
+            self.data_version = version
+        return self.data
+
+    def roll_trade_date(self, now):
+        # 날짜가 바뀌면 매수/매도 완료 기록 초기화
+        today = now.date().isoformat()
+        if today != self.trade_date:
+            self.trade_date = today
+            self.orders.roll(today)
+            self.portfolio.roll(today)
+            self.risk_blocks = {}
+            self.alert_version = None # 어제까지 일봉으로 기준값 다시 계산
+            self.update_atr()
+
+    def ensure_token(self):
+        # 토큰 관리자가 만료 전에 백그라운드로 재발급 -> 여기서는 유효한지만 확인 (메모리 조회)
+        if not self.api.get_access_token():
+            raise RuntimeError("API 토큰 발급 실패! 키 값을 확인하세요.")
+
+    def auto_targets(self):
+        data = self.reload_data()
+        settings = data.get("stock_settings", {})
+        targets = []
+        for code in data.get("watchlist", []):
+            setting = settings.get(code, DEFAULT_SETTINGS)
+            if setting.get("auto_on"):
+                targets.append((code, setting))
+        return targets
+
+    def update_atr(self):
+        # sizing=atr 일 때만: 자동매매 종목의 일봉 ATR (하루 한 번)
+        if self.portfolio.limits["sizing"] != "atr": return
+        candles = CandleStore(self.api)
+        try:
+            for code, _ in self.auto_targets():
+                df = candles.get_daily(code, 60)
+                if len(df) < 15: continue
+                value = indicators.atr(df['High'].to_numpy(dtype=float), df['Low'].to_numpy(dtype=float),
+                                       df['Close'].to_numpy(dtype=float))[-1]
+                if value == value: self.portfolio.atr[code] = float(value)
+        except Exception as e:
+            self.last_error = f"ATR 계산 실패: {e}"
+            logger.warning(self.last_error)
+        finally:
+            candles.close()
+
+    # -----------------------------------------------------------
+    # [조건 알림] 규칙 변경 시 평가 계획 다시 만들기 (RSI/MA/거래량 조건은 일봉 이력 필요)
+    # -----------------------------------------------------------
+    def refresh_alerts(self):
+        version = self.store.version(ALERT_TABLES)
+        if version == self.alert_version: return
+        if self.alerts.trade_date != self.trade_date:
+            self.alerts.roll(self.trade_date)
+            self.alerts.seed_fired(self.store.get_alert_log(trade_date=self.trade_date, limit=10000))
+        self.alerts.set_rules(self.store.get_alert_rules(enabled_only=True), self.reload_data()["watchlist"])
+        missing = self.alerts.history_codes()
+        if missing:
+            today = datetime.date.fromisoformat(self.trade_date)
+            candles = CandleStore(self.api)
+            try:
+                for code in missing:
+                    df = candles.get_daily(code, alerts.HISTORY_DAYS)
+                    self.alerts.set_history(code, *alerts.history_from_daily(df, today))
+            except Exception as e:
+                self.last_error = f"알림 일봉 조회 실패: {e}"
+                logger.warning(self.last_error)
+                return # 다음 틱에 다시 시도
+            finally:
+                candles.close()
+        count = self.alerts.compile()
+        self.alert_version = version
+        logger.info("알림 규칙 %d개 -> 평가 항목 %d개 (기준값 없음 %d)", len(self.alerts.rules), count,
+                    len(self.alerts.skipped))
+
+    def check_alerts(self, code, curr_data):
+        volume = int(curr_data.get('acml_vol') or 0)
+        events = self.alerts.on_quote(code, int(curr_data['stck_prpr']), float(curr_data['prdy_ctrt']),
+                                      volume or None)
+        if not events: return
+        name = (self.data or {}).get("stock_names", {}).get(code)
+        records = []
+        for event in events:
+            rule = event["rule"]
+            text = alerts.format_event(event, name)
+            logger.info(text.replace("\n", " "))
+            if rule["action"] == "notify":
+                self.notifier.notify(text)
+            else: # 주문도 위험 한도 검사를 거침 (같은 날 같은 방향은 한 번만 - 주문 관리자)
+                self.place_order(code, rule["qty"], rule["action"], event["price"])
+            records.append((event["ts"], self.trade_date, rule["id"], code, event["price"], text))
+        self.store.record_alerts(records) # 재시작 후 cooldown / 화면 표시용
+
+    # -----------------------------------------------------------
+    # [상태 확인] 일시정지/장 운영시간/토큰 -> 주문 가능하면 "running"
+    # -----------------------------------------------------------
+    def check_status(self, now):
+        self.roll_trade_date(now)
+        self.last_tick = now.strftime("%Y-%m-%d %H:%M:%S")
+
+        control = read_engine_control(self.control_file)
+        if control.get("paused"):
+            return "paused"
+        if not self.ignore_market_hours and not is_market_open(now):
+            return "market_closed"
+        try:
+            self.ensure_token()
+        except Exception as e:
+            self.last_error = str(e)
+            return "token_error"
+        return "running"
+
+    # -----------------------------------------------------------
+    # [틱 처리] auto_on 종목 전체 평가 후 주문
+    # -----------------------------------------------------------
+    def tick(self, now=None):
+        with metrics.timer("engine_tick_seconds"):
+            self._tick(now)
+
+    def _tick(self, now):
+        self.tick_started = time.perf_counter()
+        now = now or datetime.datetime.now()
+        status = self.check_status(now)
+        if status != "running":
+            self.write_state(status)
+            return
+
+        targets = dict(self.auto_targets())
+        self.refresh_alerts()
+        codes = list(targets) + sorted(self.alerts.codes() - set(targets)) # 알림 규칙만 있는 종목도 조회
+        self.poll_prices(codes, targets)
+        self.write_state("running")
+
+    def poll_prices(self, codes, targets):
+        # REST 현재가 일괄 조회 후 알림/매매 판단 (폴링 틱, 실시간 구독 한도 초과 종목)
+        prices, errors = self.loop.run_until_complete(self.async_api.get_current_prices(codes))
+        for code, error in errors.items():
+            self.last_error = f"{code}: {error}"
+            logger.warning("시세 조회 실패 %s: %s", code, error)
+
+        for code in codes:
+            if code not in prices: continue
+            try:
+                self.check_alerts(code, prices[code])
+                if code in targets: self.evaluate(code, targets[code], prices[code])
+            except Exception as e:
+                self.last_error = f"{code}: {e}"
+                logger.exception("종목 처리 실패 %s", code)
+
+    # -----------------------------------------------------------
+    # [실시간 틱 처리] 체결가가 들어오는 즉시 해당 종목만 판단
+    # -----------------------------------------------------------
+    def on_stream_tick(self, tick):
+        self.bars.on_tick(tick) # 분봉은 장 상태와 관계없이 계속 쌓음
+        if self.status != "running": return
+        setting = self.stream_targets.get(tick.code)
+        if setting is None and tick.code not in self.alerts.plan: return
+        self.tick_started = tick.recv_ts
+        try:
+            curr_data = tick_to_price_output(tick)
+            self.check_alerts(tick.code, curr_data)
+            if setting is not None: self.evaluate(tick.code, setting, curr_data)
+        except Exception as e:
+            self.last_error = f"{tick.code}: {e}"
+            logger.exception("종목 처리 실패 %s", tick.code)
+        latency_ms = (time.perf_counter() - tick.recv_ts) * 1000
+        self.latency_last_ms = latency_ms
+        self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+
+    def refresh_stream(self):
+        # 주기적으로 설정/상태를 다시 읽고 구독 종목을 관심종목과 맞춤
+        if not self.stream.alive():
+            # 수신 스레드가 죽으면 틱이 끊긴 채로 조용히 멈춤 -> 다시 띄움
+            self.last_error = "stream: 수신 스레드 종료, 다시 시작"
+            logger.error("실시간 수신 스레드가 종료됨 -> 다시 시작")
+            self.stream.start()
+        self.status = self.check_status(datetime.datetime.now())
+        self.stream_targets = dict(self.auto_targets())
+        self.refresh_alerts()
+        codes = list(self.stream_targets) + sorted(self.alerts.codes() - set(self.stream_targets))
+        # 구독 한도까지는 자동매매 종목 우선, 넘는 종목은 갱신 주기마다 REST 로 조회
+        overflow = codes[MAX_SUBSCRIPTIONS:]
+        if set(overflow) != set(self.stream_overflow):
+            if overflow:
+                logger.warning("실시간 구독 한도(%d) 초과 %d종목은 %.0f초마다 REST 조회: %s",
+                               MAX_SUBSCRIPTIONS, len(overflow), self.interval, ",".join(overflow))
+            else:
+                logger.info("실시간 구독 한도 초과 종목 없음 -> 전 종목 실시간")
+        self.stream_overflow = overflow
+        codes = codes[:MAX_SUBSCRIPTIONS]
+        self.stream.set_codes(codes)
+        self.bars.add_codes(codes)
+        if overflow and self.status == "running":
+            self.tick_started = time.perf_counter()
+            self.poll_prices(overflow, self.stream_targets)
+        self.write_state(self.status)
+
+    def evaluate(self, code, setting, curr_data):
+        current_price = int(curr_data['stck_prpr'])
+        yesterday_price = int(curr_data['stck_sdpr'])
+
+        final_buy_price, final_sell_price = calc_target_prices(setting, yesterday_price)
+        self.quotes[code] = {
+            "price": current_price,
+            "change_rate": float(curr_data['prdy_ctrt']),
+            "buy_price": final_buy_price,
+            "sell_price": final_sell_price,
+            "time": self.last_tick,
+        }
+
+        self.portfolio.on_price(code, current_price)
+        history = self.orders.history(code)
+        for side in decide_orders(current_price, final_buy_price, final_sell_price, history):
+            # 지정가 주문이면 목표가(호가 단위 맞춤)로, 시장가면 가격 무시
+            self.place_order(code, setting['qty'], side, final_buy_price if side == 'buy' else final_sell_price)
+
+    def place_order(self, code, qty, side, price):
+        # 위험 한도 검사 (수량을 줄이거나 막음) -> 통과한 수량만 주문, 접수되면 현금/매도 수량 예약
+        if side == 'buy': qty = self.portfolio.size(code, price, qty)
+        qty, reason = self.portfolio.check(code, side, qty, price)
+        if qty <= 0:
+            metrics.inc("risk_blocked_total", side=side, reason=reason)
+            if self.risk_blocks.get((code, side)) != reason:
+                self.risk_blocks[(code, side)] = reason
+                logger.info("주문 차단 %s %s: %s", code, side, reason)
+            return
+        if reason: metrics.inc("risk_reduced_total", side=side, reason=reason)
+        order = self.orders.submit(code, side, qty, price)
+        if order is not None:
+            self.portfolio.reserve(order, price)
+            if self.tick_started is not None:
+                metrics.observe("tick_to_order_seconds", time.perf_counter() - self.tick_started,
+                                mode="stream" if self.stream else "poll")
+            logger.info("주문 요청 %s %s %s주 (%s)", code, side, qty, order['client_id'])
+
+    # -----------------------------------------------------------
+    # [주문 결과] 주문 관리자 스레드에서 호출 - 실제 체결 시에만 알림
+    # -----------------------------------------------------------
+    def on_fill(self, order, qty, price):
+        self.portfolio.on_fill(order, qty, price)
+        name = (self.data or {}).get("stock_names", {}).get(order['code'], order['code'])
+        label = "매수" if order['side'] == 'buy' else "매도"
+        done = "체결" if order['filled_qty'] >= order['qty'] else f"부분체결 {order['filled_qty']}/{order['qty']}"
+        msg = f"[{label}] {name} {done}\n가격: {price}원\n수량: {qty}주"
+        logger.info(msg.replace("\n", " "))
+        self.notifier.notify(msg)
+
+    def on_reject(self, order):
+        self.portfolio.release(order)
+        self.last_error = f"{order['code']} {order['side']} 주문 실패: {order.get('msg', '')}"
+        logger.warning(self.last_error)
+
+    def intraday_state(self):
+        # 종목별 분봉 주기별 마지막 봉 + AI 점수 (관심종목 전체를 배열로 한 번에 계산)
+        state = {}
+        for minutes, buf in self.bars.buffers.items():
+            codes, scores = self.bars.scores(minutes)
+            for code, score in zip(codes, scores["score"]):
+                bar = buf.last_bar(code)
+                if bar is None: continue
+                bar["score"] = None if score != score else float(score) # NaN: 봉 부족
+                state.setdefault(code, {})[f"{minutes}m"] = bar
+        return state
+
+    def write_state(self, status):
+        state = {
+            "status": status,
+            "pid": os.getpid(),
+            "interval": self.interval,
+            "last_tick": self.last_tick,
+            "last_error": self.last_error,
+            "trade_date": self.trade_date,
+            "orders": self.orders.metrics(),
+            "quotes": self.quotes,
+            "stream": None if self.stream is None else {
+                "alive": self.stream.alive(),
+                "connected": self.stream.connected,
+                "reconnects": self.stream.reconnects,
+                "frames": self.stream.frames,
+                "bad_frames": self.stream.bad_frames,
+                "overflow": len(self.stream_overflow),
+                "latency_last_ms": self.latency_last_ms,
+                "latency_max_ms": self.latency_max_ms,
+                "bars": self.intraday_state(),
+            },
+            "notifier": self.notifier.metrics(),
+            "token": self.api.tokens.status(),
+            "portfolio": self.portfolio.status(),
+            "alerts": self.alerts.status(),
+            "metrics": metrics.snapshot(),
+        }
+        write_json_atomic(self.state_file, state, indent=2)
+
+    # -----------------------------------------------------------
+    # [메인 루프] 고정 주기 스케줄 (처리 시간만큼 대기 시간 차감)
+    # -----------------------------------------------------------
+    def run(self):
+        self.ensure_token()
+        self.api.tokens.start() # 만료 전 백그라운드 재발급 (엔진만)
+        self.notifier.start()
+        self.orders.start()
+        self.portfolio.start()
+        self.update_atr()
+
+        next_tick = time.monotonic()
+        try:
+            while True:
+                self.tick()
+                next_tick += self.interval
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.monotonic() # 밀린 틱은 건너뜀
+        finally:
+            self.orders.stop()
+            self.portfolio.stop()
+            self.notifier.stop()
+            self.api.tokens.stop()
+            self.write_state("stopped")
+            self.loop.run_until_complete(self.async_api.close())
+            self.loop.close()
+
+    def run_stream(self, ws_url=None):
+        self.ensure_token()
+        self.api.tokens.start() # 만료 전 백그라운드 재발급 (엔진만)
+        self.notifier.start()
+        self.orders.start()
+        self.portfolio.start()
+        self.update_atr()
+        tick_queue = queue.Queue()
+        self.stream = KisStream.from_api(self.api, [code for code, _ in self.auto_targets()])
+        if ws_url: self.stream.url = ws_url
+        self.stream.add_listener(tick_queue.put)
+        self.stream.start()
+
+        next_refresh = time.monotonic()
+        try:
+            while True:
+                try:
+                    tick = tick_queue.get(timeout=max(0.0, next_refresh - time.monotonic()))
+                except queue.Empty:
+                    tick = None
+                if tick is not None:
+                    self.on_stream_tick(tick)
+                if time.monotonic() >= next_refresh:
+                    self.refresh_stream()
+                    next_refresh = time.monotonic() + self.interval
+        finally:
+            self.stream.stop()
+            self.orders.stop()
+            self.portfolio.stop()
+            self.notifier.stop()
+            self.api.tokens.stop()
+            self.write_state("stopped")
+            self.loop.run_until_complete(self.async_api.close()) # 구독 한도 초과 종목 조회 세션
+            self.loop.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="관심종목 자동매매 엔진")
+    parser.add_argument("--interval", type=float, default=5.0, help="틱 주기 (초)")
+    parser.add_argument("--ignore-market-hours", action="store_true", help="장 운영시간 외에도 검사")
+    parser.add_argument("--stream", action="store_true", help="웹소켓 실시간 체결가 사용 (폴링 대신)")
+    parser.add_argument("--ws-url", help="웹소켓 주소 변경 (예: stream_replay.py 재생 서버)")
+    parser.add_argument("--order-type", choices=["market", "limit"], default="market",
+                        help="limit: 목표가 지정가 주문 (호가 단위 맞춤)")
+    parser.add_argument("--sizing", choices=["fixed", "cash", "atr"], default=DEFAULT_LIMITS["sizing"],
+                        help="매수 수량: fixed(종목 설정 수량) / cash(순자산 비율) / atr(ATR 위험 비율)")
+    parser.add_argument("--max-position-pct", type=float, default=DEFAULT_LIMITS["max_position_pct"],
+                        help="종목당 순자산 대비 최대 보유 비율")
+    parser.add_argument("--max-exposure-pct", type=float, default=DEFAULT_LIMITS["max_exposure_pct"],
+                        help="전체 주식 평가금액 최대 비율")
+    parser.add_argument("--daily-loss-pct", type=float, default=DEFAULT_LIMITS["daily_loss_pct"],
+                        help="오늘 손실이 이 비율을 넘으면 매수 중단 (0 = 제한 없음)")
+    parser.add_argument("--metrics-port", type=int, help="Prometheus 지표 엔드포인트 포트 (예: 9108 -> /metrics)")
+    parser.add_argument("--profile", nargs="?", const="engine_tick.prof", metavar="FILE",
+                        help="틱 1회를 cProfile 로 기록하고 종료 (기본 engine_tick.prof)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    risk_limits = {"sizing": args.sizing, "max_position_pct": args.max_position_pct,
+                   "max_exposure_pct": args.max_exposure_pct, "daily_loss_pct": args.daily_loss_pct}
+    if args.profile:
+        # stock_bot.db 복사본 + 임시 상태 파일로 틱 한 번 (주문 관리자/알림 스레드 없음)
+        #   틱에서 만든 주문(status=new)/알림 기록은 복사본에만 남고 지워짐
+        #   -> 다음 실제 실행에서 전송되거나 오늘 주문 자리를 차지하지 않음
+        profile_dir = tempfile.mkdtemp(prefix="engine_profile_")
+        try:
+            live = StateStore()
+            live.backup(os.path.join(profile_dir, "stock_bot.db"))
+            live.close()
+            store = StateStore(os.path.join(profile_dir, "stock_bot.db"), legacy_json=None)
+            engine = TradingEngine(interval=args.interval, store=store, ignore_market_hours=args.ignore_market_hours,
+                                   state_file=os.path.join(profile_dir, STATE_FILE),
+                                   order_type=args.order_type, risk_limits=risk_limits)
+            engine.ensure_token()
+            engine.portfolio.refresh()
+            print(metrics.profile_call(engine.tick, args.profile))
+            engine.loop.run_until_complete(engine.async_api.close())
+            store.close()
+        finally:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+        print(f"프로파일 저장: {args.profile} (python -m pstats {args.profile} / snakeviz 로 확인)")
+        return
+    engine = TradingEngine(interval=args.interval, ignore_market_hours=args.ignore_market_hours,
+                           order_type=args.order_type, risk_limits=risk_limits)
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+    try:
+        if args.stream:
+            engine.run_stream(args.ws_url)
+        else:
+            engine.run()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
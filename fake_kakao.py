@@ -0,0 +1,82 @@
+import argparse
+import http.server
+import json
+import threading
+import time
+import urllib.parse
+
+# ==========================================
+# [가짜 카카오 서버] 알림 발송 로컬 테스트용
+#   실행: python fake_kakao.py --port 8766 --fail-rate 0.2
+#   config.py 에 KAKAO_API_URL = KAKAO_AUTH_URL = "http://127.0.0.1:8766" 설정
+#   - 받은 메시지는 received 목록에 저장
+#   - expire_token() 호출 뒤 첫 요청은 401 (토큰 재발급 흐름 확인)
+# ==========================================
+
+class FakeKakao:
+    def __init__(self, host="127.0.0.1", port=8766, latency=0.0, fail_rate=0.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.received = []
+        self.token = "fake-token"
+        self.requests = 0
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args): pass
+
+            def _reply(self, status, body):
+                raw = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = urllib.parse.parse_qs(self.rfile.read(length).decode())
+                fake.requests += 1
+                if fake.latency: time.sleep(fake.latency)
+
+                if self.path == "/oauth/token":
+                    fake.token = f"fake-token-{fake.requests}"
+                    return self._reply(200, {"access_token": fake.token, "expires_in": 21599})
+                if self.path != "/v2/api/talk/memo/default/send":
+                    return self._reply(404, {"msg": "not found"})
+                if self.headers.get("Authorization") != f"Bearer {fake.token}":
+                    return self._reply(401, {"msg": "this access token does not exist", "code": -401})
+                if fake.fail_rate and (fake.requests * 7919) % 100 < fake.fail_rate * 100:
+                    return self._reply(500, {"msg": "internal error"})
+                template = json.loads(form["template_object"][0])
+                fake.received.append(template["text"])
+                self._reply(200, {"result_code": 0})
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def expire_token(self):
+        self.token = "expired"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 카카오 메시지 서버")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0, help="응답 지연 (초)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="500 응답 비율 (0~1)")
+    args = parser.parse_args()
+    fake = FakeKakao(port=args.port, latency=args.latency, fail_rate=args.fail_rate)
+    print(f"fake kakao: {fake.url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        for text in fake.received: print(text, end="\n---\n")
+
+if __name__ == "__main__":
+    main()
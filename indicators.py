@@ -0,0 +1,301 @@
+import numpy as np
+
+# ==========================================
+# [지표 계산] NumPy 벡터화 (종목 x 일자 2차원 배열 한 번에 계산)
+#   - 입력이 1차원이면 결과도 1차원
+#   - 상장 전 구간 등 앞쪽 NaN 패딩 허용 (윈도우가 다 찰 때까지 NaN)
+#   - IncrementalIndicators: 새 봉/틱마다 O(1) 로 갱신하는 누적 상태
+# ==========================================
+
+def _as2d(x):
+    x = np.asarray(x, dtype=float)
+    return (x[np.newaxis, :], True) if x.ndim == 1 else (x, False)
+
+def _restore(out, squeeze):
+    return out[0] if squeeze else out
+
+def _rolling_sum(x, n):
+    # NaN 은 0 으로 더하고, 윈도우 안 유효 개수가 n 개일 때만 값 인정
+    valid = ~np.isnan(x)
+    csum = np.cumsum(np.where(valid, x, 0.0), axis=1)
+    ccnt = np.cumsum(valid, axis=1)
+    csum = np.concatenate([np.zeros((x.shape[0], 1)), csum], axis=1)
+    ccnt = np.concatenate([np.zeros((x.shape[0], 1), dtype=ccnt.dtype), ccnt], axis=1)
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= n:
+        sums = csum[:, n:] - csum[:, :-n]
+        counts = ccnt[:, n:] - ccnt[:, :-n]
+        out[:, n - 1:] = np.where(counts == n, sums, np.nan)
+    return out
+
+def sma(x, n):
+    x, squeeze = _as2d(x)
+    return _restore(_rolling_sum(x, n) / n, squeeze)
+
+def rolling_std(x, n):
+    x, squeeze = _as2d(x)
+    mean = _rolling_sum(x, n) / n
+    var = _rolling_sum(x * x, n) / n - mean * mean
+    return _restore(np.sqrt(np.maximum(var, 0.0)), squeeze)
+
+def _recursive_smooth(x, alpha, seed_n=1):
+    # y[t] = y[t-1] + alpha * (x[t] - y[t-1]), 종목마다 첫 seed_n 개 평균으로 시작
+    rows, cols = x.shape
+    out = np.full(x.shape, np.nan)
+    state = np.full(rows, np.nan)
+    seen = np.zeros(rows, dtype=int)
+    seed_sum = np.zeros(rows)
+    for t in range(cols):
+        v = x[:, t]
+        ok = ~np.isnan(v)
+        seeding = ok & (seen < seed_n)
+        seed_sum[seeding] += v[seeding]
+        seen[ok] += 1
+        just_seeded = seeding & (seen == seed_n)
+        state[just_seeded] = seed_sum[just_seeded] / seed_n
+        running = ok & ~seeding
+        state[running] += alpha * (v[running] - state[running])
+        out[:, t] = np.where(seen >= seed_n, state, np.nan)
+    return out
+
+def ema(x, n):
+    x, squeeze = _as2d(x)
+    return _restore(_recursive_smooth(x, 2.0 / (n + 1)), squeeze)
+
+def _diff(x):
+    d = np.full(x.shape, np.nan)
+    d[:, 1:] = x[:, 1:] - x[:, :-1]
+    return d
+
+def _rsi_from(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+def rsi(close, n=14):
+    # 단순이동평균 RSI (기존 analyze_market_signal 과 같은 방식)
+    close, squeeze = _as2d(close)
+    delta = _diff(close)
+    gain = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+    loss = np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0))
+    return _restore(_rsi_from(_rolling_sum(gain, n) / n, _rolling_sum(loss, n) / n), squeeze)
+
+def wilder_rsi(close, n=14):
+    close, squeeze = _as2d(close)
+    delta = _diff(close)
+    gain = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+    loss = np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0))
+    avg_gain = _recursive_smooth(gain, 1.0 / n, seed_n=n)
+    avg_loss = _recursive_smooth(loss, 1.0 / n, seed_n=n)
+    return _restore(_rsi_from(avg_gain, avg_loss), squeeze)
+
+def bollinger(close, n=20, k=2.0):
+    close, squeeze = _as2d(close)
+    mid = _rolling_sum(close, n) / n
+    var = _rolling_sum(close * close, n) / n - mid * mid
+    band = k * np.sqrt(np.maximum(var, 0.0))
+    return _restore(mid, squeeze), _restore(mid + band, squeeze), _restore(mid - band, squeeze)
+
+def macd(close, fast=12, slow=26, signal=9):
+    close, squeeze = _as2d(close)
+    line = _recursive_smooth(close, 2.0 / (fast + 1)) - _recursive_smooth(close, 2.0 / (slow + 1))
+    sig = _recursive_smooth(line, 2.0 / (signal + 1))
+    return _restore(line, squeeze), _restore(sig, squeeze), _restore(line - sig, squeeze)
+
+def true_range(high, low, close):
+    high, squeeze = _as2d(high)
+    low, _ = _as2d(low)
+    close, _ = _as2d(close)
+    prev_close = np.full(close.shape, np.nan)
+    prev_close[:, 1:] = close[:, :-1]
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return _restore(tr, squeeze)
+
+def atr(high, low, close, n=14):
+    tr, squeeze = _as2d(true_range(high, low, close))
+    return _restore(_recursive_smooth(tr, 1.0 / n, seed_n=n), squeeze)
+
+# -----------------------------------------------------------
+# [AI 점수] analyze_market_signal 의 점수 규칙을 전 종목에 한 번에 적용
+#   close/volume: (종목 x 일자), current_price: (종목,) -> 마지막 날 기준
+# -----------------------------------------------------------
+SIGNAL_LABELS = (
+    (4, "강력 매수", "red"),
+    (2, "매수 우위", "orange"),
+)
+
+def score_components(ma5, ma20, vol, vol_ma5, rsi_val, current_price):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vol_ratio = np.where(vol_ma5 > 0, vol / vol_ma5 * 100, 0.0)
+    score = (
+        (current_price > ma20).astype(int)
+        + (ma5 > ma20)
+        + (vol_ratio > 100)
+        + (vol_ratio > 200)
+        + np.where(rsi_val < 30, 2, np.where(rsi_val > 70, -2, 0))
+    )
+    return score, vol_ratio
+
+def signal_scores(close, volume, current_price=None):
+    close, squeeze = _as2d(close)
+    volume, _ = _as2d(volume)
+    if current_price is None:
+        current_price = close[:, -1]
+    current_price = np.asarray(current_price, dtype=float).reshape(-1)
+
+    ma5 = (_rolling_sum(close[:, -5:], 5) / 5)[:, -1]
+    ma20 = (_rolling_sum(close[:, -20:], 20) / 20)[:, -1]
+    vol_ma5 = (_rolling_sum(volume[:, -5:], 5) / 5)[:, -1]
+    rsi_val = rsi(close[:, -15:], 14)[:, -1]
+    score, vol_ratio = score_components(ma5, ma20, volume[:, -1], vol_ma5, rsi_val, current_price)
+    result = {"score": score, "rsi": rsi_val, "vol_ratio": vol_ratio, "ma5": ma5, "ma20": ma20}
+    if squeeze:
+        return {k: v[0] for k, v in result.items()}
+    return result
+
+def signal_label(score):
+    for threshold, label, color in SIGNAL_LABELS:
+        if score >= threshold: return label, color
+    if score <= -1: return "매도 우위", "blue"
+    return "관망 (Hold)", "gray"
+
+# ==========================================
+# [증분 계산] 종목 N개의 지표 상태를 봉 하나당 O(1) 로 갱신
+#   push_bar(): 새 봉 확정 / update_last(): 진행 중인 마지막 봉 갱신 (틱)
+# ==========================================
+class IncrementalIndicators:
+    WINDOWS = {"ma5": 5, "ma20": 20, "vol5": 5, "rsi": 14}
+
+    def __init__(self, n_symbols, ema_spans=(12, 26), wilder_n=14):
+        self.n = n_symbols
+        self.count = np.zeros(n_symbols, dtype=int) # 확정 봉 수 (종목마다 다를 수 있음)
+        self.rings = {k: np.zeros((n_symbols, w)) for k, w in self.WINDOWS.items()}
+        self.rings["loss"] = np.zeros((n_symbols, self.WINDOWS["rsi"]))
+        self.sums = {k: np.zeros(n_symbols) for k in self.rings}
+        self.pos = {k: np.zeros(n_symbols, dtype=int) for k in self.rings}
+
+        self.ema_spans = ema_spans
+        self.ema = {s: np.full(n_symbols, np.nan) for s in ema_spans}
+        self.wilder_n = wilder_n
+        self.avg_gain = np.full(n_symbols, np.nan)
+        self.avg_loss = np.full(n_symbols, np.nan)
+        self.atr = np.full(n_symbols, np.nan)
+        self.tr_sum = np.zeros(n_symbols)
+
+        self.last_close = np.full(n_symbols, np.nan)
+        self.last_volume = np.zeros(n_symbols)
+        self.prev_close = np.full(n_symbols, np.nan) # 마지막 봉 직전 종가
+        self._undo = None # update_last 용: 마지막 봉 반영 전 상태
+
+    def _ring_push(self, key, idx, values):
+        ring, pos = self.rings[key], self.pos[key]
+        p = pos[idx]
+        self.sums[key][idx] += values - ring[idx, p]
+        ring[idx, p] = values
+        pos[idx] = (p + 1) % ring.shape[1]
+
+    def _ring_replace_last(self, key, idx, values):
+        ring, pos = self.rings[key], self.pos[key]
+        p = (pos[idx] - 1) % ring.shape[1]
+        self.sums[key][idx] += values - ring[idx, p]
+        ring[idx, p] = values
+
+    def _snapshot(self, idx):
+        return (idx, {s: e[idx].copy() for s, e in self.ema.items()},
+                self.avg_gain[idx].copy(), self.avg_loss[idx].copy(), self.atr[idx].copy(), self.tr_sum[idx].copy())
+
+    def _smooth_state(self, idx, close, high, low):
+        count = self.count[idx]
+        for span, state in self.ema.items():
+            alpha = 2.0 / (span + 1)
+            cur = state[idx]
+            state[idx] = np.where(np.isnan(cur), close, cur + alpha * (close - cur))
+
+        prev = self.prev_close[idx]
+        delta = np.where(np.isnan(prev), 0.0, close - prev)
+        gain, loss = np.maximum(delta, 0.0), np.maximum(-delta, 0.0)
+        n = self.wilder_n
+        seeded = count > n + 1
+        # 처음 n 개 변화량은 단순평균으로 시작 (count 는 이번 봉 포함)
+        self.avg_gain[idx] = np.where(seeded, self.avg_gain[idx] + (gain - self.avg_gain[idx]) / n,
+                                      np.where(count == n + 1, self.sums["rsi"][idx] / n, np.nan))
+        self.avg_loss[idx] = np.where(seeded, self.avg_loss[idx] + (loss - self.avg_loss[idx]) / n,
+                                      np.where(count == n + 1, self.sums["loss"][idx] / n, np.nan))
+
+        if high is not None and low is not None:
+            tr = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+            cur = self.atr[idx]
+            # 처음 n 개 TR 은 단순평균으로 시작
+            self.tr_sum[idx] += np.where(count <= n, tr, 0.0)
+            self.atr[idx] = np.where(count > n, cur + (tr - cur) / n,
+                                     np.where(count == n, self.tr_sum[idx] / n, np.nan))
+
+    def push_bar(self, close, volume, high=None, low=None, idx=None):
+        idx = np.arange(self.n) if idx is None else np.asarray(idx)
+        close = np.asarray(close, dtype=float)
+        volume = np.asarray(volume, dtype=float)
+        prev = self.last_close[idx]
+        delta = np.where(np.isnan(prev), 0.0, close - prev)
+
+        self._undo = self._snapshot(idx)
+        self.prev_close[idx] = prev
+        self.count[idx] += 1
+        self._ring_push("ma5", idx, close)
+        self._ring_push("ma20", idx, close)
+        self._ring_push("vol5", idx, volume)
+        self._ring_push("rsi", idx, np.maximum(delta, 0.0))
+        self._ring_push("loss", idx, np.maximum(-delta, 0.0))
+        self._smooth_state(idx, close, None if high is None else np.asarray(high, float),
+                           None if low is None else np.asarray(low, float))
+        self.last_close[idx] = close
+        self.last_volume[idx] = volume
+
+    def update_last(self, close, volume, high=None, low=None, idx=None):
+        # 진행 중인 봉(오늘 봉)의 값만 바꿈: 링버퍼 한 칸 교체 + 평활 상태는 직전 값에서 다시 계산
+        idx = np.arange(self.n) if idx is None else np.asarray(idx)
+        close = np.asarray(close, dtype=float)
+        volume = np.asarray(volume, dtype=float)
+        prev = self.prev_close[idx]
+        delta = np.where(np.isnan(prev), 0.0, close - prev)
+
+        self._ring_replace_last("ma5", idx, close)
+        self._ring_replace_last("ma20", idx, close)
+        self._ring_replace_last("vol5", idx, volume)
+        self._ring_replace_last("rsi", idx, np.maximum(delta, 0.0))
+        self._ring_replace_last("loss", idx, np.maximum(-delta, 0.0))
+        if self._undo is not None and np.array_equal(self._undo[0], idx):
+            _, ema_state, avg_gain, avg_loss, atr_state, tr_sum = self._undo
+            for s, e in ema_state.items(): self.ema[s][idx] = e
+            self.avg_gain[idx], self.avg_loss[idx], self.atr[idx] = avg_gain, avg_loss, atr_state
+            self.tr_sum[idx] = tr_sum
+            self._smooth_state(idx, close, None if high is None else np.asarray(high, float),
+                               None if low is None else np.asarray(low, float))
+        self.last_close[idx] = close
+        self.last_volume[idx] = volume
+
+    # -----------------------------------------------------------
+    # [현재 값] 윈도우가 덜 찬 종목은 NaN
+    # -----------------------------------------------------------
+    def _mean(self, key):
+        w = self.rings[key].shape[1]
+        return np.where(self.count >= w, self.sums[key] / w, np.nan)
+
+    def values(self):
+        avg_gain = np.where(self.count > self.WINDOWS["rsi"], self.sums["rsi"] / self.WINDOWS["rsi"], np.nan)
+        avg_loss = np.where(self.count > self.WINDOWS["rsi"], self.sums["loss"] / self.WINDOWS["rsi"], np.nan)
+        fast, slow = self.ema_spans[0], self.ema_spans[-1]
+        return {
+            "ma5": self._mean("ma5"),
+            "ma20": self._mean("ma20"),
+            "vol_ma5": self._mean("vol5"),
+            "rsi": _rsi_from(avg_gain, avg_loss),
+            "wilder_rsi": _rsi_from(self.avg_gain, self.avg_loss),
+            "macd": self.ema[fast] - self.ema[slow],
+            "atr": self.atr,
+        }
+
+    def scores(self, current_price=None):
+        v = self.values()
+        price = self.last_close if current_price is None else np.asarray(current_price, dtype=float)
+        score, vol_ratio = score_components(v["ma5"], v["ma20"], self.last_volume, v["vol_ma5"], v["rsi"], price)
+        return score, v["rsi"], vol_ratio
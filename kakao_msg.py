@@ -1,20 +1,46 @@
 import requests
 import json
-import streamlit as st
+import threading
+from app_config import get_config
 
-def send_message(text):
-    url = "https://kapi.kakao.com/v2/api/talk/memo/default/send"
-    
-    # 토큰 가져오기 (서버 -> 로컬 순서)
-    try:
-        token = st.secrets["KAKAO_TOKEN"]
-    except:
-        import config
-        token = config.KAKAO_TOKEN
+# 카카오 API 주소 (로컬 테스트 시 KAKAO_API_URL / KAKAO_AUTH_URL 로 변경)
+DEFAULT_API_URL = "https://kapi.kakao.com"
+DEFAULT_AUTH_URL = "https://kauth.kakao.com"
+TEXT_LIMIT = 200 # 텍스트 템플릿 최대 글자 수
 
-    headers = {
-        "Authorization": "Bearer " + token
-    }
+# -----------------------------------------------------------
+# [토큰 관리] 한 번 읽어서 보관, 401 이면 refresh_token 으로 재발급
+# -----------------------------------------------------------
+_token = None
+_token_lock = threading.Lock()
+_session = requests.Session()
+
+def get_token():
+    global _token
+    with _token_lock:
+        if _token is None:
+            _token = get_config("KAKAO_TOKEN", None)
+        return _token
+
+def refresh_token():
+    # KAKAO_REST_KEY + KAKAO_REFRESH_TOKEN 이 있을 때만 가능
+    global _token
+    rest_key = get_config("KAKAO_REST_KEY", None)
+    refresh = get_config("KAKAO_REFRESH_TOKEN", None)
+    if not rest_key or not refresh:
+        return False
+
+    url = f"{get_config('KAKAO_AUTH_URL', DEFAULT_AUTH_URL)}/oauth/token"
+    data = {"grant_type": "refresh_token", "client_id": rest_key, "refresh_token": refresh}
+    res = _session.post(url, data=data, timeout=5)
+    if res.status_code != 200 or 'access_token' not in res.json():
+        return False
+    with _token_lock:
+        _token = res.json()['access_token']
+    return True
+
+def send_message(text):
+    url = f"{get_config('KAKAO_API_URL', DEFAULT_API_URL)}/v2/api/talk/memo/default/send"
     
     data = {
         "template_object": json.dumps({
@@ -28,8 +54,17 @@ def send_message(text):
         })
     }
     
-    response = requests.post(url, headers=headers, data=data)
+    for attempt in range(2):
+        headers = {
+            "Authorization": "Bearer " + get_token()
+        }
+        response = _session.post(url, headers=headers, data=data, timeout=5)
+        # 토큰 만료 -> 재발급 후 한 번 더
+        if response.status_code == 401 and attempt == 0 and refresh_token():
+            continue
+        break
+
     if response.status_code == 200:
         return True
     else:
-        return False
\ No newline at end of file
+        return False
@@ -1,187 +1,416 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import time
 import pandas as pd
-import streamlit as st
 import datetime # 날짜 계산을 위해 필수
-import os
+import metrics
+from app_config import get_config
+from rate_limit import get_limiter
+from token_manager import get_token_manager, TOKEN_FILE
+
+# 타임아웃 (연결, 응답) 초
+REQUEST_TIMEOUT = (3.05, 10)
+# 스로틀(EGW00201) 응답 시 재시도 횟수
+THROTTLE_RETRIES = 3
+THROTTLE_MSG_CD = "EGW00201"
+# 토큰 만료/무효 응답 -> 토큰 재발급 후 1회 재시도
+TOKEN_EXPIRED_MSG_CDS = ("EGW00123", "EGW00121")
+TOKEN_PATH = "oauth2/tokenP"
+
+class KisApiError(Exception):
+    def __init__(self, msg_cd, msg, status_code=None):
+        super().__init__(f"[{msg_cd}] {msg}")
+        self.msg_cd = msg_cd
+        self.msg = msg
+        self.status_code = status_code
+
+def endpoint_name(path):
+    # 지표 라벨용 (uapi/.../quotations/inquire-price -> inquire-price)
+    return path.rsplit("/", 1)[-1]
+
+def record_response(endpoint, status_code, payload):
+    # 오류 응답 집계 (rt_cd/msg_cd 별) - 동기/비동기 클라이언트 공용
+    rt_cd = payload.get('rt_cd', '0' if status_code == 200 else '')
+    if status_code != 200 or rt_cd != '0':
+        metrics.inc("kis_errors_total", endpoint=endpoint, status=status_code, rt_cd=rt_cd,
+                    msg_cd=payload.get('msg_cd', payload.get('error_code', '')))
+
+def create_session(pool_size=10):
+    # keep-alive 커넥션 풀 + 5xx/전송 오류 재시도 (GET 만 응답 재시도, 연결 실패는 전부 재시도)
+    retry = Retry(
+        total=3, connect=3, read=2, status=2,
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+PRICE_PATH = "uapi/domestic-stock/v1/quotations/inquire-price"
+PRICE_TR_ID = "FHKST01010100"
+DAILY_CHART_PATH = "uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice"
+DAILY_CHART_TR_ID = "FHKST03010100"
+DAILY_CHART_MAX_ROWS = 100 # 기간별 시세는 1회 호출에 최대 100건
+ORDER_PATH = "uapi/domestic-stock/v1/trading/order-cash"
+ORDER_TR_ID = {"buy": "VTTC0802U", "sell": "VTTC0801U"}
+ORD_DVSN_LIMIT = "00" # 지정가
+ORD_DVSN_MARKET = "01" # 시장가
+CCLD_PATH = "uapi/domestic-stock/v1/trading/inquire-daily-ccld"
+CCLD_TR_ID = "VTTC8001R" # 일별 주문체결 조회 (3개월 이내)
+CCLD_MAX_PAGES = 20
+BALANCE_PATH = "uapi/domestic-stock/v1/trading/inquire-balance"
+BALANCE_TR_ID = "VTTC8434R" # 주식잔고 조회 (모의투자)
+BALANCE_MAX_PAGES = 10
+MINUTE_CHART_PATH = "uapi/domestic-stock/v1/quotations/inquire-time-itemchartprice"
+MINUTE_CHART_TR_ID = "FHKST03010200" # 당일 분봉 (1회 30건, 기준 시각부터 과거 방향)
+MINUTE_CHART_MAX_PAGES = 14 # 09:00~15:30 = 390분
+MARKET_OPEN_HHMMSS = "090000"
+REAL_WS_URL = "ws://ops.koreainvestment.com:21000"
+VTS_WS_URL = "ws://ops.koreainvestment.com:31000"
+
+# -----------------------------------------------------------
+# [응답 파싱] 동기/비동기 클라이언트 공용
+# -----------------------------------------------------------
+def parse_current_price(data):
+    if 'output' not in data:
+        raise KisApiError(data.get('msg_cd', ''), data.get('msg1', '현재가 응답에 output 없음'))
+    return data['output']
+
+def daily_price_params(stock_code, n_days):
+    # 날짜 계산 (오늘 ~ n일 전)
+    end_dt = datetime.datetime.now()
+    start_dt = end_dt - datetime.timedelta(days=n_days)
+    return daily_range_params(stock_code, start_dt.strftime("%Y%m%d"), end_dt.strftime("%Y%m%d"))
+
+def daily_range_params(stock_code, str_start, str_end):
+    return {
+        "fid_cond_mrkt_div_code": "J",
+        "fid_input_iscd": stock_code,
+        "fid_input_date_1": str_start,
+        "fid_input_date_2": str_end,
+        "fid_period_div_code": "D",
+        "fid_org_adj_prc": "1"
+    }
+
+def parse_daily_chart(res):
+    # 데이터 파싱 (output2 사용)
+    if 'output2' not in res:
+        return pd.DataFrame()
+    df = pd.DataFrame(res['output2'])
+    if df.empty or 'stck_bsop_date' not in df: return pd.DataFrame()
+    df = df[df['stck_bsop_date'].fillna('') != ''] # 데이터 없는 날은 빈 행으로 옴
+    if df.empty: return pd.DataFrame()
+
+    df = df[['stck_bsop_date', 'stck_oprc', 'stck_hgpr', 'stck_lwpr', 'stck_clpr', 'acml_vol']]
+    df.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+    df['Date'] = pd.to_datetime(df['Date'], format='%Y%m%d')
+    for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        df[col] = pd.to_numeric(df[col])
+
+    return df.sort_values('Date')
+
+def minute_params(stock_code, hhmmss):
+    return {
+        "FID_ETC_CLS_CODE": "",
+        "FID_COND_MRKT_DIV_CODE": "J",
+        "FID_INPUT_ISCD": stock_code,
+        "FID_INPUT_HOUR_1": hhmmss, # 이 시각 이전 30건
+        "FID_PW_DATA_INCU_YN": "Y"
+    }
+
+def parse_minute_chart(res):
+    # 분봉 (output2, 최신순) -> Date(봉 시작 시각)/OHLCV 시간순
+    rows = res.get('output2') or []
+    df = pd.DataFrame(rows)
+    if df.empty or 'stck_cntg_hour' not in df: return pd.DataFrame()
+    df = df[df['stck_cntg_hour'].fillna('') != '']
+    if df.empty: return pd.DataFrame()
+
+    df = df[['stck_bsop_date', 'stck_cntg_hour', 'stck_oprc', 'stck_hgpr', 'stck_lwpr', 'stck_prpr', 'cntg_vol']]
+    df.columns = ['Day', 'Time', 'Open', 'High', 'Low', 'Close', 'Volume']
+    df.insert(0, 'Date', pd.to_datetime(df['Day'] + df['Time'], format='%Y%m%d%H%M%S'))
+    for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        df[col] = pd.to_numeric(df[col])
+    return df.drop(columns=['Day', 'Time']).sort_values('Date')
 
 class KisApi:
-    def __init__(self):
+    def __init__(self, app_key=None, app_secret=None, base_url=None, cano=None, acnt_prdt_cd=None,
+                 ws_url=None, rate=None, token_path=TOKEN_FILE):
+        # 인자로 키를 주면 시크릿/config 대신 사용 (mock_kis_server.py / bench.py 등 로컬 테스트용)
         self.base_url = "https://openapivts.koreainvestment.com:29443"
-        self.token = None
-        self.token_file = "token_cache.json" # 토큰 저장 파일명
-        
+
         # 1. 시크릿/Config 로딩
-        try:
-            self.app_key = st.secrets["APP_KEY"]
-            self.app_secret = st.secrets["APP_SECRET"]
-            self.base_url = st.secrets["URL_BASE"]
-        except:
-            import config 
-            self.app_key = config.APP_KEY
-            self.app_secret = config.APP_SECRET
-            self.base_url = config.URL_BASE
-
-    # -----------------------------------------------------------
-    # [토큰 관리] 파일 저장/로드 (카톡 알림 방지)
-    # -----------------------------------------------------------
-    def save_token_to_file(self, token):
-        data = {
-            "token": token,
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        with open(self.token_file, "w") as f:
-            json.dump(data, f)
+        if app_key:
+            self.app_key, self.app_secret = app_key, app_secret
+            self.base_url = base_url or self.base_url
+        else: # 시크릿 -> config.py (app_config.py, 엔진 프로세스에서도 streamlit 을 import 하지 않음)
+            self.app_key = get_config("APP_KEY")
+            self.app_secret = get_config("APP_SECRET")
+            self.base_url = get_config("URL_BASE")
 
-    def load_token_from_file(self):
-        if not os.path.exists(self.token_file):
-            return None 
-        
-        try:
-            with open(self.token_file, "r") as f:
-                data = json.load(f)
-            
-            # 6시간(21600초) 유효성 체크
-            saved_time = datetime.datetime.strptime(data['timestamp'], "%Y-%m-%d %H:%M:%S")
-            time_diff = datetime.datetime.now() - saved_time
-            
-            if time_diff.total_seconds() > 21600: 
-                return None # 만료됨
-            
-            return data['token']
-        except:
-            return None
-
-    # -----------------------------------------------------------
-    # [토큰 발급] 캐시 확인 후 없을 때만 요청
-    # -----------------------------------------------------------
-    def get_access_token(self):
-        # 1. 저장된 토큰 확인
-        saved_token = self.load_token_from_file()
-        if saved_token:
-            self.token = saved_token
-            return True
+        if cano:
+            self.cano, self.acnt_prdt_cd = cano, acnt_prdt_cd or "01"
+        else:
+            self.cano = get_config("CANO")
+            self.acnt_prdt_cd = get_config("ACNT_PRDT_CD")
+
+        # 실시간 웹소켓 주소 (없으면 모의/실전 기본 주소)
+        default_ws = VTS_WS_URL if "openapivts" in self.base_url else REAL_WS_URL
+        if ws_url or app_key:
+            self.ws_url = ws_url or default_ws
+        else:
+            self.ws_url = get_config("WS_URL", default_ws)
+
+        # 2. 커넥션 풀 세션 + 공통 헤더 (요청마다 tr_id 만 추가)
+        self.session = create_session()
+        self.session.headers.update({
+            "content-type": "application/json",
+            "appkey": self.app_key,
+            "appsecret": self.app_secret
+        })
+        self.limiter = get_limiter(self.app_key, self.base_url, rate)
+        metrics.set_gauge("kis_rate_tokens", lambda: self.limiter.tokens, server=self.server_label)
+        # 3. 접근토큰은 같은 앱키를 쓰는 클라이언트끼리 공유 (token_manager.py)
+        self.tokens = get_token_manager(self.app_key, self.base_url, self.issue_token, token_path)
 
-        # 2. 없으면 새로 요청 (이때만 알림 발생)
-        path = "oauth2/tokenP"
+    @property
+    def token(self):
+        return self.tokens.token
+
+    @property
+    def server_label(self):
+        return "vts" if "openapivts" in self.base_url else "real"
+
+    # -----------------------------------------------------------
+    # [공통 요청] 속도 제한 + 스로틀 재시도 + 토큰 만료 재시도 + 오류 응답 처리
+    # -----------------------------------------------------------
+    def _request(self, method, path, tr_id=None, params=None, body=None, check=True, tr_cont=None,
+                 with_headers=False, auth=True):
         url = f"{self.base_url}/{path}"
-        headers = {"content-type": "application/json"}
+        headers = {"tr_id": tr_id} if tr_id else {}
+        if tr_cont: headers["tr_cont"] = tr_cont # 연속 조회
+        data = json.dumps(body) if body is not None else None
+
+        endpoint = endpoint_name(path)
+        throttled = 0
+        token_retried = False
+        while True:
+            if auth:
+                token = self.tokens.get()
+                headers["authorization"] = f"Bearer {token}"
+            waited = self.limiter.acquire()
+            if waited: metrics.observe("kis_rate_wait_seconds", waited, endpoint=endpoint)
+            metrics.inc("kis_requests_total", endpoint=endpoint)
+            started = time.perf_counter()
+            try:
+                res = self.session.request(method, url, headers=headers or None, params=params, data=data,
+                                           timeout=REQUEST_TIMEOUT)
+            except requests.RequestException as e:
+                metrics.inc("kis_errors_total", endpoint=endpoint, status="", rt_cd="", msg_cd=type(e).__name__)
+                raise
+            finally:
+                metrics.observe("kis_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+            try:
+                payload = res.json()
+            except ValueError:
+                metrics.inc("kis_errors_total", endpoint=endpoint, status=res.status_code, rt_cd="", msg_cd="invalid_json")
+                raise KisApiError(str(res.status_code), res.text[:200], res.status_code)
+            record_response(endpoint, res.status_code, payload)
+
+            if payload.get('msg_cd') == THROTTLE_MSG_CD and throttled < THROTTLE_RETRIES:
+                metrics.inc("kis_throttled_total", endpoint=endpoint)
+                throttled += 1
+                self.limiter.penalize()
+                time.sleep(0.2 * throttled)
+                continue
+            if auth and payload.get('msg_cd') in TOKEN_EXPIRED_MSG_CDS and not token_retried:
+                token_retried = True
+                self.tokens.invalidate(token)
+                continue
+            break
+
+        if check and (res.status_code != 200 or payload.get('rt_cd', '0') != '0'):
+            raise KisApiError(payload.get('msg_cd', str(res.status_code)), payload.get('msg1', ''), res.status_code)
+        return (payload, res.headers) if with_headers else payload
+
+    # -----------------------------------------------------------
+    # [토큰 발급] 토큰 관리자가 캐시/잠금 확인 후 필요할 때만 호출 (이때만 알림 발생)
+    # -----------------------------------------------------------
+    def issue_token(self):
         body = {
             "grant_type": "client_credentials",
             "appkey": self.app_key,
             "appsecret": self.app_secret
         }
-        
-        res = requests.post(url, headers=headers, data=json.dumps(body))
-        
-        if res.status_code == 200:
-            new_token = res.json()['access_token']
-            self.token = new_token
-            self.save_token_to_file(new_token) # 파일에 저장
+        data = self._request("POST", TOKEN_PATH, body=body, check=False, auth=False)
+        if 'access_token' not in data:
+            raise KisApiError(data.get('error_code', data.get('msg_cd', '')),
+                              data.get('error_description', data.get('msg1', '토큰 발급 실패')))
+        return data['access_token'], int(data.get('expires_in', 86400))
+
+    def get_access_token(self):
+        # 메모리/캐시 파일에 유효한 토큰이 있으면 호출 없이 바로 True
+        try:
+            self.tokens.get()
             return True
-        else:
+        except (requests.RequestException, KisApiError):
             return False
 
     # -----------------------------------------------------------
-    # [현재가 조회]
+    # [웹소켓 접속키 발급] 실시간 시세 구독용
     # -----------------------------------------------------------
-    def get_current_price(self, stock_code):
-        path = "uapi/domestic-stock/v1/quotations/inquire-price"
-        url = f"{self.base_url}/{path}"
-        headers = {
-            "content-type": "application/json",
-            "authorization": f"Bearer {self.token}",
+    def get_approval_key(self):
+        body = {
+            "grant_type": "client_credentials",
             "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": "FHKST01010100"
+            "secretkey": self.app_secret
         }
+        data = self._request("POST", "oauth2/Approval", body=body, check=False, auth=False)
+        if 'approval_key' not in data:
+            raise KisApiError(data.get('msg_cd', ''), data.get('msg1', '웹소켓 접속키 발급 실패'))
+        return data['approval_key']
+
+    # -----------------------------------------------------------
+    # [현재가 조회]
+    # -----------------------------------------------------------
+    def get_current_price(self, stock_code):
         params = {"fid_cond_mrkt_div_code": "J", "fid_input_iscd": stock_code}
-        res = requests.get(url, headers=headers, params=params)
-        return res.json()['output']
+        data = self._request("GET", PRICE_PATH, tr_id=PRICE_TR_ID, params=params)
+        return parse_current_price(data)
 
     # -----------------------------------------------------------
     # [차트 데이터 조회] 기간별 시세 (150일 문제 해결 버전)
     # -----------------------------------------------------------
     def get_daily_price(self, stock_code, n_days=100):
-        # 1. 날짜 계산 (오늘 ~ n일 전)
-        end_dt = datetime.datetime.now()
-        start_dt = end_dt - datetime.timedelta(days=n_days)
-        
-        str_start = start_dt.strftime("%Y%m%d")
-        str_end = end_dt.strftime("%Y%m%d")
-
-        # 2. 기간별 시세 API 호출 (TR_ID 변경됨: FHKST03010100)
-        path = "uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice"
-        url = f"{self.base_url}/{path}"
-        
-        headers = {
-            "content-type": "application/json",
-            "authorization": f"Bearer {self.token}",
-            "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": "FHKST03010100"
-        }
-        
-        params = {
-            "fid_cond_mrkt_div_code": "J",
-            "fid_input_iscd": stock_code,
-            "fid_input_date_1": str_start,
-            "fid_input_date_2": str_end,
-            "fid_period_div_code": "D",
-            "fid_org_adj_prc": "1"
-        }
-        
-        res = requests.get(url, headers=headers, params=params)
-        
-        # 3. 데이터 파싱 (output2 사용)
-        if res.status_code == 200 and 'output2' in res.json():
-            data = res.json()['output2']
-            df = pd.DataFrame(data)
-            
-            if df.empty: return pd.DataFrame()
-
-            df = df[['stck_bsop_date', 'stck_oprc', 'stck_hgpr', 'stck_lwpr', 'stck_clpr', 'acml_vol']]
-            df.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-            
-            df['Date'] = pd.to_datetime(df['Date'], format='%Y%m%d')
-            for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
-                df[col] = pd.to_numeric(df[col])
-            
-            return df.sort_values('Date')
-        else:
+        # 기간별 시세 API 호출 (TR_ID 변경됨: FHKST03010100)
+        params = daily_price_params(stock_code, n_days)
+        try:
+            res = self._request("GET", DAILY_CHART_PATH, tr_id=DAILY_CHART_TR_ID, params=params)
+        except KisApiError:
             return pd.DataFrame()
+        return parse_daily_chart(res)
 
     # -----------------------------------------------------------
-    # [주문 전송]
+    # [차트 데이터 조회] 날짜 구간 지정 (100건 넘으면 과거 방향으로 이어서 조회)
     # -----------------------------------------------------------
-    def send_order(self, stock_code, qty, buy_sell_type):
-        path = "uapi/domestic-stock/v1/trading/order-cash"
-        url = f"{self.base_url}/{path}"
-        tr_id = "VTTC0802U" if buy_sell_type == 'buy' else "VTTC0801U"
-        
-        headers = {
-            "content-type": "application/json",
-            "authorization": f"Bearer {self.token}",
-            "appkey": self.app_key,
-            "appsecret": self.app_secret,
-            "tr_id": tr_id
-        }
-        
-        try:
-            cano = st.secrets["CANO"]
-            acnt_prdt_cd = st.secrets["ACNT_PRDT_CD"]
-        except:
-            import config
-            cano = config.CANO
-            acnt_prdt_cd = config.ACNT_PRDT_CD
+    def get_daily_price_range(self, stock_code, str_start, str_end):
+        frames = []
+        cur_end = str_end
+        while cur_end >= str_start:
+            params = daily_range_params(stock_code, str_start, cur_end)
+            res = self._request("GET", DAILY_CHART_PATH, tr_id=DAILY_CHART_TR_ID, params=params)
+            df = parse_daily_chart(res)
+            if df.empty: break
+            frames.append(df)
+            if len(df) < DAILY_CHART_MAX_ROWS: break
+            oldest = df['Date'].iloc[0]
+            cur_end = (oldest - datetime.timedelta(days=1)).strftime("%Y%m%d")
+
+        if not frames: return pd.DataFrame()
+        df = pd.concat(frames).drop_duplicates('Date')
+        return df.sort_values('Date').reset_index(drop=True)
+
+    # -----------------------------------------------------------
+    # [분봉 조회] 당일 1분봉 (30건씩 과거 방향으로 이어서, 장 시작까지)
+    #   N분봉/주봉/월봉은 bars.resample_minutes / resample_daily 로 묶음
+    # -----------------------------------------------------------
+    def get_minute_price(self, stock_code, hhmmss=None):
+        hhmmss = hhmmss or datetime.datetime.now().strftime("%H%M%S")
+        frames = []
+        day = None
+        for _ in range(MINUTE_CHART_MAX_PAGES):
+            res = self._request("GET", MINUTE_CHART_PATH, tr_id=MINUTE_CHART_TR_ID,
+                                params=minute_params(stock_code, hhmmss))
+            df = parse_minute_chart(res)
+            if df.empty: break
+            day = day or df['Date'].iloc[-1].date()
+            df = df[df['Date'].dt.date == day] # 전일 분봉이 섞여 오면 버림
+            if df.empty: break
+            frames.append(df)
+            oldest = df['Date'].iloc[0]
+            if oldest.strftime("%H%M%S") <= MARKET_OPEN_HHMMSS: break
+            hhmmss = (oldest - datetime.timedelta(minutes=1)).strftime("%H%M%S")
+
+        if not frames: return pd.DataFrame()
+        df = pd.concat(frames).drop_duplicates('Date')
+        return df.sort_values('Date').reset_index(drop=True)
 
+    # -----------------------------------------------------------
+    # [주문 전송] price 를 주면 지정가, 없으면 시장가
+    # -----------------------------------------------------------
+    def send_order(self, stock_code, qty, buy_sell_type, price=0):
         body = {
-            "CANO": cano,
-            "ACNT_PRDT_CD": acnt_prdt_cd,
+            "CANO": self.cano,
+            "ACNT_PRDT_CD": self.acnt_prdt_cd,
             "PDNO": stock_code,
-            "ORD_DVSN": "01",
+            "ORD_DVSN": ORD_DVSN_LIMIT if price else ORD_DVSN_MARKET,
             "ORD_QTY": str(qty),
-            "ORD_UNPR": "0"
+            "ORD_UNPR": str(int(price)) if price else "0"
         }
-        res = requests.post(url, headers=headers, data=json.dumps(body))
-        return res.json()
\ No newline at end of file
+        # 주문은 중복 체결 위험이 있어 응답(5xx) 재시도 없이 결과만 반환
+        return self._request("POST", ORDER_PATH, tr_id=ORDER_TR_ID[buy_sell_type], body=body, check=False)
+
+    # -----------------------------------------------------------
+    # [주문체결 조회] 하루치 주문/체결 내역 (연속 조회로 전부)
+    # -----------------------------------------------------------
+    def get_daily_ccld(self, str_start, str_end=None):
+        rows = []
+        ctx_fk, ctx_nk, tr_cont = "", "", None
+        for _ in range(CCLD_MAX_PAGES):
+            params = {
+                "CANO": self.cano,
+                "ACNT_PRDT_CD": self.acnt_prdt_cd,
+                "INQR_STRT_DT": str_start,
+                "INQR_END_DT": str_end or str_start,
+                "SLL_BUY_DVSN_CD": "00", # 전체
+                "INQR_DVSN": "00", # 역순
+                "PDNO": "",
+                "CCLD_DVSN": "00", # 체결/미체결 전체
+                "ORD_GNO_BRNO": "",
+                "ODNO": "",
+                "INQR_DVSN_3": "00",
+                "INQR_DVSN_1": "",
+                "CTX_AREA_FK100": ctx_fk,
+                "CTX_AREA_NK100": ctx_nk,
+            }
+            data, headers = self._request("GET", CCLD_PATH, tr_id=CCLD_TR_ID, params=params, tr_cont=tr_cont,
+                                          with_headers=True)
+            rows.extend(data.get('output1', []))
+            if headers.get('tr_cont') not in ('F', 'M'): break # 다음 페이지 없음
+            ctx_fk, ctx_nk, tr_cont = data.get('ctx_area_fk100', ''), data.get('ctx_area_nk100', ''), "N"
+        return rows
+
+    # -----------------------------------------------------------
+    # [잔고 조회] (보유종목 목록, 계좌 요약) - 연속 조회로 보유종목 전부
+    # -----------------------------------------------------------
+    def get_balance(self):
+        holdings, summary = [], {}
+        ctx_fk, ctx_nk, tr_cont = "", "", None
+        for _ in range(BALANCE_MAX_PAGES):
+            params = {
+                "CANO": self.cano,
+                "ACNT_PRDT_CD": self.acnt_prdt_cd,
+                "AFHR_FLPR_YN": "N",
+                "OFL_YN": "",
+                "INQR_DVSN": "02", # 종목별
+                "UNPR_DVSN": "01",
+                "FUND_STTL_ICLD_YN": "N",
+                "FNCG_AMT_AUTO_RDPT_YN": "N",
+                "PRCS_DVSN": "00", # 전일매매 포함
+                "CTX_AREA_FK100": ctx_fk,
+                "CTX_AREA_NK100": ctx_nk,
+            }
+            data, headers = self._request("GET", BALANCE_PATH, tr_id=BALANCE_TR_ID, params=params, tr_cont=tr_cont,
+                                          with_headers=True)
+            holdings.extend(data.get('output1', []))
+            summary = (data.get('output2') or [summary])[0]
+            if headers.get('tr_cont') not in ('F', 'M'): break
+            ctx_fk, ctx_nk, tr_cont = data.get('ctx_area_fk100', ''), data.get('ctx_area_nk100', ''), "N"
+        return holdings, summary
\ No newline at end of file
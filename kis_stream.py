@@ -0,0 +1,226 @@
+import asyncio
+import collections
+import json
+import logging
+import threading
+import time
+
+import websockets
+
+import metrics
+
+# ==========================================
+# [실시간 시세] KIS 웹소켓 체결가(H0STCNT0) 구독
+#   - 관심종목 전체 구독, 종목별 최신 틱을 메모리에 유지
+#   - 틱이 들어올 때마다 등록된 리스너(엔진/화면)에 바로 전달
+#   - 끊기면 자동 재접속 후 재구독 (수신 중 예상 못 한 오류도 끊김으로 처리)
+#   - 깨진 프레임은 기록하고 건너뜀 (bad_frames / stream_bad_frames_total)
+#   - record_path 를 주면 수신 원문을 기록 (stream_replay.py 로 재생)
+# ==========================================
+TR_EXEC = "H0STCNT0" # 국내주식 실시간 체결가
+MAX_SUBSCRIPTIONS = 41 # 세션당 구독 가능 종목 수 (KIS 제한)
+
+# H0STCNT0 필드 위치 ('^' 구분)
+F_CODE, F_TIME, F_PRICE, F_SIGN, F_CHANGE, F_CHANGE_RATE = 0, 1, 2, 3, 4, 5
+F_OPEN, F_HIGH, F_LOW, F_VOLUME, F_ACML_VOLUME = 7, 8, 9, 12, 13
+
+logger = logging.getLogger("kis_stream")
+
+Tick = collections.namedtuple("Tick", [
+    "code", "time", "price", "change", "change_rate", "open", "high", "low",
+    "volume", "acml_volume", "recv_ts"
+])
+
+def tick_to_price_output(tick):
+    # REST 현재가(inquire-price) output 과 같은 형태로 변환 -> 기존 판단 로직 재사용
+    return {
+        "stck_prpr": str(tick.price),
+        "stck_sdpr": str(tick.price - tick.change),
+        "prdy_ctrt": str(tick.change_rate),
+        "acml_vol": str(tick.acml_volume),
+    }
+
+# -----------------------------------------------------------
+# [프레임 파싱] "0|H0STCNT0|002|rec1^...^rec2^..." -> Tick 목록
+# -----------------------------------------------------------
+def parse_frame(raw, recv_ts=None):
+    recv_ts = recv_ts if recv_ts is not None else time.perf_counter()
+    parts = raw.split("|", 3)
+    if len(parts) < 4 or parts[0] != "0" or parts[1] != TR_EXEC:
+        return [] # 암호화(1) 프레임이나 다른 TR 은 무시
+    count = int(parts[2])
+    fields = parts[3].split("^")
+    width = len(fields) // count if count else 0
+    ticks = []
+    for i in range(count):
+        f = fields[i * width:(i + 1) * width]
+        ticks.append(Tick(
+            code=f[F_CODE],
+            time=f[F_TIME],
+            price=int(f[F_PRICE]),
+            change=int(f[F_CHANGE]),
+            change_rate=float(f[F_CHANGE_RATE]),
+            open=int(f[F_OPEN]),
+            high=int(f[F_HIGH]),
+            low=int(f[F_LOW]),
+            volume=int(f[F_VOLUME]),
+            acml_volume=int(f[F_ACML_VOLUME]),
+            recv_ts=recv_ts,
+        ))
+    return ticks
+
+def subscribe_message(approval_key, code, subscribe=True, tr_id=TR_EXEC):
+    return json.dumps({
+        "header": {
+            "approval_key": approval_key,
+            "custtype": "P",
+            "tr_type": "1" if subscribe else "2",
+            "content-type": "utf-8"
+        },
+        "body": {"input": {"tr_id": tr_id, "tr_key": code}}
+    })
+
+def limit_codes(codes):
+    # 중복 제거 + 구독 한도까지만 (초과분은 KIS 가 거부)
+    codes = list(dict.fromkeys(codes))
+    if len(codes) > MAX_SUBSCRIPTIONS:
+        logger.warning("구독 가능 종목 수(%d) 초과, 앞의 %d개만 구독", MAX_SUBSCRIPTIONS, MAX_SUBSCRIPTIONS)
+        codes = codes[:MAX_SUBSCRIPTIONS]
+    return codes
+
+class KisStream:
+    def __init__(self, approval_key, url, codes=(), record_path=None, reconnect=True, reconnect_max_delay=30.0):
+        self.approval_key = approval_key
+        self.url = url
+        self.codes = limit_codes(codes)
+        self.record_path = record_path
+        self.reconnect = reconnect
+        self.reconnect_max_delay = reconnect_max_delay
+
+        self.ticks = {} # 종목코드 -> 최신 Tick
+        self.listeners = []
+        self.connected = False
+        self.reconnects = 0
+        self.frames = 0
+        self.bad_frames = 0
+
+        self.ws = None
+        self.loop = None
+        self.thread = None
+        self.stopping = False
+
+    @classmethod
+    def from_api(cls, api, codes=(), **kwargs):
+        return cls(api.get_approval_key(), api.ws_url, codes, **kwargs)
+
+    def add_listener(self, fn):
+        # fn(tick) 은 수신 스레드에서 호출되므로 오래 걸리는 작업은 큐로 넘길 것
+        self.listeners.append(fn)
+
+    def latest(self, code):
+        return self.ticks.get(code)
+
+    def alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    # -----------------------------------------------------------
+    # [구독 관리] 연결 중이면 바로 반영, 아니면 재접속 시 반영
+    # -----------------------------------------------------------
+    def set_codes(self, codes):
+        codes = limit_codes(codes)
+        added = [c for c in codes if c not in self.codes]
+        removed = [c for c in self.codes if c not in codes]
+        self.codes = codes
+        if self.loop is not None and self.connected:
+            asyncio.run_coroutine_threadsafe(self._send_changes(added, removed), self.loop)
+
+    async def _send_changes(self, added, removed):
+        for code in removed:
+            await self.ws.send(subscribe_message(self.approval_key, code, subscribe=False))
+            self.ticks.pop(code, None)
+        for code in added:
+            await self.ws.send(subscribe_message(self.approval_key, code))
+
+    # -----------------------------------------------------------
+    # [수신 루프] 끊기면 지수 백오프로 재접속 + 재구독
+    # -----------------------------------------------------------
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        delay = 1.0
+        record = open(self.record_path, "a", encoding="utf-8") if self.record_path else None
+        try:
+            while not self.stopping:
+                try:
+                    async with websockets.connect(self.url, ping_interval=None) as ws:
+                        self.ws = ws
+                        self.connected = True
+                        delay = 1.0
+                        for code in self.codes:
+                            await ws.send(subscribe_message(self.approval_key, code))
+                        async for raw in ws:
+                            self._on_message(ws, raw, record)
+                except (OSError, websockets.WebSocketException) as e:
+                    logger.warning("웹소켓 연결 끊김: %s", e)
+                except Exception:
+                    logger.exception("웹소켓 수신 오류 -> 재접속")
+                finally:
+                    self.connected = False
+                    self.ws = None
+                if self.stopping or not self.reconnect: break
+                self.reconnects += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max_delay)
+        finally:
+            if record: record.close()
+
+    def _on_message(self, ws, raw, record):
+        recv_ts = time.perf_counter()
+        if record:
+            record.write(f"{time.time():.6f}\t{raw}\n")
+
+        try:
+            if not raw: raise ValueError("빈 프레임")
+            ticks = parse_frame(raw, recv_ts) if raw[0] in "01" else None
+        except (ValueError, IndexError, TypeError) as e:
+            self.bad_frames += 1
+            metrics.inc("stream_bad_frames_total")
+            logger.warning("잘못된 프레임 건너뜀 (%s): %.100r", e, raw)
+            return
+
+        if ticks is not None:
+            for tick in ticks:
+                self.frames += 1
+                self.ticks[tick.code] = tick
+                for fn in self.listeners:
+                    try:
+                        fn(tick)
+                    except Exception:
+                        logger.exception("리스너 처리 실패")
+            return
+
+        # JSON 메시지: PINGPONG 은 그대로 돌려주고, 구독 응답은 오류만 기록
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            return
+        tr_id = msg.get("header", {}).get("tr_id")
+        if tr_id == "PINGPONG":
+            asyncio.ensure_future(ws.send(raw))
+        elif msg.get("body", {}).get("rt_cd", "0") != "0":
+            logger.warning("구독 실패 %s: %s", msg.get("header", {}).get("tr_key"), msg["body"].get("msg1"))
+
+    # -----------------------------------------------------------
+    # [백그라운드 실행] 동기 코드(엔진)에서 쓰기 위한 스레드 실행
+    # -----------------------------------------------------------
+    def start(self):
+        self.stopping = False
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.run()), name="kis-stream", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self.stopping = True
+        if self.loop is not None and self.ws is not None:
+            asyncio.run_coroutine_threadsafe(self.ws.close(), self.loop)
+        if self.thread is not None:
+            self.thread.join(timeout)
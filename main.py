@@ -2,15 +2,16 @@ import warnings
 warnings.filterwarnings("ignore")
 
 import streamlit as st
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots 
-from kis_api import KisApi
-from pykrx import stock 
-import kakao_msg 
 import time
-import json
-import os
 import pandas as pd
+from data_store import DEFAULT_SETTINGS, read_engine_state, read_engine_control, write_engine_control
+from state_store import SETTING_TABLES
+from ui_resources import get_api, get_store, get_symbols, get_candle_store
+from strategy import analyze_market_signal, calc_target_prices
+from charts import cached_figure, MAX_BARS
+from bars import resample_minutes, resample_daily
+from alerts import KINDS, OPS, ACTIONS, DEFAULT_COOLDOWN_SEC, normalize_rule, describe_rule
+import metrics
 
 # --- 페이지 설정 ---
 st.set_page_config(layout="wide", page_title="스마트 주식 봇 Ver 7.0 (개별설정)")
@@ -25,146 +26,92 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ==========================================
-# [데이터 저장/로드] 종목별 설정 기능 추가
+# [데이터 저장/로드] stock_bot.db (변경된 행만 저장)
 # ==========================================
-DATA_FILE = "stock_data.json"
-
-# 기본 설정값 (신규 종목 추가 시 사용)
-DEFAULT_SETTINGS = {
-    "buy_pct": -3.0,       # 매수 기준 (%)
-    "sell_pct": 5.0,       # 매도 기준 (%)
-    "manual_buy": 0,       # 직접 입력 매수거
-    "manual_sell": 0,      # 직접 입력 매도가
-    "qty": 1,              # 주문 수량
-    "auto_on": False       # 자동매매 켜짐 여부
-}
-
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            # 예전 버전 파일 호환성 처리 (stock_settings가 없으면 생성)
-            if "stock_settings" not in data:
-                data["stock_settings"] = {}
-                for code in data.get("watchlist", []):
-                    data["stock_settings"][code] = DEFAULT_SETTINGS.copy()
-            return data
-    else:
-        return {"watchlist": ["005930"], "stock_names": {}, "stock_settings": {}}
-
-def save_data():
-    data = {
-        "watchlist": st.session_state['watchlist'],
-        "stock_names": st.session_state['stock_names'],
-        "stock_settings": st.session_state['stock_settings'] # 설정값도 저장
-    }
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+store = get_store() # DB 연결은 프로세스에 하나 (ui_resources.py)
+
+# --- 세션 초기화 --- 다른 화면/엔진/최적화가 바꾼 경우에만 다시 읽음
+store_version = store.version(SETTING_TABLES)
+if st.session_state.get('store_version') != store_version:
+    saved_data = store.load_all()
+    st.session_state['watchlist'] = saved_data['watchlist']
+    st.session_state['stock_names'] = saved_data['stock_names']
+    st.session_state['stock_settings'] = saved_data['stock_settings']
+    st.session_state['store_version'] = store_version
+
+# --- 종목 마스터 (symbols.db, 하루 한 번 전 종목 일괄 갱신) ---
+symbols = get_symbols()
+if len(symbols) == 0:
+    with st.spinner("종목 목록을 받는 중... (처음 한 번)"):
+        try:
+            symbols.refresh()
+        except Exception as e:
+            st.sidebar.warning(f"종목 목록 로딩 실패: {e}")
+else:
+    symbols.refresh_async() # 캐시로 바로 화면을 그리고 갱신은 백그라운드에서
 
-# --- 세션 초기화 ---
-saved_data = load_data()
-if 'watchlist' not in st.session_state: st.session_state['watchlist'] = saved_data['watchlist']
-if 'stock_names' not in st.session_state: st.session_state['stock_names'] = saved_data['stock_names']
-if 'stock_settings' not in st.session_state: st.session_state['stock_settings'] = saved_data.get('stock_settings', {})
+# 이름이 없는 관심종목은 종목 마스터에서 채워서 한 번에 저장
+missing_names = {c: symbols.name(c) for c in st.session_state['watchlist'] if c not in st.session_state['stock_names']}
+missing_names = {c: n for c, n in missing_names.items() if n != c}
+if missing_names:
+    st.session_state['stock_names'].update(missing_names)
+    store.set_names(missing_names)
 
 # 현재 종목 설정 (리스트가 비어있지 않으면 첫 번째 종목 선택)
-if 'current_stock' not in st.session_state: 
+if st.session_state.get('current_stock') not in st.session_state['watchlist']: # 다른 곳에서 삭제된 경우 포함
     st.session_state['current_stock'] = st.session_state['watchlist'][0] if st.session_state['watchlist'] else "005930"
-if 'trade_history' not in st.session_state: st.session_state['trade_history'] = {}
 
-# --- API 연결 ---
-api = KisApi()
-if 'kis_token' in st.session_state and st.session_state['kis_token'] is not None:
-    api.token = st.session_state['kis_token']
-else:
-    if api.get_access_token():
-        st.session_state['kis_token'] = api.token 
-        st.session_state['token_ok'] = True
-    else:
-        st.error("API 토큰 발급 실패! 키 값을 확인하세요.")
-        st.stop()
+# --- API 연결 --- 토큰은 프로세스 공유 토큰 관리자가 캐시/갱신 (세션마다 발급하지 않음)
+api = get_api()
+if not api.get_access_token():
+    st.error("API 토큰 발급 실패! 키 값을 확인하세요.")
+    st.stop()
+
+# 일봉은 로컬 저장소(candles.db)에서 읽고 빠진 구간만 API 로 받음
+candle_store = get_candle_store()
+CHART_PERIODS = {"150일": 150, "1년": 365, "3년": 365 * 3, "5년": 365 * 5}
+# 차트 봉 주기: 분봉은 당일 1분봉을 묶고, 주봉/월봉은 일봉을 묶음 (AI 분석은 항상 일봉 기준)
+CHART_TIMEFRAMES = {"일봉": "D", "주봉": "W", "월봉": "M", "1분": 1, "5분": 5, "15분": 15, "60분": 60}
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_minute_chart(code):
+    # 당일 1분봉 (최대 14회 호출이라 1분 동안 재사용)
+    return api.get_minute_price(code)
 
 def get_stock_name(code):
     if code in st.session_state['stock_names']: return st.session_state['stock_names'][code]
-    try:
-        name = stock.get_market_ticker_name(code)
-        if not name: name = code
-        st.session_state['stock_names'][code] = name
-        save_data() 
-        return name
-    except: return code
+    return symbols.name(code)
 
 # 순서 변경 함수
-def move_stock(index, direction):
-    watchlist = st.session_state['watchlist']
-    if direction == 'up' and index > 0:
-        watchlist[index], watchlist[index-1] = watchlist[index-1], watchlist[index]
-    elif direction == 'down' and index < len(watchlist) - 1:
-        watchlist[index], watchlist[index+1] = watchlist[index+1], watchlist[index]
-    save_data()
+def move_stock(code, direction):
+    store.move_stock(code, direction)
     st.rerun()
 
-# ==========================================
-# [분석 로직]
-# ==========================================
-def analyze_market_signal(df, current_price):
-    if len(df) < 20: return "데이터 부족", "gray", 0, 0
-    df['MA5'] = df['Close'].rolling(window=5).mean()
-    df['MA20'] = df['Close'].rolling(window=20).mean()
-    df['Vol_MA5'] = df['Volume'].rolling(window=5).mean()
-    
-    # RSI 계산
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['RSI'] = 100 - (100 / (1 + rs))
-
-    latest = df.iloc[-1]
-    prev = df.iloc[-2]
-    
-    rsi = latest['RSI']
-    vol_ratio = (latest['Volume'] / latest['Vol_MA5']) * 100 if latest['Vol_MA5'] > 0 else 0
-    
-    signal = "관망 (Hold)"
-    color = "gray"
-    score = 0
-
-    if current_price > latest['MA20']: score += 1 
-    if latest['MA5'] > latest['MA20']: score += 1 
-    if vol_ratio > 100: score += 1 
-    if vol_ratio > 200: score += 1 
-    if rsi < 30: score += 2 
-    elif rsi > 70: score -= 2 
-
-    if score >= 4: signal = "강력 매수"; color = "red"
-    elif score >= 2: signal = "매수 우위"; color = "orange"
-    elif score <= -1: signal = "매도 우위"; color = "blue"
-    
-    return signal, color, rsi, vol_ratio
-
 # ==========================================
 # [사이드바] 종목 관리
 # ==========================================
 st.sidebar.header("📋 종목 리스트")
-new_code = st.sidebar.text_input("종목 추가", placeholder="예: 005930")
+query = st.sidebar.text_input("종목 추가", placeholder="예: 005930 또는 삼성")
+matches = symbols.search(query) if query else []
+choice = None
+if matches:
+    choice = st.sidebar.selectbox("검색 결과", matches, key="add_choice",
+                                  format_func=lambda r: f"{r['name']} ({r['code']}) · {r['market']}")
+elif query and len(symbols):
+    st.sidebar.caption("검색 결과가 없습니다.")
 
 if st.sidebar.button("➕ 추가"):
+    new_code = choice['code'] if choice else query.strip()
     if new_code and new_code not in st.session_state['watchlist']:
-        st.session_state['watchlist'].append(new_code)
         # 신규 종목 추가 시 기본 설정값 생성
-        st.session_state['stock_settings'][new_code] = DEFAULT_SETTINGS.copy()
-        
-        get_stock_name(new_code)
-        save_data()
-        st.session_state['trade_history'][new_code] = {'buy_ordered': False, 'sell_ordered': False}
+        store.add_stock(new_code)
+        name = symbols.name(new_code)
+        if name != new_code: store.set_name(new_code, name)
         st.rerun()
 
 st.sidebar.markdown("---")
 
 for idx, code in enumerate(st.session_state['watchlist']):
-    if code not in st.session_state['trade_history']:
-        st.session_state['trade_history'][code] = {'buy_ordered': False, 'sell_ordered': False}
     # 설정값이 없으면 생성 (구버전 호환)
     if code not in st.session_state['stock_settings']:
         st.session_state['stock_settings'][code] = DEFAULT_SETTINGS.copy()
@@ -180,18 +127,60 @@ for idx, code in enumerate(st.session_state['watchlist']):
             st.session_state['current_stock'] = code
             st.rerun()
     with c_up:
-        if idx > 0 and st.button("⬆️", key=f"up_{code}"): move_stock(idx, 'up')
+        if idx > 0 and st.button("⬆️", key=f"up_{code}"): move_stock(code, 'up')
     with c_down:
-        if idx < len(st.session_state['watchlist']) - 1 and st.button("⬇️", key=f"down_{code}"): move_stock(idx, 'down')
+        if idx < len(st.session_state['watchlist']) - 1 and st.button("⬇️", key=f"down_{code}"): move_stock(code, 'down')
     with c_del:
         if st.button("❌", key=f"del_{code}"):
+            store.remove_stock(code) # 설정도 삭제
             st.session_state['watchlist'].remove(code)
-            del st.session_state['stock_settings'][code] # 설정도 삭제
             if st.session_state['current_stock'] == code:
                 st.session_state['current_stock'] = st.session_state['watchlist'][0] if st.session_state['watchlist'] else "005930"
-            save_data()
             st.rerun()
 
+# ==========================================
+# [사이드바] 자동매매 엔진 상태/제어 (engine.py 프로세스)
+# ==========================================
+st.sidebar.markdown("---")
+st.sidebar.header("🛰️ 자동매매 엔진")
+engine_state = read_engine_state()
+engine_control = read_engine_control()
+if engine_state:
+    st.sidebar.caption(f"상태: **{engine_state.get('status')}** · 마지막 틱: {engine_state.get('last_tick')}")
+    if engine_state.get('last_error'): st.sidebar.caption(f"⚠️ {engine_state['last_error']}")
+    book = engine_state.get('portfolio') or {}
+    if book.get('ready'):
+        start = book.get('start_equity') or book['equity']
+        st.sidebar.caption(f"순자산 {book['equity']:,}원 ({book['equity'] - start:+,}) · 현금 {book['cash']:,}원 · "
+                           f"주식 {book['exposure']:,}원 · 보유 {len(book.get('positions', {}))}종목")
+    alert_status = engine_state.get('alerts') or {}
+    if alert_status.get('rules'):
+        st.sidebar.caption(f"조건 알림 {alert_status['triggers']}건 감시 · 오늘 발생 {alert_status['fired']}건"
+                           + (f" · 기준값 없음 {alert_status['skipped']}건" if alert_status.get('skipped') else ""))
+else:
+    st.sidebar.caption("엔진이 실행되지 않았습니다. `python engine.py` 로 시작하세요.")
+paused = st.sidebar.toggle("⏸️ 엔진 일시정지", value=engine_control.get('paused', False), key="engine_paused")
+if paused != engine_control.get('paused', False):
+    engine_control['paused'] = paused
+    write_engine_control(engine_control)
+
+# 진단: 호출 지연(p50/p95)/오류 수 - 화면 프로세스 지표 + 엔진 상태 파일의 지표
+def show_metrics(snap):
+    latency = [{"지표": name, "라벨": label, **stats}
+               for name, series in snap.get("latency", {}).items() for label, stats in series.items()]
+    counters = [{"지표": name, "라벨": label, "값": value}
+                for name, series in snap.get("counters", {}).items() for label, value in series.items()]
+    if latency: st.dataframe(pd.DataFrame(latency), hide_index=True, use_container_width=True)
+    if counters: st.dataframe(pd.DataFrame(counters), hide_index=True, use_container_width=True)
+    if not latency and not counters: st.caption("아직 기록된 호출이 없습니다.")
+
+with st.sidebar.expander("🩺 진단"):
+    st.markdown("**화면**")
+    show_metrics(metrics.snapshot())
+    if engine_state and engine_state.get("metrics"):
+        st.markdown("**엔진**")
+        show_metrics(engine_state["metrics"])
+
 if not st.session_state['watchlist']:
     st.warning("👈 종목을 추가해주세요."); st.stop()
 
@@ -203,6 +192,9 @@ target_name = get_stock_name(target_code)
 my_setting = st.session_state['stock_settings'][target_code] # 현재 종목의 설정 불러오기
 
 st.title(f"🤖 {target_name} 개별 설정")
+col_period, col_tf = st.columns(2)
+with col_period: chart_period = st.radio("차트 기간", list(CHART_PERIODS), horizontal=True, key="chart_period")
+with col_tf: chart_tf = CHART_TIMEFRAMES[st.radio("봉 주기", list(CHART_TIMEFRAMES), horizontal=True, key="chart_tf")]
 
 try:
     curr_data = api.get_current_price(target_code)
@@ -210,7 +202,7 @@ try:
     yesterday_price = int(curr_data['stck_sdpr']) 
     change_rate = float(curr_data['prdy_ctrt']) 
     
-    chart_df = api.get_daily_price(target_code, 150)
+    chart_df = candle_store.get_daily(target_code, CHART_PERIODS[chart_period])
     
 except Exception as e:
     st.error(f"데이터 로딩 실패: {e}")
@@ -254,8 +246,9 @@ with tab2:
         new_manual_sell = st.number_input("매도 희망가", value=my_setting['manual_sell'], step=100, key=f"ms_{target_code}")
 
 # 최종 목표가 결정
-final_buy_price = new_manual_buy if new_manual_buy > 0 else calc_buy_price
-final_sell_price = new_manual_sell if new_manual_sell > 0 else calc_sell_price
+final_buy_price, final_sell_price = calc_target_prices(
+    {"buy_pct": new_buy_pct, "sell_pct": new_sell_pct, "manual_buy": new_manual_buy, "manual_sell": new_manual_sell},
+    yesterday_price)
 
 c1, c2, c3 = st.columns([1, 1, 2])
 with c1: 
@@ -268,7 +261,7 @@ with c3:
     new_auto_on = st.toggle("🚀 자동매매 시작", value=my_setting['auto_on'], key=f"auto_{target_code}")
     if new_auto_on: st.success("자동매매 실행 중...")
 
-# [중요] 변경된 설정값을 저장소에 업데이트하고 파일 저장
+# [중요] 변경된 설정값을 저장소에 업데이트 (해당 종목 행만 저장)
 # 위젯의 값(new_...)들이 바뀌면 바로 반영됨
 if (my_setting['buy_pct'] != new_buy_pct or my_setting['sell_pct'] != new_sell_pct or
     my_setting['qty'] != new_qty or my_setting['auto_on'] != new_auto_on or
@@ -282,43 +275,92 @@ if (my_setting['buy_pct'] != new_buy_pct or my_setting['sell_pct'] != new_sell_p
         "qty": new_qty,
         "auto_on": new_auto_on
     }
-    save_data() # 파일에 영구 저장
+    store.update_settings(target_code, **st.session_state['stock_settings'][target_code]) # DB 에 영구 저장
 
 # ------------------------------------------------
-# 3. 매매 실행
+# 3. 매매 실행 현황 (주문은 engine.py 가 담당)
 # ------------------------------------------------
 if st.button("🔄 새로고침"): st.rerun()
 
-history = st.session_state['trade_history'][target_code]
-
-# [중요] 개별 설정된 'new_auto_on'이 켜져 있을 때만 동작
-if new_auto_on:
-    # 매수 로직
-    if current_price <= final_buy_price and not history['buy_ordered']:
-        res = api.send_order(target_code, new_qty, 'buy')
-        if res['rt_cd'] == '0':
-            msg = f"[매수] {target_name} 체결\n가격: {current_price}원\n수량: {new_qty}주"
-            kakao_msg.send_message(msg); st.toast(msg)
-            history['buy_ordered'] = True
-    
-    # 매도 로직
-    if current_price >= final_sell_price and not history['sell_ordered']:
-        res = api.send_order(target_code, new_qty, 'sell')
-        if res['rt_cd'] == '0':
-            msg = f"[매도] {target_name} 체결\n가격: {current_price}원\n수량: {new_qty}주"
-            kakao_msg.send_message(msg); st.toast(msg)
-            history['sell_ordered'] = True
-
-if history['buy_ordered']: st.info("✅ 오늘 매수 완료")
-if history['sell_ordered']: st.info("✅ 오늘 매도 완료")
-
-# 차트 그리기
-fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.7, 0.3])
-fig.add_trace(go.Candlestick(x=chart_df['Date'], open=chart_df['Open'], high=chart_df['High'], low=chart_df['Low'], close=chart_df['Close'], name="Price", increasing_line_color='#ef404a', decreasing_line_color='#2c56a8'), row=1, col=1)
-fig.add_trace(go.Scatter(x=chart_df['Date'], y=chart_df['MA20'], line=dict(color='orange', width=1), name="MA20"), row=1, col=1)
-colors = ['#ef404a' if c >= o else '#2c56a8' for c, o in zip(chart_df['Close'], chart_df['Open'])]
-fig.add_trace(go.Bar(x=chart_df['Date'], y=chart_df['Volume'], name="Volume", marker_color=colors), row=2, col=1)
-fig.add_hline(y=final_buy_price, line_dash="dot", line_color="red", row=1, col=1)
-fig.add_hline(y=final_sell_price, line_dash="dot", line_color="blue", row=1, col=1)
-fig.update_layout(height=600, xaxis_rangeslider_visible=False, margin=dict(t=10, b=10, l=10, r=10), showlegend=False)
+# 오늘 주문 (주문 관리자가 DB 에 기록, 최신순)
+today_orders = store.get_orders(trade_date=time.strftime("%Y-%m-%d"), code=target_code)
+if new_auto_on and engine_state.get('status') not in ('running', 'market_closed'):
+    st.warning("자동매매 엔진이 동작 중이 아닙니다. 주문이 나가지 않습니다.")
+
+engine_quote = engine_state.get('quotes', {}).get(target_code)
+if engine_quote: st.caption(f"엔진 최근 시세: {engine_quote['price']:,}원 ({engine_quote['time']})")
+if engine_state.get('stream'): st.caption(f"실시간 수신 지연: {engine_state['stream'].get('latency_last_ms') or 0:.2f}ms")
+
+ORDER_STATUS_LABELS = {"new": "전송 대기", "sending": "전송 중", "submitted": "접수", "partial": "부분체결",
+                       "filled": "체결 완료", "cancelled": "취소", "unknown": "확인 중", "rejected": "거부"}
+for side, label in (('buy', "매수"), ('sell', "매도")):
+    order = next((o for o in today_orders if o['side'] == side and o['status'] != 'rejected'), None)
+    if order:
+        st.info(f"✅ 오늘 {label} 주문: {ORDER_STATUS_LABELS[order['status']]} ({order['filled_qty']}/{order['qty']}주"
+                + (f", 평균 {order['avg_price']:,.0f}원)" if order['filled_qty'] else ")"))
+
+if today_orders:
+    with st.expander(f"📒 오늘 주문 내역 ({len(today_orders)}건)"):
+        orders_df = pd.DataFrame(today_orders)[['client_id', 'side', 'qty', 'price', 'status', 'filled_qty', 'avg_price', 'odno', 'msg']]
+        orders_df['status'] = orders_df['status'].map(ORDER_STATUS_LABELS)
+        st.dataframe(orders_df, hide_index=True, use_container_width=True)
+
+# ------------------------------------------------
+# 4. 조건 알림 (엔진이 시세마다 검사 -> 카카오 알림 또는 주문)
+# ------------------------------------------------
+alert_rules = store.get_alert_rules(code=target_code)
+with st.expander(f"🔔 조건 알림 ({len(alert_rules)}개)"):
+    for rule in alert_rules:
+        a1, a2, a3 = st.columns([5, 1, 1])
+        scope = "관심종목 전체" if rule['code'] is None else get_stock_name(target_code)
+        action = ACTIONS[rule['action']] + (f" {rule['qty']}주" if rule['action'] != "notify" else "")
+        a1.write(f"{rule['name'] or describe_rule(rule)} · {scope} · {action}")
+        enabled = a2.toggle("사용", value=rule['enabled'], key=f"alert_on_{rule['id']}")
+        if enabled != rule['enabled']: store.update_alert_rule(rule['id'], enabled=int(enabled))
+        if a3.button("🗑️", key=f"alert_del_{rule['id']}"):
+            store.remove_alert_rule(rule['id'])
+            st.rerun()
+
+    with st.form(f"alert_form_{target_code}", clear_on_submit=True):
+        f1, f2, f3 = st.columns(3)
+        alert_kind = f1.selectbox("조건", list(KINDS), format_func=KINDS.get)
+        alert_op = f2.selectbox("방향", list(OPS), format_func=OPS.get, help="이동평균 교차: 이상 = 상향 돌파, 이하 = 하향 돌파")
+        alert_value = f3.number_input("기준값", value=0.0, help="가격(원) / 등락률(%) / RSI / 5일 평균 대비 거래량(%)")
+        f4, f5, f6 = st.columns(3)
+        alert_fast = f4.number_input("빠른 이동평균 (1 = 현재가)", min_value=1, value=5)
+        alert_slow = f5.number_input("느린 이동평균", min_value=2, value=20)
+        alert_action = f6.selectbox("동작", list(ACTIONS), format_func=ACTIONS.get)
+        f7, f8, f9 = st.columns(3)
+        alert_qty = f7.number_input("주문 수량", min_value=0, value=0)
+        alert_debounce = f8.number_input("유지 시간(초)", min_value=0.0, value=0.0, help="조건이 이 시간 동안 유지돼야 발생")
+        alert_cooldown = f9.number_input("재발생 간격(초)", min_value=0.0, value=DEFAULT_COOLDOWN_SEC)
+        alert_all = st.checkbox("관심종목 전체에 적용")
+        if st.form_submit_button("➕ 규칙 추가"):
+            try:
+                store.add_alert_rule(normalize_rule({
+                    "code": None if alert_all else target_code, "kind": alert_kind, "op": alert_op,
+                    "value": alert_value, "fast": alert_fast, "slow": alert_slow, "action": alert_action,
+                    "qty": alert_qty, "debounce_sec": alert_debounce, "cooldown_sec": alert_cooldown}))
+                st.rerun()
+            except ValueError as e:
+                st.error(str(e))
+
+    for row in store.get_alert_log(trade_date=time.strftime("%Y-%m-%d"), code=target_code, limit=20):
+        st.caption(f"{time.strftime('%H:%M:%S', time.localtime(row['ts']))} {row['msg'].splitlines()[0]}")
+
+# 차트 그리기 (종목/마지막 봉/목표가가 같으면 캐시된 Figure 재사용, 긴 기간은 구간별로 묶어서 표시)
+if chart_tf == "D":
+    view_df = chart_df
+elif chart_tf in ("W", "M"):
+    view_df = resample_daily(chart_df, chart_tf)
+else:
+    try:
+        view_df = resample_minutes(load_minute_chart(target_code), chart_tf)
+    except Exception as e:
+        st.warning(f"분봉 조회 실패: {e}")
+        view_df = pd.DataFrame()
+    if view_df.empty:
+        st.info("당일 분봉이 없습니다. (장 시작 전/휴장일)"); view_df = chart_df
+fig = cached_figure(f"{target_code}:{chart_tf}", view_df, final_buy_price, final_sell_price)
+if len(view_df) > MAX_BARS: st.caption(f"봉 {len(view_df):,}개를 {MAX_BARS}개 구간으로 묶어서 표시합니다.")
 st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
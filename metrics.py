@@ -0,0 +1,230 @@
+import bisect
+import contextlib
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# [성능 지표] 프로세스 안의 호출 지연/오류/호출량을 모아 두는 곳
+#   - 히스토그램: 호출 지연 (초, Prometheus 기본 구간) - observe 는 구간 이분 탐색 + 덧셈
+#   - 카운터: 오류 (rt_cd/msg_cd 별), 스로틀, 재시도 등
+#   - 게이지: 현재 값 (호출 버킷 잔량 등 - 읽을 때 콜백으로 계산)
+#   - render(): Prometheus 텍스트 형식 (엔진 --metrics-port 로 /metrics 제공)
+#   - snapshot(): 상태 파일/사이드바 진단 패널용 요약 (건수, p50/p95, 오류 수)
+#   - profile_call(): 한 번의 호출을 cProfile 로 기록 (엔진 --profile)
+# ==========================================
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger("metrics")
+
+def _key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(key, extra=None):
+    items = list(key) + (list(extra) if extra else [])
+    if not items: return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # 마지막 칸: +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max: self.max = value
+
+    def quantile(self, q):
+        # 구간 안에서 선형 보간한 추정값 (Prometheus histogram_quantile 과 같은 방식)
+        if self.count == 0: return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n > 0:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+                return lo + (hi - lo) * (rank - seen) / n
+            seen += n
+        return self.max
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.help = {}
+        self.counters = {} # name -> {labels: 값}
+        self.histograms = {} # name -> {labels: Histogram}
+        self.gauges = {} # name -> {labels: 값 또는 () -> 값}
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, n=1, **labels):
+        key = _key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + n
+
+    def observe(self, name, value, **labels):
+        key = _key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram()
+            hist.observe(value)
+
+    def set_gauge(self, name, value, **labels):
+        # value 가 함수면 읽을 때마다 호출
+        with self.lock:
+            self.gauges.setdefault(name, {})[_key(labels)] = value
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name, **labels):
+        # 함수 데코레이터 버전
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def _gauge_values(self):
+        values = {}
+        for name, series in self.gauges.items():
+            for key, value in series.items():
+                try:
+                    values.setdefault(name, {})[key] = value() if callable(value) else value
+                except Exception as e:
+                    logger.debug("게이지 읽기 실패 %s: %s", name, e)
+        return values
+
+    # -----------------------------------------------------------
+    # [출력] Prometheus 텍스트 형식 0.0.4
+    # -----------------------------------------------------------
+    def render(self):
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                lines += self._header(name, "counter")
+                lines += [f"{name}{_fmt_labels(k)} {v}" for k, v in sorted(series.items())]
+            for name, series in sorted(self._gauge_values().items()):
+                lines += self._header(name, "gauge")
+                lines += [f"{name}{_fmt_labels(k)} {v}" for k, v in sorted(series.items()) if v is not None]
+            for name, series in sorted(self.histograms.items()):
+                lines += self._header(name, "histogram")
+                for key, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, n in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{_fmt_labels(key, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_sum{_fmt_labels(key)} {hist.sum:.6f}")
+                    lines.append(f"{name}_count{_fmt_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name, kind):
+        lines = [f"# HELP {name} {self.help[name]}"] if name in self.help else []
+        return lines + [f"# TYPE {name} {kind}"]
+
+    def snapshot(self):
+        # 사람이 보기 쉬운 요약 (지연은 ms)
+        def ms(v): return None if v is None else round(v * 1000, 1)
+        def label(key): return ",".join(f"{k}={v}" for k, v in key) or "-"
+        with self.lock:
+            latency = {
+                name: {label(k): {"count": h.count, "p50_ms": ms(h.quantile(0.5)), "p95_ms": ms(h.quantile(0.95)),
+                                  "max_ms": ms(h.max)} for k, h in series.items()}
+                for name, series in self.histograms.items()
+            }
+            counters = {name: {label(k): v for k, v in series.items()} for name, series in self.counters.items()}
+            gauges = {name: {label(k): v for k, v in series.items()} for name, series in self._gauge_values().items()}
+        return {"latency": latency, "counters": counters, "gauges": gauges}
+
+# 프로세스 공용 (모듈 함수로 바로 사용)
+REGISTRY = Registry()
+describe = REGISTRY.describe
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+set_gauge = REGISTRY.set_gauge
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+render = REGISTRY.render
+snapshot = REGISTRY.snapshot
+
+describe("kis_request_seconds", "KIS REST 호출 1회 왕복 시간 (재시도는 각각 기록)")
+describe("kis_requests_total", "KIS REST 호출 수 (호출 한도 사용량)")
+describe("kis_errors_total", "KIS 오류 응답/전송 실패 (rt_cd, msg_cd 별)")
+describe("kis_throttled_total", "초당 호출 한도 초과 응답 (EGW00201)")
+describe("kis_rate_wait_seconds", "호출 한도 때문에 기다린 시간")
+describe("kis_rate_tokens", "호출 버킷에 남은 호출 수")
+describe("call_seconds", "주요 함수 실행 시간")
+describe("tick_to_order_seconds", "시세 수신(틱 시작)부터 주문 접수까지")
+describe("order_queue_seconds", "주문 생성부터 전송 시작까지 (전송 큐 대기)")
+describe("engine_tick_seconds", "엔진 폴링 틱 1회 처리 시간")
+describe("kakao_send_seconds", "카카오 메시지 발송 1회 시간")
+describe("kakao_errors_total", "카카오 메시지 발송 실패")
+describe("alerts_fired_total", "조건 알림 발생 (조건 종류, 동작 별)")
+describe("alerts_suppressed_total", "cooldown 으로 건너뛴 조건 알림")
+describe("stream_bad_frames_total", "파싱하지 못하고 건너뛴 웹소켓 프레임")
+
+# -----------------------------------------------------------
+# [엔드포인트] GET /metrics -> Prometheus 텍스트 (백그라운드 스레드)
+# -----------------------------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass # 수집기 호출마다 로그를 남기지 않음
+
+def start_http_server(port, host="0.0.0.0", registry=REGISTRY):
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("지표 엔드포인트: http://%s:%d/metrics", host, server.server_address[1])
+    return server
+
+# -----------------------------------------------------------
+# [프로파일] fn() 한 번을 cProfile 로 -> .prof 저장 + 누적 시간 상위 N개 텍스트
+# -----------------------------------------------------------
+def profile_call(fn, path="profile.prof", top=30):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        fn()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+    return out.getvalue()
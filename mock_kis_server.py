@@ -0,0 +1,329 @@
+import argparse
+import datetime
+import http.server
+import json
+import random
+import threading
+import time
+import urllib.parse
+import zlib
+
+import numpy as np
+
+from kis_api import (PRICE_PATH, DAILY_CHART_PATH, DAILY_CHART_MAX_ROWS, MINUTE_CHART_PATH, ORDER_PATH, ORDER_TR_ID,
+                     CCLD_PATH, BALANCE_PATH, TOKEN_PATH, THROTTLE_MSG_CD)
+
+# ==========================================
+# [가짜 KIS 서버] 실서버/키 없이 KisApi, 엔진, 벤치마크를 돌리기 위한 로컬 서버
+#   실행: python mock_kis_server.py --port 8767 --latency 0.02 --rate 20 --error-rate 0.01
+#   연결: KisApi(app_key="mock", app_secret="mock", base_url="http://127.0.0.1:8767", cano="00000000")
+#   - 토큰 발급/웹소켓 접속키, 현재가, 일봉(100건씩), 당일 분봉(30건씩), 현금 주문, 일별 주문체결 조회, 잔고 조회
+#   - 시세는 종목코드로 시드를 잡은 랜덤워크 (같은 종목은 항상 같은 일봉)
+#   - 시장가 주문은 즉시 체결, 지정가는 현재가에 닿으면 체결 (체결/잔고 조회 때 반영)
+#   - 예수금(cash)에서 시작, 체결되면 예수금/보유종목이 바뀜 (잔고 부족/보유 수량 초과 주문은 거부)
+#   - latency/jitter: 응답 지연, rate: 앱키별 초당 호출 제한 (초과 시 EGW00201)
+#   - error_rate: 무작위 500 응답 비율, fail_next(): 다음 n건 지정 오류, expire_token(): 토큰 만료 응답
+# ==========================================
+START_DATE = datetime.date(2015, 1, 2)
+TOKEN_TTL_SEC = 86400
+TOKEN_EXPIRED_MSG_CD = "EGW00123"
+MINUTE_ROWS = 30
+INITIAL_CASH = 10_000_000
+
+def _ok(body=None, msg="정상처리 되었습니다."):
+    return {"rt_cd": "0", "msg_cd": "MCA00000", "msg1": msg, **(body or {})}
+
+def _error(msg_cd, msg):
+    return {"rt_cd": "1", "msg_cd": msg_cd, "msg1": msg}
+
+class MockKis:
+    def __init__(self, host="127.0.0.1", port=8767, latency=0.0, jitter=0.0, rate=0, error_rate=0.0,
+                 token_ttl=TOKEN_TTL_SEC, cash=INITIAL_CASH, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate = rate
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = set()
+        self.issued = 0
+        self.requests = {} # 경로 -> 호출 수
+        self.windows = {} # 앱키 -> (초, 호출 수)
+        self.failures = [] # fail_next 로 넣은 (상태코드, 응답)
+        days = np.arange(np.datetime64(START_DATE), np.datetime64(datetime.date.today()) + 1)
+        days = days[np.is_busday(days)]
+        self.dates = np.char.replace(np.datetime_as_string(days), "-", "") # 영업일 YYYYMMDD (종목 공용)
+        self.series = {} # 종목 -> OHLCV 배열 (5 x 영업일)
+        self.orders = []
+        self.cash = cash
+        self.positions = {} # 종목 -> [수량, 매입금액]
+        mock = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive (클라이언트 커넥션 풀 재사용)
+            # 헤더/본문을 한 번에 보냄 (나눠 보내면 Nagle + 지연 ACK 로 요청마다 ~40ms 늘어남)
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args): pass
+
+            def _reply(self, status, body, headers=None):
+                raw = json.dumps(body, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(raw)))
+                for k, v in (headers or {}).items(): self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def _handle(self, method):
+                url = urllib.parse.urlsplit(self.path)
+                path = url.path.lstrip("/")
+                params = {k: v[0] for k, v in urllib.parse.parse_qs(url.query, keep_blank_values=True).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                status, payload, headers = mock.handle(method, path, params, body, self.headers)
+                self._reply(status, payload, headers)
+
+            def do_GET(self): self._handle("GET")
+            def do_POST(self): self._handle("POST")
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="mock-kis", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # -----------------------------------------------------------
+    # [오류 주입]
+    # -----------------------------------------------------------
+    def expire_token(self):
+        # 발급한 토큰 전부 무효 -> 다음 호출은 EGW00123, 재발급 후 정상
+        with self.lock:
+            self.tokens.clear()
+
+    def fail_next(self, n=1, status=500, msg_cd="MOCK500", msg="모의 서버 오류"):
+        with self.lock:
+            self.failures += [(status, _error(msg_cd, msg))] * n
+
+    def stats(self):
+        with self.lock:
+            return {"requests": dict(self.requests), "tokens_issued": self.issued, "orders": len(self.orders)}
+
+    # -----------------------------------------------------------
+    # [요청 처리] 지연 -> 호출 제한 -> 오류 주입 -> 인증 -> 경로별 응답
+    # -----------------------------------------------------------
+    def handle(self, method, path, params, body, headers):
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + self.rnd.uniform(-self.jitter, self.jitter)))
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            if self.rate:
+                now = int(time.monotonic())
+                second, count = self.windows.get(headers.get("appkey"), (now, 0))
+                count = count + 1 if second == now else 1
+                self.windows[headers.get("appkey")] = (now, count)
+                if count > self.rate:
+                    return 500, _error(THROTTLE_MSG_CD, "초당 거래건수를 초과하였습니다."), None
+            if self.failures:
+                status, payload = self.failures.pop(0)
+                return status, payload, None
+            if self.error_rate and self.rnd.random() < self.error_rate:
+                return 500, _error("MOCK500", "모의 서버 오류"), None
+
+        if path == TOKEN_PATH:
+            return 200, self.issue_token(), None
+        if path == "oauth2/Approval":
+            return 200, {"approval_key": f"mock-approval-{self.rnd.randrange(10**8)}"}, None
+
+        token = (headers.get("authorization") or "").removeprefix("Bearer ")
+        if token not in self.tokens:
+            return 500, _error(TOKEN_EXPIRED_MSG_CD, "기간이 만료된 token 입니다."), None
+
+        route = {
+            ("GET", PRICE_PATH): self.inquire_price,
+            ("GET", DAILY_CHART_PATH): self.daily_chart,
+            ("GET", MINUTE_CHART_PATH): self.minute_chart,
+            ("POST", ORDER_PATH): self.order_cash,
+            ("GET", CCLD_PATH): self.daily_ccld,
+            ("GET", BALANCE_PATH): self.inquire_balance,
+        }.get((method, path))
+        if route is None:
+            return 404, _error("MOCK404", f"없는 경로: {path}"), None
+        return route(params, body, headers)
+
+    def issue_token(self):
+        with self.lock:
+            self.issued += 1
+            token = f"mock-token-{self.issued}"
+            self.tokens.add(token)
+        expired = (datetime.datetime.now() + datetime.timedelta(seconds=self.token_ttl)).strftime("%Y-%m-%d %H:%M:%S")
+        return {"access_token": token, "token_type": "Bearer", "expires_in": self.token_ttl,
+                "access_token_token_expired": expired}
+
+    # -----------------------------------------------------------
+    # [시세] 종목별 고정 시드 랜덤워크 (영업일만)
+    # -----------------------------------------------------------
+    def _series(self, code):
+        with self.lock:
+            cached = self.series.get(code)
+        if cached is not None: return self.dates, cached
+        n = len(self.dates)
+        rng = np.random.default_rng(zlib.crc32(code.encode()))
+        close = np.maximum(100, (rng.uniform(5000, 200000) * np.exp(np.cumsum(rng.normal(0, 0.02, n))))).round(-1)
+        open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.005, n))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n)))
+        volume = rng.integers(10_000, 2_000_000, n)
+        cached = np.stack([open_.round(-1), high.round(-1), low.round(-1), close, volume]).astype(np.int64)
+        with self.lock:
+            self.series[code] = cached
+        return self.dates, cached
+
+    def current_price(self, code):
+        # 전일 종가 기준 +-3% 안에서 시간에 따라 움직임
+        dates, ohlcv = self._series(code)
+        prev_close = int(ohlcv[3, -2]) if len(dates) > 1 else int(ohlcv[3, -1])
+        phase = zlib.crc32(code.encode()) % 1000
+        price = int(round(prev_close * (1 + 0.03 * np.sin(time.time() / 60 + phase)), -1))
+        return price, prev_close
+
+    def inquire_price(self, params, body, headers):
+        code = params.get("fid_input_iscd", "")
+        price, prev_close = self.current_price(code)
+        change = price - prev_close
+        output = {
+            "stck_prpr": str(price), "stck_sdpr": str(prev_close), "prdy_vrss": str(change),
+            "prdy_ctrt": f"{change / prev_close * 100:.2f}", "stck_oprc": str(prev_close),
+            "stck_hgpr": str(max(price, prev_close)), "stck_lwpr": str(min(price, prev_close)),
+            "acml_vol": "123456",
+        }
+        return 200, _ok({"output": output}), None
+
+    def daily_chart(self, params, body, headers):
+        dates, ohlcv = self._series(params.get("fid_input_iscd", ""))
+        lo = np.searchsorted(dates, params.get("fid_input_date_1", ""))
+        hi = np.searchsorted(dates, params.get("fid_input_date_2", ""), side="right")
+        lo = max(lo, hi - DAILY_CHART_MAX_ROWS) # 최근 쪽 100건
+        rows = [{"stck_bsop_date": str(dates[i]), "stck_oprc": str(ohlcv[0, i]), "stck_hgpr": str(ohlcv[1, i]),
+                 "stck_lwpr": str(ohlcv[2, i]), "stck_clpr": str(ohlcv[3, i]), "acml_vol": str(ohlcv[4, i])}
+                for i in range(hi - 1, lo - 1, -1)]
+        return 200, _ok({"output1": {}, "output2": rows}), None
+
+    def minute_chart(self, params, body, headers):
+        code = params.get("FID_INPUT_ISCD", "")
+        hhmmss = params.get("FID_INPUT_HOUR_1", "153000")
+        end = min(int(hhmmss[:2]) * 60 + int(hhmmss[2:4]), 15 * 60 + 30)
+        price, prev_close = self.current_price(code)
+        today = datetime.date.today().strftime("%Y%m%d")
+        rows = []
+        for m in range(end, max(end - MINUTE_ROWS, 9 * 60 - 1), -1):
+            p = int(round(prev_close * (1 + 0.02 * np.sin(m / 45 + len(code))), -1))
+            rows.append({"stck_bsop_date": today, "stck_cntg_hour": f"{m // 60:02d}{m % 60:02d}00",
+                         "stck_oprc": str(p), "stck_hgpr": str(p + 10), "stck_lwpr": str(p - 10),
+                         "stck_prpr": str(p), "cntg_vol": str(1000 + m)})
+        return 200, _ok({"output1": {}, "output2": rows}), None
+
+    # -----------------------------------------------------------
+    # [주문/체결]
+    # -----------------------------------------------------------
+    def order_cash(self, params, body, headers):
+        side = {v: k for k, v in ORDER_TR_ID.items()}.get(headers.get("tr_id"))
+        qty = int(body.get("ORD_QTY") or 0)
+        if side is None or qty <= 0:
+            return 200, _error("APBK0001", "주문 입력값 오류"), None
+        code = body.get("PDNO", "")
+        price = int(body.get("ORD_UNPR") or 0) or self.current_price(code)[0]
+        with self.lock:
+            if side == "buy" and price * qty > self.cash:
+                return 200, _error("APBK0952", "주문가능금액을 초과 했습니다"), None
+            if side == "sell" and qty > self.positions.get(code, [0, 0])[0] - self._open_sell_qty(code):
+                return 200, _error("APBK0400", "주문 가능한 수량을 초과하였습니다."), None
+            odno = f"{len(self.orders) + 1:010d}"
+            self.orders.append({"odno": odno, "pdno": body.get("PDNO", ""), "side": side, "qty": qty,
+                                "price": int(body.get("ORD_UNPR") or 0), "filled": 0, "avg": 0})
+        return 200, _ok({"output": {"KRX_FWDG_ORD_ORGNO": "00950", "ODNO": odno,
+                                    "ORD_TMD": time.strftime("%H%M%S")}}, "주문 전송 완료 되었습니다."), None
+
+    def _open_sell_qty(self, code):
+        # 미체결 매도 수량 (self.lock 안에서 호출) -> 실제 KIS 처럼 주문가능수량에서 뺌
+        return sum(o["qty"] - o["filled"] for o in self.orders if o["side"] == "sell" and o["pdno"] == code)
+
+    def _fill(self, order):
+        if order["filled"] >= order["qty"]: return # 빠른 확인 (잠금 안에서 다시 확인)
+        price, _ = self.current_price(order["pdno"])
+        limit = order["price"]
+        if not limit or (order["side"] == "buy" and price <= limit) or (order["side"] == "sell" and price >= limit):
+            fill_price = limit or price
+            with self.lock:
+                # 잔고/체결 조회가 동시에 들어와도 한 번만 체결 (확인과 반영을 같은 잠금 안에서)
+                if order["filled"] >= order["qty"]: return
+                order["filled"], order["avg"] = order["qty"], fill_price
+                qty, cost = self.positions.get(order["pdno"], [0, 0])
+                if order["side"] == "buy":
+                    self.cash -= fill_price * order["qty"]
+                    qty, cost = qty + order["qty"], cost + fill_price * order["qty"]
+                else:
+                    self.cash += fill_price * order["qty"]
+                    cost -= cost * order["qty"] // max(qty, 1)
+                    qty -= order["qty"]
+                if qty > 0: self.positions[order["pdno"]] = [qty, cost]
+                else: self.positions.pop(order["pdno"], None)
+
+    def inquire_balance(self, params, body, headers):
+        with self.lock:
+            orders = list(self.orders)
+        for o in orders: self._fill(o)
+        with self.lock:
+            positions = {code: (qty, cost, max(0, qty - self._open_sell_qty(code)))
+                         for code, (qty, cost) in self.positions.items()}
+            cash = self.cash
+        rows = []
+        for code, (qty, cost, sellable) in positions.items():
+            price, _ = self.current_price(code)
+            rows.append({"pdno": code, "prdt_name": code, "hldg_qty": str(qty), "ord_psbl_qty": str(sellable),
+                         "pchs_avg_pric": f"{cost / qty:.4f}", "pchs_amt": str(cost), "prpr": str(price),
+                         "evlu_amt": str(price * qty), "evlu_pfls_amt": str(price * qty - cost)})
+        stock_value = sum(int(r["evlu_amt"]) for r in rows)
+        summary = {"dnca_tot_amt": str(cash), "prvs_rcdl_excc_amt": str(cash), "scts_evlu_amt": str(stock_value),
+                   "tot_evlu_amt": str(cash + stock_value), "nass_amt": str(cash + stock_value)}
+        return 200, _ok({"output1": rows, "output2": [summary], "ctx_area_fk100": "", "ctx_area_nk100": ""}), \
+            {"tr_cont": "D"}
+
+    def daily_ccld(self, params, body, headers):
+        rows = []
+        with self.lock:
+            orders = list(self.orders)
+        for o in reversed(orders):
+            self._fill(o)
+            rows.append({"odno": o["odno"], "pdno": o["pdno"], "sll_buy_dvsn_cd": "02" if o["side"] == "buy" else "01",
+                         "ord_qty": str(o["qty"]), "tot_ccld_qty": str(o["filled"]), "avg_prvs": str(o["avg"]),
+                         "ord_unpr": str(o["price"]), "cncl_yn": "N", "rjct_qty": "0"})
+        return 200, _ok({"output1": rows, "ctx_area_fk100": "", "ctx_area_nk100": ""}), {"tr_cont": "D"}
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 KIS OpenAPI 서버")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--latency", type=float, default=0.0, help="응답 지연 (초)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="지연 편차 (초)")
+    parser.add_argument("--rate", type=int, default=0, help="앱키별 초당 호출 제한 (0 = 없음)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 응답 비율 (0~1)")
+    parser.add_argument("--token-ttl", type=int, default=TOKEN_TTL_SEC, help="토큰 유효 시간 (초)")
+    args = parser.parse_args()
+    mock = MockKis(port=args.port, latency=args.latency, jitter=args.jitter, rate=args.rate,
+                   error_rate=args.error_rate, token_ttl=args.token_ttl)
+    print(f"mock kis: {mock.url}")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(mock.stats(), ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import logging
+import queue
+import threading
+import time
+
+import kakao_msg
+import metrics
+
+# ==========================================
+# [알림 발송기] 카카오 메시지를 백그라운드 스레드에서 발송
+#   - notify() 는 큐에 넣고 바로 반환 (주문 처리 경로를 막지 않음)
+#   - 짧은 시간(coalesce_sec) 안에 몰린 메시지는 글자 수 제한 안에서 한 통으로 합침
+#     (제한보다 긴 메시지는 제한 크기 조각으로 나눠서 보냄 -> 카카오가 거부하지 않음)
+#   - 실패 시 지수 백오프로 재시도 (토큰 만료는 kakao_msg 가 재발급)
+#   - metrics() 로 발송 현황 확인
+# ==========================================
+logger = logging.getLogger("notifier")
+
+class Notifier:
+    def __init__(self, send=None, coalesce_sec=1.0, max_retries=3, max_queue=1000,
+                 text_limit=kakao_msg.TEXT_LIMIT):
+        self.send = send or kakao_msg.send_message
+        self.coalesce_sec = coalesce_sec
+        self.max_retries = max_retries
+        self.text_limit = text_limit
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.counters = {"queued": 0, "sent": 0, "delivered_messages": 0, "failed": 0,
+                         "dropped": 0, "retries": 0}
+        self.last_latency_ms = None
+        self.last_error = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.counters[key] += n
+
+    # -----------------------------------------------------------
+    # [발송 요청] 큐가 가득 차면 버리고 dropped 증가
+    # -----------------------------------------------------------
+    def notify(self, text):
+        try:
+            self.queue.put_nowait((time.monotonic(), text))
+            self._count("queued")
+            return True
+        except queue.Full:
+            self._count("dropped")
+            return False
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        # 남은 메시지는 보내고 종료
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    # -----------------------------------------------------------
+    # [워커] 첫 메시지 후 coalesce_sec 동안 더 모아서 묶음 발송
+    # -----------------------------------------------------------
+    def _run(self):
+        while not (self.stopping.is_set() and self.queue.empty()):
+            try:
+                first = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.coalesce_sec
+            while not self.stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            while True: # 종료 중이면 남은 것까지 한 번에
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for enqueued_at, texts in self._pack(batch):
+                self._deliver(texts, enqueued_at)
+
+    def _pack(self, batch):
+        # 글자 수 제한 안에서 메시지를 이어 붙임 -> [(가장 이른 enqueue 시각, [텍스트...])]
+        packs = []
+        current, size, started = [], 0, None
+        for enqueued_at, text in ((t, chunk) for t, message in batch for chunk in self._split(message)):
+            extra = len(text) + (2 if current else 0)
+            if current and size + extra > self.text_limit:
+                packs.append((started, current))
+                current, size, started = [], 0, None
+                extra = len(text)
+            current.append(text)
+            size += extra
+            started = enqueued_at if started is None else started
+        if current:
+            packs.append((started, current))
+        return packs
+
+    def _split(self, text):
+        # 제한보다 긴 메시지 -> 제한 크기 조각 (가능하면 줄바꿈에서 끊음)
+        chunks = []
+        while len(text) > self.text_limit:
+            cut = text.rfind("\n", 0, self.text_limit + 1)
+            if cut <= 0: cut = self.text_limit
+            chunks.append(text[:cut])
+            text = text[cut:].lstrip("\n")
+        if text or not chunks: chunks.append(text)
+        return chunks
+
+    def _deliver(self, texts, enqueued_at):
+        text = "\n\n".join(texts)
+        delay = 0.5
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                ok = self.send(text)
+                self.last_error = None if ok else "발송 실패 응답"
+                reason = None if ok else "response"
+            except Exception as e:
+                ok = False
+                self.last_error = str(e)
+                reason = "exception"
+            metrics.observe("kakao_send_seconds", time.perf_counter() - started)
+            if reason: metrics.inc("kakao_errors_total", reason=reason)
+            if ok:
+                self._count("sent")
+                self._count("delivered_messages", len(texts))
+                self.last_latency_ms = (time.monotonic() - enqueued_at) * 1000
+                return True
+            if attempt < self.max_retries and not self.stopping.is_set():
+                self._count("retries")
+                time.sleep(delay)
+                delay *= 2
+        self._count("failed")
+        logger.warning("카카오 알림 실패 (%d건): %s", len(texts), self.last_error)
+        return False
+
+    def metrics(self):
+        with self.lock:
+            data = dict(self.counters)
+        data["queue_depth"] = self.queue.qsize()
+        data["last_latency_ms"] = self.last_latency_ms
+        data["last_error"] = self.last_error
+        return data
@@ -0,0 +1,133 @@
+import argparse
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from state_store import StateStore
+from backtest import run_vectorized, ohlc_matrix, FEE_RATE, TAX_RATE, INITIAL_CASH
+
+# ==========================================
+# [파라미터 최적화] buy_pct / sell_pct / qty 조합을 종목별로 탐색
+#   - 그리드 또는 랜덤 탐색, 조합 묶음(chunk) 단위로 프로세스 풀에 분배
+#   - 시세 배열은 공유 메모리에 한 번만 올리고 워커는 붙어서 읽기만 함 (복사 없음)
+#   - 결과 중 종목별 최고 조합을 stock_settings 에 반영 가능 (--apply)
+# ==========================================
+OBJECTIVES = {
+    "return": lambda m: m["return_pct"],
+    "return_dd": lambda m: m["return_pct"] - m["max_drawdown_pct"], # 수익률 - 최대낙폭
+}
+
+def param_grid(buy_range=(-10.0, -0.5, 0.5), sell_range=(0.5, 15.0, 0.5), qtys=(1,)):
+    buys = np.arange(buy_range[0], buy_range[1] + 1e-9, buy_range[2])
+    sells = np.arange(sell_range[0], sell_range[1] + 1e-9, sell_range[2])
+    b, s, q = np.meshgrid(buys, sells, np.asarray(qtys, dtype=float), indexing="ij")
+    return np.column_stack([b.ravel(), s.ravel(), q.ravel()])
+
+def random_params(n, buy_range=(-10.0, -0.5), sell_range=(0.5, 15.0), qtys=(1,), seed=None):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        np.round(rng.uniform(*buy_range, n), 1),
+        np.round(rng.uniform(*sell_range, n), 1),
+        rng.choice(np.asarray(qtys, dtype=float), n),
+    ])
+
+# -----------------------------------------------------------
+# [워커] 프로세스마다 한 번 공유 메모리에 붙어서 배열 뷰를 만들어 둠
+# -----------------------------------------------------------
+_worker = {}
+
+def _init_worker(shm_name, shape, fee_rate, tax_rate, initial_cash):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker["shm"] = shm # 참조 유지 (해제되면 버퍼가 닫힘)
+    _worker["ohlc"] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker["costs"] = dict(fee_rate=fee_rate, tax_rate=tax_rate, initial_cash=initial_cash)
+
+def _run_chunk(params):
+    o, h, l, c = _worker["ohlc"]
+    metrics = run_vectorized(o, h, l, c, params[:, 0], params[:, 1], params[:, 2], **_worker["costs"])
+    return {k: metrics[k] for k in ("return_pct", "max_drawdown_pct", "trades", "pnl")}
+
+# -----------------------------------------------------------
+# [탐색] 반환: 종목별 최고 조합 DataFrame
+# -----------------------------------------------------------
+def optimize(open_, high, low, close, codes, params, objective="return", workers=None, chunk_size=64,
+             min_trades=2, fee_rate=FEE_RATE, tax_rate=TAX_RATE, initial_cash=INITIAL_CASH):
+    ohlc = np.ascontiguousarray(np.stack([open_, high, low, close]), dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=ohlc.nbytes)
+    try:
+        np.ndarray(ohlc.shape, dtype=np.float64, buffer=shm.buf)[:] = ohlc
+        chunks = [params[i:i + chunk_size] for i in range(0, len(params), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(shm.name, ohlc.shape, fee_rate, tax_rate, initial_cash)) as pool:
+            results = list(pool.map(_run_chunk, chunks))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    metrics = {k: np.concatenate([r[k] for r in results]) for k in results[0]} # (P, S)
+    score = OBJECTIVES[objective](metrics).astype(float)
+    score[metrics["trades"] < min_trades] = -np.inf # 거래가 거의 없는 조합은 제외
+    best = np.argmax(score, axis=0)
+    cols = np.arange(len(codes))
+    return pd.DataFrame({
+        "code": codes,
+        "buy_pct": params[best, 0],
+        "sell_pct": params[best, 1],
+        "qty": params[best, 2].astype(int),
+        "score": score[best, cols],
+        "return_pct": metrics["return_pct"][best, cols],
+        "max_drawdown_pct": metrics["max_drawdown_pct"][best, cols],
+        "trades": metrics["trades"][best, cols],
+    })
+
+def apply_best(best, store=None):
+    # 최적 조합을 종목별 설정에 반영 (직접 입력가는 0 으로 초기화해서 % 기준이 쓰이게 함)
+    # 해당 종목 행의 해당 값만 갱신 -> 화면에서 바꾼 auto_on 등은 그대로 유지
+    store = store or StateStore()
+    for row in best.itertuples():
+        if not np.isfinite(row.score): continue
+        store.update_settings(row.code, buy_pct=float(row.buy_pct), sell_pct=float(row.sell_pct),
+                              qty=int(row.qty), manual_buy=0, manual_sell=0)
+    return store.get_all_settings()
+
+def main():
+    from kis_api import KisApi
+    from candle_store import CandleStore, to_yyyymmdd
+
+    parser = argparse.ArgumentParser(description="buy_pct / sell_pct 최적화")
+    parser.add_argument("--codes", help="쉼표 구분 종목코드 (기본: 관심종목)")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--random", type=int, default=0, help="랜덤 탐색 조합 수 (0 이면 그리드)")
+    parser.add_argument("--qtys", default="1", help="수량 후보 (쉼표 구분)")
+    parser.add_argument("--objective", choices=list(OBJECTIVES), default="return")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--apply", action="store_true", help="최적값을 종목별 설정(stock_bot.db)에 저장")
+    args = parser.parse_args()
+
+    state = StateStore()
+    codes = args.codes.split(",") if args.codes else state.get_watchlist()
+    api = KisApi()
+    if not api.get_access_token():
+        raise SystemExit("API 토큰 발급 실패! 키 값을 확인하세요.")
+    store = CandleStore(api)
+    start = to_yyyymmdd(datetime.datetime.now() - datetime.timedelta(days=args.days))
+    end = to_yyyymmdd(datetime.datetime.now())
+    for code in codes:
+        store.sync(code, start, end)
+    codes, _, arrays = ohlc_matrix(store.load_many(codes, start, end), codes)
+
+    qtys = [int(q) for q in args.qtys.split(",")]
+    params = random_params(args.random, qtys=qtys) if args.random else param_grid(qtys=qtys)
+    best = optimize(arrays["Open"], arrays["High"], arrays["Low"], arrays["Close"], codes, params,
+                    objective=args.objective, workers=args.workers)
+    print(best.round(2).to_string(index=False))
+    if args.apply:
+        apply_best(best, state)
+        print("종목별 설정에 반영했습니다.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import datetime
+import logging
+import queue
+import threading
+import time
+
+import metrics
+
+# ==========================================
+# [주문 관리자] 주문 상태를 DB(stock_bot.db orders)에 남기고 실제 체결을 대조
+#   new -> sending -> submitted -> partial -> filled
+#                  \-> rejected       \-> cancelled
+#   sending 중 응답을 못 받으면(타임아웃/재시작) unknown -> 체결 조회에서 찾으면 submitted
+#
+#   - submit() 은 DB 에 주문을 만들고 큐에 넣은 뒤 바로 반환 (판단 루프 비차단)
+#   - 같은 날 같은 종목/방향은 한 번만 (client_id + DB 트랜잭션으로 재시작해도 중복 없음)
+#   - 주문 전송은 전송 스레드, 체결 확인은 조회 스레드가 일별 주문체결 조회(VTTC8001R)로 처리
+#   - 체결 수량이 늘어날 때마다 on_fill(주문, 체결수량, 체결가) 호출 + trade_history 기록
+# ==========================================
+OPEN_STATUSES = ("sending", "submitted", "partial", "unknown")
+SIDE_CODES = {"02": "buy", "01": "sell"} # sll_buy_dvsn_cd
+
+logger = logging.getLogger("orders")
+
+def tick_size(price):
+    # 유가증권/코스닥 호가 단위 (2023.01 개편 기준)
+    if price < 2000: return 1
+    if price < 5000: return 5
+    if price < 20000: return 10
+    if price < 50000: return 50
+    if price < 200000: return 100
+    if price < 500000: return 500
+    return 1000
+
+def limit_price(price, side):
+    # 호가 단위에 맞춤: 매수는 내림, 매도는 올림 (목표가보다 불리하게 주문하지 않음)
+    tick = tick_size(price)
+    if side == 'buy':
+        return int(price // tick * tick)
+    return int(-(-price // tick) * tick)
+
+def _normalize_odno(odno):
+    return (odno or "").lstrip("0")
+
+def _int(value):
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+class OrderManager:
+    def __init__(self, api, store, order_type="market", on_fill=None, on_reject=None,
+                 poll_sec=3.0, unknown_grace_sec=120.0):
+        self.api = api
+        self.store = store
+        self.order_type = order_type
+        self.on_fill = on_fill
+        self.on_reject = on_reject
+        self.poll_sec = poll_sec
+        self.unknown_grace_sec = unknown_grace_sec
+
+        self.lock = threading.Lock()
+        self.orders = {} # client_id -> 주문 (오늘 것만)
+        self.active = {} # (code, side) -> client_id (거부되지 않은 주문)
+        self.trade_date = None
+        self.send_queue = queue.Queue()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.last_reconcile = None
+        self.reconcile_ms = None
+        self.last_error = None
+
+    # -----------------------------------------------------------
+    # [일자 관리] 오늘 주문만 메모리에 (날짜가 바뀌면 자동으로 비워짐)
+    # -----------------------------------------------------------
+    def roll(self, trade_date):
+        if trade_date == self.trade_date: return
+        orders = self.store.get_orders(trade_date=trade_date)
+        with self.lock:
+            self.trade_date = trade_date
+            self.orders = {o['client_id']: o for o in orders}
+            self.active = {}
+            for o in sorted(orders, key=lambda o: o['created_at']):
+                if o['status'] != "rejected":
+                    self.active[(o['code'], o['side'])] = o['client_id']
+
+    def history(self, code):
+        # decide_orders 용 (O(1) - 메모리 조회만)
+        return {'buy_ordered': (code, 'buy') in self.active, 'sell_ordered': (code, 'sell') in self.active}
+
+    def open_orders(self):
+        with self.lock:
+            return [dict(o) for o in self.orders.values() if o['status'] in OPEN_STATUSES]
+
+    # -----------------------------------------------------------
+    # [주문 접수] 중복이면 None
+    # -----------------------------------------------------------
+    def submit(self, code, side, qty, price):
+        if self.trade_date is None: self.roll(datetime.date.today().isoformat())
+        if (code, side) in self.active: return None
+        order_price = limit_price(price, side) if self.order_type == "limit" else 0
+        order = self.store.create_order(self.trade_date, code, side, qty, order_price)
+        if order is None: # 다른 프로세스가 먼저 만든 경우 -> 메모리도 DB 와 맞춤
+            self.reload()
+            return None
+        with self.lock:
+            self.orders[order['client_id']] = order
+            self.active[(code, side)] = order['client_id']
+        self.send_queue.put(order['client_id'])
+        return order
+
+    def reload(self):
+        date, self.trade_date = self.trade_date, None
+        self.roll(date)
+
+    def _update(self, updates, trades=()):
+        # DB 먼저 커밋하고 메모리 반영
+        self.store.update_orders(updates, trades)
+        now = time.time()
+        with self.lock:
+            for client_id, fields in updates:
+                order = self.orders.get(client_id)
+                if order is None: continue
+                order.update(fields, updated_at=now)
+                if fields.get('status') == "rejected" and self.active.get((order['code'], order['side'])) == client_id:
+                    del self.active[(order['code'], order['side'])] # 거부되면 다시 주문 가능
+
+    # -----------------------------------------------------------
+    # [전송 스레드]
+    # -----------------------------------------------------------
+    def _send_loop(self):
+        while not self.stopping.is_set():
+            try:
+                client_id = self.send_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            self._send(client_id)
+
+    def _send(self, client_id):
+        order = self.orders.get(client_id)
+        if order is None or order['status'] != "new": return
+        metrics.observe("order_queue_seconds", max(0.0, time.time() - order['created_at']))
+        self._update([(client_id, {"status": "sending"})])
+        try:
+            with metrics.timer("call_seconds", fn="send_order"):
+                res = self.api.send_order(order['code'], order['qty'], order['side'], order['price'])
+        except Exception as e:
+            # 접수 여부를 모름 -> 체결 조회에서 확인
+            self.last_error = f"{order['code']} {order['side']} 주문 응답 없음: {e}"
+            logger.warning(self.last_error)
+            self._update([(client_id, {"status": "unknown", "msg": str(e)[:200]})])
+            return
+        if res.get('rt_cd') == '0':
+            odno = (res.get('output') or {}).get('ODNO', '')
+            self._update([(client_id, {"status": "submitted", "odno": odno, "msg": res.get('msg1', '')})])
+            logger.info("주문 접수 %s %s %s주 (%s)", order['code'], order['side'], order['qty'], odno)
+        else:
+            self._update([(client_id, {"status": "rejected", "msg": res.get('msg1', '')})])
+            if self.on_reject: self.on_reject(self.orders[client_id])
+
+    # -----------------------------------------------------------
+    # [체결 대조] 일별 주문체결 조회 한 번으로 미체결 주문 전체 갱신
+    # -----------------------------------------------------------
+    def reconcile(self):
+        open_orders = self.open_orders()
+        if not open_orders: return 0
+        started = time.perf_counter()
+        rows = self.api.get_daily_ccld(self.trade_date.replace("-", ""))
+        by_odno = {_normalize_odno(r.get('odno')): r for r in rows}
+        known = {_normalize_odno(o['odno']) for o in self.orders.values() if o['odno']}
+
+        updates, trades, fills, rejects = [], [], [], []
+        now = time.time()
+        for order in open_orders:
+            row = by_odno.get(_normalize_odno(order['odno'])) if order['odno'] else None
+            if row is None and order['status'] == "unknown":
+                row = self._match_unknown(order, rows, known)
+            if row is None:
+                if order['status'] == "unknown" and now - order['updated_at'] > self.unknown_grace_sec:
+                    updates.append((order['client_id'], {"status": "rejected", "msg": "주문 접수 확인 불가"}))
+                    rejects.append(order)
+                continue
+
+            fields = self._fields_from_row(order, row)
+            if not fields: continue
+            updates.append((order['client_id'], fields))
+            delta = fields.get('filled_qty', order['filled_qty']) - order['filled_qty']
+            if delta > 0:
+                # 누적 평균가 -> 이번 체결분 가격
+                total = fields['avg_price'] * fields['filled_qty'] - order['avg_price'] * order['filled_qty']
+                price = round(total / delta)
+                trades.append((order['code'], order['side'], price, delta, '0', order['odno'] or fields.get('odno', '')))
+                fills.append((order, delta, price))
+            if fields.get('status') == "rejected": rejects.append(order)
+
+        self._update(updates, trades)
+        for order, qty, price in fills:
+            if self.on_fill: self.on_fill(self.orders.get(order['client_id'], order), qty, price)
+        for order in rejects:
+            if self.on_reject: self.on_reject(self.orders.get(order['client_id'], order))
+        self.last_reconcile = datetime.datetime.now().strftime("%H:%M:%S")
+        self.reconcile_ms = (time.perf_counter() - started) * 1000
+        return len(updates)
+
+    def _match_unknown(self, order, rows, known):
+        # 주문번호를 못 받은 주문: 같은 종목/방향/수량이면서 아직 연결 안 된 주문번호를 찾음
+        for row in rows:
+            odno = _normalize_odno(row.get('odno'))
+            if odno in known: continue
+            if row.get('pdno') == order['code'] and SIDE_CODES.get(row.get('sll_buy_dvsn_cd')) == order['side'] \
+                    and _int(row.get('ord_qty')) == order['qty']:
+                known.add(odno)
+                return row
+        return None
+
+    def _fields_from_row(self, order, row):
+        filled = _int(row.get('tot_ccld_qty'))
+        fields = {}
+        if not order['odno']: fields['odno'] = row.get('odno', '')
+        if filled != order['filled_qty']:
+            fields['filled_qty'] = filled
+            fields['avg_price'] = float(row.get('avg_prvs') or 0)
+
+        if filled >= order['qty']: status = "filled"
+        elif row.get('cncl_yn') == 'Y': status = "cancelled"
+        elif _int(row.get('rjct_qty')) > 0 and filled == 0: status = "rejected"
+        elif filled > 0: status = "partial"
+        else: status = "submitted"
+        if status != order['status']: fields['status'] = status
+        return fields
+
+    def _reconcile_loop(self):
+        while not self.stopping.wait(self.poll_sec):
+            try:
+                self.reconcile()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"체결 조회 실패: {e}"
+                logger.warning(self.last_error)
+
+    # -----------------------------------------------------------
+    # [시작/종료] 재시작 시 보내지 못한 주문은 다시 큐에, 응답 못 받은 주문은 unknown 으로
+    # -----------------------------------------------------------
+    def start(self):
+        self.roll(self.trade_date or datetime.date.today().isoformat())
+        stale = [o for o in self.orders.values() if o['status'] == "sending"]
+        self._update([(o['client_id'], {"status": "unknown"}) for o in stale])
+        for o in self.orders.values():
+            if o['status'] == "new": self.send_queue.put(o['client_id'])
+
+        self.stopping.clear()
+        self.threads = [threading.Thread(target=self._send_loop, name="order-send", daemon=True),
+                        threading.Thread(target=self._reconcile_loop, name="order-reconcile", daemon=True)]
+        for t in self.threads: t.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self.stopping.set()
+        for t in self.threads: t.join(timeout)
+
+    def metrics(self):
+        with self.lock:
+            counts = {}
+            for o in self.orders.values():
+                counts[o['status']] = counts.get(o['status'], 0) + 1
+        return {
+            "trade_date": self.trade_date,
+            "counts": counts,
+            "send_queue": self.send_queue.qsize(),
+            "last_reconcile": self.last_reconcile,
+            "reconcile_ms": self.reconcile_ms,
+            "last_error": self.last_error,
+        }
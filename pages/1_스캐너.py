@@ -0,0 +1,57 @@
+import warnings
+warnings.filterwarnings("ignore")
+
+import streamlit as st
+import scanner
+from ui_resources import get_api, get_store, get_symbols, get_candle_store
+
+# --- 페이지 설정 ---
+st.set_page_config(layout="wide", page_title="스마트 주식 봇 - 종목 스캐너")
+
+# ==========================================
+# [종목 스캐너] 관심종목 / 시장 전체 AI 점수 순위
+# ==========================================
+st.title("🔎 종목 스캐너")
+
+saved_data = get_store().load_all()
+watchlist = saved_data['watchlist']
+stock_names = saved_data['stock_names']
+stock_settings = saved_data['stock_settings']
+
+# --- API 연결 (토큰은 메인 화면과 같은 토큰 관리자에서) ---
+api = get_api()
+if not api.get_access_token():
+    st.error("API 토큰 발급 실패! 키 값을 확인하세요.")
+    st.stop()
+candle_store = get_candle_store()
+
+SCOPES = {"관심종목": None, "코스피": ("KOSPI",), "코스닥": ("KOSDAQ",), "전체 시장": ("KOSPI", "KOSDAQ")}
+c1, c2 = st.columns([3, 1])
+with c1:
+    scope = st.radio("대상", list(SCOPES), horizontal=True, key="scan_scope")
+with c2:
+    run = st.button("🚀 스캔 실행", use_container_width=True)
+
+if scope != "관심종목":
+    st.caption("시장 전체는 처음 한 번 최근 영업일 시세를 받아 캐시에 저장합니다. 이후에는 새 날짜만 받습니다.")
+
+if run:
+    with st.spinner("스캔 중..."):
+        try:
+            if SCOPES[scope] is None:
+                table = scanner.scan_watchlist(api, candle_store, watchlist, stock_names, stock_settings)
+            else:
+                table = scanner.scan_universe(candle_store, SCOPES[scope], settings=stock_settings,
+                                               symbols=get_symbols())
+        except Exception as e:
+            st.error(f"스캔 실패: {e}")
+            st.stop()
+    st.session_state['scan_result'] = (scope, table)
+
+if 'scan_result' in st.session_state:
+    result_scope, table = st.session_state['scan_result']
+    signals = st.multiselect("신호 필터", ["강력 매수", "매수 우위", "관망 (Hold)", "매도 우위"], key="scan_filter")
+    if signals:
+        table = table[table['신호'].isin(signals)]
+    st.caption(f"{result_scope} · {len(table):,}종목")
+    st.dataframe(table, use_container_width=True, hide_index=True, height=600)
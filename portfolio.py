@@ -0,0 +1,279 @@
+import datetime
+import logging
+import threading
+
+import metrics
+
+# ==========================================
+# [포트폴리오/위험 관리] 계좌 잔고 + 보유종목 장부, 주문 전 한도 검사
+#   - 잔고 조회(VTTC8434R)를 refresh_sec 주기로 받아 장부를 맞춤 (서버 값이 기준)
+#   - 그 사이에는 체결(on_fill)/시세(on_price)로 장부를 증분 갱신
+#   - check(): 주문 전 수량 조정/거부 - 딕셔너리 조회와 합계 값만 사용 (종목 수와 무관하게 O(1))
+#       매도: 주문 가능 수량 - 서버 잔고에 아직 반영 안 된 매도 수량까지만 (초과 매도 방지)
+#         (서버 주문가능수량(ord_psbl_qty)은 이미 접수된 매도 주문을 뺀 값 -> 그 몫은 다시 빼지 않음)
+#       매수: 일일 손실 한도 -> 주문 가능 현금 -> 종목별 한도 -> 전체 노출 한도 순으로 수량을 줄임
+#   - size(): 매수 수량 결정 (fixed: 설정 수량 / cash: 순자산 비율 / atr: 손실 위험 비율 ÷ ATR)
+#   - 주문이 접수되면 reserve() 로 현금/매도 수량을 잡아 두고, 체결/거부 시 풀어 줌
+# ==========================================
+DEFAULT_LIMITS = {
+    "max_position_pct": 0.2, # 종목당 순자산 대비 최대 보유 비율
+    "max_position_value": 0, # 종목당 최대 보유 금액 (0 = 제한 없음)
+    "max_exposure_pct": 0.9, # 전체 주식 평가금액 / 순자산 최대 비율
+    "daily_loss_pct": 0.03, # 오늘 시작 순자산 대비 손실이 이 비율을 넘으면 매수 중단 (0 = 제한 없음)
+    "sizing": "fixed", # fixed / cash / atr
+    "cash_pct": 0.05, # sizing=cash: 주문 1건에 쓰는 순자산 비율
+    "atr_risk_pct": 0.005, # sizing=atr: 주문 1건의 위험(ATR x atr_mult) 을 순자산의 이 비율로
+    "atr_mult": 2.0,
+}
+REFRESH_SEC = 60.0
+RETRY_SEC = 10.0
+
+logger = logging.getLogger("portfolio")
+
+def _num(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+class Portfolio:
+    def __init__(self, api, limits=None, refresh_sec=REFRESH_SEC):
+        self.api = api
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.refresh_sec = refresh_sec
+        self.lock = threading.Lock()
+
+        self.positions = {} # 종목 -> {"qty", "sellable", "avg_price", "price"}
+        self.cash = 0.0 # 주문 가능 현금
+        self.exposure = 0.0 # 보유종목 평가금액 합계 (시세/체결마다 차이만 더함)
+        self.reserved_cash = 0.0 # 접수됐지만 체결 안 된 매수 금액
+        self.pending_sell = {} # 종목 -> 서버 주문가능수량에 아직 반영 안 된 매도 수량
+        self.pending_buy_value = {} # 종목 -> 접수됐지만 체결 안 된 매수 금액
+        self.reservations = {} # client_id -> [종목, 방향, 남은 수량, 주문 단가, 서버 반영 수량]
+        self.atr = {} # 종목 -> ATR (sizing=atr)
+
+        self.trade_date = None
+        self.start_equity = None # 오늘 첫 잔고 조회 때 순자산
+        self.realized_pnl = 0.0 # 오늘 체결 기준 실현손익 (참고용)
+        self.ready = False
+        self.last_refresh = None
+        self.last_error = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    @property
+    def equity(self):
+        return self.cash + self.reserved_cash + self.exposure
+
+    # -----------------------------------------------------------
+    # [잔고 동기화] 서버 잔고로 장부를 다시 만듦 (접수 중 주문 예약은 유지)
+    # -----------------------------------------------------------
+    def refresh(self):
+        holdings, summary = self.api.get_balance()
+        positions = {}
+        for row in holdings:
+            qty = int(_num(row.get('hldg_qty')))
+            if qty <= 0: continue
+            positions[row['pdno']] = {
+                "qty": qty,
+                "sellable": int(_num(row.get('ord_psbl_qty', qty))),
+                "avg_price": _num(row.get('pchs_avg_pric')),
+                "price": _num(row.get('prpr')),
+            }
+        cash = _num(summary.get('prvs_rcdl_excc_amt') or summary.get('dnca_tot_amt'))
+        today = datetime.date.today().isoformat()
+        with self.lock:
+            self.positions = positions
+            self.exposure = sum(p["qty"] * p["price"] for p in positions.values())
+            self.cash = cash - self.reserved_cash # 서버 예수금에는 미체결 매수가 아직 남아 있음
+            self._reconcile_sells()
+            if self.trade_date != today:
+                self.trade_date = today
+                self.start_equity = self.equity
+                self.realized_pnl = 0.0
+            self.ready = True
+            self.last_refresh = datetime.datetime.now().strftime("%H:%M:%S")
+        return len(positions)
+
+    def _reconcile_sells(self):
+        # 보유 - 주문가능 = 서버가 잡아 둔 수량 -> 오래된 매도 예약부터 그만큼은 서버 반영으로 보고
+        # pending_sell 에는 나머지(아직 전송 전 등)만 남김 (잡아 둔 수량에 매매 제한분이 섞이면 조금 넉넉해짐)
+        self.pending_sell = {}
+        locked = {code: p["qty"] - p["sellable"] for code, p in self.positions.items()}
+        for res in self.reservations.values(): # 접수 순서
+            code, side, remaining = res[0], res[1], res[2]
+            if side != 'sell': continue
+            res[4] = min(remaining, max(0, locked.get(code, 0)))
+            locked[code] = locked.get(code, 0) - res[4]
+            self.pending_sell[code] = self.pending_sell.get(code, 0) + remaining - res[4]
+
+    def roll(self, trade_date):
+        # 날짜가 바뀌면 남은 예약(취소/만료된 주문)을 비우고 다음 잔고 조회에서 시작 순자산을 다시 잡음
+        with self.lock:
+            if trade_date == self.trade_date: return
+            self.cash += self.reserved_cash
+            self.reserved_cash = 0.0
+            self.pending_sell, self.pending_buy_value, self.reservations = {}, {}, {}
+            self.trade_date = None
+
+    # -----------------------------------------------------------
+    # [증분 갱신] 시세/체결
+    # -----------------------------------------------------------
+    def on_price(self, code, price):
+        pos = self.positions.get(code)
+        if pos is None or price <= 0: return
+        with self.lock:
+            self.exposure += pos["qty"] * (price - pos["price"])
+            pos["price"] = price
+
+    def on_fill(self, order, qty, price):
+        code, side = order['code'], order['side']
+        with self.lock:
+            self._release(order['client_id'], qty, filled=True)
+            pos = self.positions.get(code)
+            if side == 'buy':
+                if pos is None:
+                    pos = self.positions[code] = {"qty": 0, "sellable": 0, "avg_price": 0.0, "price": price}
+                self.exposure += pos["qty"] * (price - pos["price"]) + qty * price
+                pos["avg_price"] = (pos["avg_price"] * pos["qty"] + price * qty) / (pos["qty"] + qty)
+                pos["qty"] += qty
+                pos["sellable"] += qty
+                pos["price"] = price
+                self.cash -= qty * price
+            else:
+                if pos is None: return
+                sold = min(qty, pos["qty"])
+                self.exposure -= sold * pos["price"]
+                self.realized_pnl += (price - pos["avg_price"]) * sold
+                pos["qty"] -= sold
+                pos["sellable"] = min(pos["sellable"], pos["qty"]) # 주문가능 감소분은 _release 에서
+                self.cash += sold * price
+                if pos["qty"] <= 0: del self.positions[code]
+
+    # -----------------------------------------------------------
+    # [주문 예약] 접수된 주문의 현금/매도 수량을 잡아 둠
+    # -----------------------------------------------------------
+    def reserve(self, order, price):
+        code, side, qty = order['code'], order['side'], order['qty']
+        with self.lock:
+            self.reservations[order['client_id']] = [code, side, qty, price, 0]
+            if side == 'buy':
+                self.reserved_cash += qty * price
+                self.cash -= qty * price
+                self.pending_buy_value[code] = self.pending_buy_value.get(code, 0.0) + qty * price
+            else:
+                self.pending_sell[code] = self.pending_sell.get(code, 0) + qty
+
+    def release(self, order):
+        # 거부/취소 - 남은 예약 전부 해제
+        with self.lock:
+            self._release(order['client_id'], None)
+
+    def _release(self, client_id, qty, filled=False):
+        res = self.reservations.get(client_id)
+        if res is None: return
+        code, side, remaining, price, reflected = res
+        qty = remaining if qty is None else min(qty, remaining)
+        if side == 'buy':
+            self.reserved_cash -= qty * price
+            self.cash += qty * price
+            self.pending_buy_value[code] = self.pending_buy_value.get(code, 0.0) - qty * price
+        else:
+            # 서버 반영분부터 소진: 체결이면 반영 안 된 몫만 주문가능에서 빠지고,
+            # 거부/취소면 서버가 잡아 뒀던 몫이 다시 주문가능이 됨
+            from_reflected = min(qty, reflected)
+            res[4] -= from_reflected
+            self.pending_sell[code] = self.pending_sell.get(code, 0) - (qty - from_reflected)
+            pos = self.positions.get(code)
+            if pos is not None:
+                if filled: pos["sellable"] = max(0, pos["sellable"] - (qty - from_reflected))
+                else: pos["sellable"] += from_reflected
+        res[2] -= qty
+        if res[2] <= 0: del self.reservations[client_id]
+
+    # -----------------------------------------------------------
+    # [수량 결정/한도 검사] (허용 수량, 사유) - 허용 수량 0 이면 주문하지 않음
+    # -----------------------------------------------------------
+    def size(self, code, price, setting_qty):
+        sizing = self.limits["sizing"]
+        if sizing == "cash" and price > 0:
+            return int(self.equity * self.limits["cash_pct"] // price)
+        if sizing == "atr" and self.atr.get(code):
+            risk_per_share = self.atr[code] * self.limits["atr_mult"]
+            return int(self.equity * self.limits["atr_risk_pct"] // risk_per_share)
+        return setting_qty
+
+    def check(self, code, side, qty, price):
+        if not self.ready:
+            return 0, "잔고 미확인"
+        if side == 'sell':
+            pos = self.positions.get(code)
+            available = (pos["sellable"] if pos else 0) - self.pending_sell.get(code, 0)
+            if available <= 0: return 0, "보유 수량 없음"
+            return (qty, None) if qty <= available else (available, "보유 수량까지만")
+
+        if price <= 0: return 0, "가격 없음"
+        limits = self.limits
+        equity = self.equity
+        if limits["daily_loss_pct"] and self.start_equity and \
+                equity - self.start_equity <= -limits["daily_loss_pct"] * self.start_equity:
+            return 0, "일일 손실 한도"
+
+        reason = None
+        caps = [(self.cash // price, "주문 가능 현금")]
+        pos = self.positions.get(code)
+        held = (pos["qty"] * pos["price"] if pos else 0.0) + self.pending_buy_value.get(code, 0.0)
+        position_cap = limits["max_position_pct"] * equity
+        if limits["max_position_value"]: position_cap = min(position_cap, limits["max_position_value"])
+        caps.append(((position_cap - held) // price, "종목 한도"))
+        caps.append(((limits["max_exposure_pct"] * equity - self.exposure - self.reserved_cash) // price, "전체 노출 한도"))
+        for cap, label in caps:
+            if cap < qty:
+                qty, reason = max(0, int(cap)), label
+        return qty, reason
+
+    # -----------------------------------------------------------
+    # [주기 동기화 스레드]
+    # -----------------------------------------------------------
+    def start(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            self.last_error = f"잔고 조회 실패: {e}"
+            logger.warning(self.last_error)
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name="portfolio", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+
+    def _run(self):
+        wait = self.refresh_sec if self.ready else RETRY_SEC
+        while not self.stopping.wait(wait):
+            try:
+                with metrics.timer("call_seconds", fn="balance_refresh"):
+                    self.refresh()
+                self.last_error = None
+                wait = self.refresh_sec
+            except Exception as e:
+                self.last_error = f"잔고 조회 실패: {e}"
+                logger.warning(self.last_error)
+                wait = RETRY_SEC
+
+    def status(self):
+        with self.lock:
+            return {
+                "ready": self.ready,
+                "cash": round(self.cash),
+                "equity": round(self.equity),
+                "exposure": round(self.exposure),
+                "reserved_cash": round(self.reserved_cash),
+                "start_equity": None if self.start_equity is None else round(self.start_equity),
+                "realized_pnl": round(self.realized_pnl),
+                "positions": {c: dict(p) for c, p in self.positions.items()},
+                "last_refresh": self.last_refresh,
+                "last_error": self.last_error,
+            }
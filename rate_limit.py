@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+
+# ==========================================
+# [호출 속도 제한] 토큰 버킷 방식
+#   KIS 는 앱키 단위로 초당 TR 호출 건수를 제한함 (초과 시 EGW00201)
+#   - 실전투자: 초당 20건 / 모의투자: 초당 2건
+# ==========================================
+REAL_RATE_PER_SEC = 20
+VTS_RATE_PER_SEC = 2
+
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    # 호출 가능할 때까지 기다린 뒤 토큰 1개 사용, 기다린 시간(초) 반환
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    # 비동기 버전 (이벤트 루프를 막지 않고 대기)
+    async def acquire_async(self):
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+            waited += wait
+
+    # 스로틀(EGW00201) 응답을 받으면 버킷을 비워서 다음 호출을 늦춤
+    def penalize(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0)
+
+# 같은 앱키를 쓰는 클라이언트끼리 하나의 버킷을 공유
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def default_rate(base_url):
+    return VTS_RATE_PER_SEC if "openapivts" in base_url else REAL_RATE_PER_SEC
+
+def get_limiter(app_key, base_url, rate=None):
+    key = (app_key, base_url)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(rate or default_rate(base_url))
+            _limiters[key] = limiter
+        return limiter
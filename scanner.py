@@ -0,0 +1,208 @@
+import datetime
+import logging
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from async_kis_api import fetch_current_prices
+from candle_store import to_yyyymmdd, shift_day
+from data_store import DEFAULT_SETTINGS
+from strategy import calc_target_prices
+from symbol_master import SymbolMaster
+
+# ==========================================
+# [종목 스캐너] 관심종목/시장 전체를 한 번에 점수화해서 표로 반환
+#   - 일봉은 CandleStore 캐시 사용 (빠진 구간만 동기화)
+#   - 지표/점수는 indicators.signal_scores 로 종목 x 일자 배열 한 번에 계산
+#   - 시장 전체(KOSPI/KOSDAQ)는 pykrx 의 날짜별 전 종목 시세로 채움 (날짜당 1회 호출)
+# ==========================================
+LOOKBACK_DAYS = 60 # 달력일 기준, MA20/RSI14 에 충분한 영업일 확보
+MARKETS = ("KOSPI", "KOSDAQ")
+
+logger = logging.getLogger("scanner")
+
+TABLE_COLUMNS = ["종목코드", "종목명", "현재가", "등락률", "신호", "점수", "RSI", "거래량강도",
+                 "매수목표", "매도목표", "매수까지%", "매도까지%"]
+
+# -----------------------------------------------------------
+# [배열 변환] 종목별 DataFrame -> 날짜 정렬된 (종목 x 일자) 배열
+# -----------------------------------------------------------
+def build_matrix(frames, codes):
+    codes = [c for c in codes if c in frames and not frames[c].empty]
+    if not codes:
+        return [], np.empty((0, 0)), np.empty((0, 0)), []
+    dates = sorted(set().union(*(frames[c]['Date'] for c in codes)))
+    date_idx = {d: i for i, d in enumerate(dates)}
+    close = np.full((len(codes), len(dates)), np.nan)
+    volume = np.full((len(codes), len(dates)), np.nan)
+    for row, code in enumerate(codes):
+        df = frames[code]
+        cols = np.fromiter((date_idx[d] for d in df['Date']), dtype=int, count=len(df))
+        close[row, cols] = df['Close'].to_numpy(dtype=float)
+        volume[row, cols] = df['Volume'].to_numpy(dtype=float)
+    return codes, close, volume, dates
+
+def _last_valid(x):
+    # 행마다 마지막 유효값 (거래정지 등으로 마지막 날이 비어 있으면 그 전 값)
+    mask = ~np.isnan(x)
+    idx = np.where(mask.any(axis=1), x.shape[1] - 1 - np.argmax(mask[:, ::-1], axis=1), 0)
+    return x[np.arange(x.shape[0]), idx], idx
+
+def _prev_valid(x, last_idx):
+    out = np.full(x.shape[0], np.nan)
+    for row, i in enumerate(last_idx):
+        prev = x[row, :i][~np.isnan(x[row, :i])]
+        if len(prev): out[row] = prev[-1]
+    return out
+
+# -----------------------------------------------------------
+# [점수표] 배열 + 현재가/기준가 -> 정렬된 DataFrame
+# -----------------------------------------------------------
+def score_table(codes, close, volume, current_price, yesterday_price, names=None, settings=None):
+    names = names or {}
+    settings = settings or {}
+    result = indicators.signal_scores(close, volume, current_price)
+
+    buy_targets = np.empty(len(codes))
+    sell_targets = np.empty(len(codes))
+    for i, code in enumerate(codes):
+        if np.isnan(yesterday_price[i]):
+            buy_targets[i] = sell_targets[i] = np.nan
+            continue
+        buy_targets[i], sell_targets[i] = calc_target_prices(settings.get(code, DEFAULT_SETTINGS), yesterday_price[i])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_rate = (current_price / yesterday_price - 1) * 100
+        to_buy = (buy_targets / current_price - 1) * 100
+        to_sell = (sell_targets / current_price - 1) * 100
+
+    labels = [indicators.signal_label(s)[0] for s in result["score"]]
+    table = pd.DataFrame({
+        "종목코드": codes,
+        "종목명": [names.get(c, c) for c in codes],
+        "현재가": current_price,
+        "등락률": np.round(change_rate, 2),
+        "신호": labels,
+        "점수": result["score"],
+        "RSI": np.round(result["rsi"], 1),
+        "거래량강도": np.round(result["vol_ratio"], 1),
+        "매수목표": buy_targets,
+        "매도목표": sell_targets,
+        "매수까지%": np.round(to_buy, 2),
+        "매도까지%": np.round(to_sell, 2),
+    }, columns=TABLE_COLUMNS)
+    return table.sort_values(["점수", "거래량강도"], ascending=False).reset_index(drop=True)
+
+# -----------------------------------------------------------
+# [관심종목 스캔] 일봉 캐시 + KIS 현재가 일괄 조회
+# -----------------------------------------------------------
+def scan_watchlist(api, candle_store, codes, names=None, settings=None, lookback_days=LOOKBACK_DAYS):
+    end = to_yyyymmdd(datetime.datetime.now())
+    start = to_yyyymmdd(datetime.datetime.now() - datetime.timedelta(days=lookback_days))
+    for code in codes:
+        try:
+            candle_store.sync(code, start, end)
+        except Exception as e:
+            logger.warning("일봉 동기화 실패 %s: %s", code, e)
+
+    frames = candle_store.load_many(codes, start, end)
+    codes, close, volume, _ = build_matrix(frames, codes)
+    if not codes: return pd.DataFrame(columns=TABLE_COLUMNS)
+
+    quotes, errors = fetch_current_prices(api, codes)
+    for code, error in errors.items():
+        logger.warning("시세 조회 실패 %s: %s", code, error)
+
+    last_close, last_idx = _last_valid(close)
+    current = np.array([float(quotes[c]['stck_prpr']) if c in quotes else last_close[i] for i, c in enumerate(codes)])
+    yesterday = np.array([float(quotes[c]['stck_sdpr']) if c in quotes else np.nan for c in codes])
+    fallback = _prev_valid(close, last_idx)
+    yesterday = np.where(np.isnan(yesterday), fallback, yesterday)
+    return score_table(codes, close, volume, current, yesterday, names, settings)
+
+# -----------------------------------------------------------
+# [시장 전체 스캔] pykrx 날짜별 전 종목 시세를 캐시에 채운 뒤 일괄 점수화
+# -----------------------------------------------------------
+def sync_market(candle_store, market="KOSPI", lookback_days=LOOKBACK_DAYS, now=None):
+    from pykrx import stock
+
+    now = now or datetime.datetime.now()
+    today = to_yyyymmdd(now)
+    done = candle_store.market_dates(market)
+    covered = candle_store.market_coverage(market) # 휴장일까지 확인을 마친 구간
+    start = to_yyyymmdd(now - datetime.timedelta(days=lookback_days))
+    days = pd.bdate_range(now - datetime.timedelta(days=lookback_days), now)
+    holidays = None # 영업일 달력으로 확인한 휴장일 (빈 결과가 나왔을 때만 한 번 조회)
+    fetched = 0
+    for day in days:
+        date = to_yyyymmdd(day)
+        if date in done:
+            if not candle_store.day_stale(date, done[date], now): continue # 확정된 봉
+        elif date != today and covered and covered[0] <= date <= covered[1]:
+            continue # 확인된 휴장일
+        df = stock.get_market_ohlcv_by_ticker(date, market=market)
+        if df is None or df.empty or df['종가'].sum() == 0:
+            # 빈 결과만으로는 휴장일인지 조회 실패인지 알 수 없음 -> 달력으로 확인
+            if date == today or date in done: continue # 장 시작 전/재조회 실패 -> 있는 봉 유지
+            if holidays is None: holidays = _market_holidays(stock, start, today, days)
+            if date not in holidays:
+                logger.warning("%s %s 시세 없음 (휴장 미확인) -> 다음 동기화에서 다시 조회", market, date)
+            continue
+        rows = [
+            (code, int(o), int(h), int(l), int(c), int(v))
+            for code, o, h, l, c, v in zip(df.index, df['시가'], df['고가'], df['저가'], df['종가'], df['거래량'])
+            if c > 0
+        ]
+        candle_store.upsert_market_day(market, date, rows)
+        done[date] = None
+        fetched += 1
+
+    # 어제까지 봉이 있거나 휴장이 확인된 날만 기록 -> 다음 스캔에서 다시 묻지 않음
+    #   - 미확인 평일에서 구간을 끊어서 다음 동기화 때 다시 조회되게 함 (오늘은 장중이라 매번)
+    end = shift_day(today, -1)
+    for day in days:
+        date = to_yyyymmdd(day)
+        if date >= today: break
+        if date in done or date in (holidays or ()) or (covered and covered[0] <= date <= covered[1]):
+            continue
+        end = shift_day(date, -1)
+        break
+    if start <= end:
+        if covered and covered[0] <= shift_day(end, 1) and covered[1] >= shift_day(start, -1): # 이어지는 구간이면 합침
+            start, end = min(start, covered[0]), max(end, covered[1])
+        candle_store.set_market_coverage(market, start, end)
+    return fetched
+
+def _market_holidays(stock, start, end, days):
+    # 거래소 영업일 목록에 없는 평일 = 휴장 확정 (달력 조회 실패/빈 결과면 아무 날도 확정하지 않음)
+    try:
+        open_days = {to_yyyymmdd(d) for d in stock.get_previous_business_days(fromdate=start, todate=end)}
+    except Exception as e:
+        logger.warning("영업일 달력 조회 실패: %s", e)
+        return set()
+    if not open_days: return set()
+    last = max(open_days) # 달력이 아직 갱신되지 않은 뒤쪽 날짜는 확정하지 않음
+    return {to_yyyymmdd(d) for d in days if to_yyyymmdd(d) <= last and to_yyyymmdd(d) not in open_days}
+
+def scan_universe(candle_store, markets=MARKETS, names=None, settings=None, lookback_days=LOOKBACK_DAYS,
+                  symbols=None):
+    # 종목 목록/이름은 종목 마스터 캐시 사용 (종목별 이름 조회 없음)
+    if symbols is None: symbols = SymbolMaster() # 비어 있는 마스터도 len 0 -> or 로 고르면 안 됨
+    symbols.refresh()
+
+    end = to_yyyymmdd(datetime.datetime.now())
+    start = to_yyyymmdd(datetime.datetime.now() - datetime.timedelta(days=lookback_days))
+    codes = []
+    for market in markets:
+        sync_market(candle_store, market, lookback_days)
+        codes += symbols.codes(market)
+
+    frames = candle_store.load_many(codes, start, end)
+    codes, close, volume, _ = build_matrix(frames, codes)
+    if not codes: return pd.DataFrame(columns=TABLE_COLUMNS)
+
+    current, last_idx = _last_valid(close)
+    yesterday = _prev_valid(close, last_idx)
+    names = dict(symbols.names(codes), **(names or {}))
+    return score_table(codes, close, volume, current, yesterday, names, settings)
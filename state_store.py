@@ -0,0 +1,386 @@
+import json
+import sqlite3
+import threading
+import time
+
+from data_store import DATA_FILE, DEFAULT_SETTINGS, load_data
+
+# ==========================================
+# [설정/상태 저장소] SQLite (WAL) - stock_data.json 통째 저장을 대체
+#   - 관심종목/종목명/종목별 설정/주문/체결 기록/알림 규칙을 행 단위로 갱신 (트랜잭션 단위 원자적 반영)
+#   - 변경될 때마다 change_log 에 기록 -> version() 만 비교하면 다른 프로세스 변경 감지
+#   - 같은 프로세스 안에서는 subscribe() 로 변경 알림을 바로 받음
+#   - 처음 만들 때 stock_data.json 을 한 번 옮겨 옴 (파일이 없으면 기본 관심종목)
+# ==========================================
+STATE_DB = "stock_bot.db"
+SETTING_FIELDS = ("buy_pct", "sell_pct", "manual_buy", "manual_sell", "qty", "auto_on")
+CHANGE_LOG_KEEP = 1000
+CHANGE_LOG_TRIM_EVERY = 100 # 마지막 정리 이후 이만큼 seq 가 늘면 오래된 행 삭제
+SETTING_TABLES = ("watchlist", "stock_names", "stock_settings", "import") # load_all() 에 영향 주는 변경
+ORDER_FIELDS = ("client_id", "trade_date", "code", "side", "qty", "price", "status", "odno",
+                "filled_qty", "avg_price", "msg", "created_at", "updated_at")
+ALERT_FIELDS = ("code", "kind", "op", "value", "fast", "slow", "action", "qty", "debounce_sec",
+                "cooldown_sec", "enabled", "name")
+ALERT_TABLES = ("alert_rules", "watchlist") # 알림 평가 계획에 영향 주는 변경 (관심종목 전체 규칙 포함)
+
+class StateStore:
+    def __init__(self, path=STATE_DB, legacy_json=DATA_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.listeners = []
+        self.trimmed_seq = 0 # 이 프로세스가 마지막으로 change_log 를 정리한 seq
+        self.conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS watchlist (
+                code TEXT PRIMARY KEY, position INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS stock_names (
+                code TEXT PRIMARY KEY, name TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS stock_settings (
+                code TEXT PRIMARY KEY,
+                buy_pct REAL NOT NULL, sell_pct REAL NOT NULL,
+                manual_buy INTEGER NOT NULL, manual_sell INTEGER NOT NULL,
+                qty INTEGER NOT NULL, auto_on INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS trade_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT NOT NULL, trade_date TEXT NOT NULL, code TEXT NOT NULL, side TEXT NOT NULL,
+                price INTEGER, qty INTEGER, rt_cd TEXT, msg TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_trade_date ON trade_history (trade_date, code);
+            CREATE TABLE IF NOT EXISTS orders (
+                client_id TEXT PRIMARY KEY,
+                trade_date TEXT NOT NULL, code TEXT NOT NULL, side TEXT NOT NULL,
+                qty INTEGER NOT NULL, price INTEGER NOT NULL, status TEXT NOT NULL, odno TEXT,
+                filled_qty INTEGER NOT NULL DEFAULT 0, avg_price REAL NOT NULL DEFAULT 0, msg TEXT,
+                created_at REAL NOT NULL, updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_orders_date ON orders (trade_date, code, side);
+            CREATE TABLE IF NOT EXISTS alert_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                code TEXT, kind TEXT NOT NULL, op TEXT NOT NULL, value REAL NOT NULL,
+                fast INTEGER, slow INTEGER, action TEXT NOT NULL, qty INTEGER NOT NULL DEFAULT 0,
+                debounce_sec REAL NOT NULL DEFAULT 0, cooldown_sec REAL NOT NULL DEFAULT 0,
+                enabled INTEGER NOT NULL DEFAULT 1, name TEXT
+            );
+            CREATE TABLE IF NOT EXISTS alert_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL, trade_date TEXT NOT NULL, rule_id INTEGER NOT NULL, code TEXT NOT NULL,
+                price INTEGER, msg TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_alert_log_date ON alert_log (trade_date, code);
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                tbl TEXT NOT NULL, code TEXT, ts REAL NOT NULL
+            );
+        """)
+        if legacy_json is not None and self._is_empty():
+            self.import_json(legacy_json)
+
+    def close(self):
+        self.conn.close()
+
+    def backup(self, path):
+        # 현재 내용을 다른 파일로 복사 (엔진 --profile 이 복사본에서 틱을 돌릴 때)
+        dest = sqlite3.connect(path)
+        try:
+            with self.lock:
+                self.conn.backup(dest)
+        finally:
+            dest.close()
+
+    def _is_empty(self):
+        return self.conn.execute("SELECT COUNT(*) FROM watchlist").fetchone()[0] == 0 and \
+               self.conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0] == 0
+
+    # -----------------------------------------------------------
+    # [트랜잭션] 쓰기는 전부 이 안에서 -> 커밋 후 변경 알림
+    # -----------------------------------------------------------
+    def _write(self, fn, changes):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self.conn)
+                now = time.time()
+                self.conn.executemany("INSERT INTO change_log (tbl, code, ts) VALUES (?, ?, ?)",
+                                      [(tbl, code, now) for tbl, code in changes])
+                seq = self.conn.execute("SELECT MAX(seq) FROM change_log").fetchone()[0] or 0
+                # 한 번에 여러 행을 쓰면 seq 가 특정 값을 건너뛸 수 있으므로 나머지 비교가 아니라 증가량으로
+                if seq - self.trimmed_seq >= CHANGE_LOG_TRIM_EVERY:
+                    self.conn.execute("DELETE FROM change_log WHERE seq <= ?", (seq - CHANGE_LOG_KEEP,))
+                    self.trimmed_seq = seq
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        for fn_listener in list(self.listeners):
+            for tbl, code in changes:
+                try:
+                    fn_listener(tbl, code)
+                except Exception:
+                    pass
+        return result
+
+    def subscribe(self, fn):
+        # fn(table, code) - 같은 프로세스에서 쓴 변경만 (다른 프로세스는 version() 비교)
+        self.listeners.append(fn)
+
+    def version(self, tables=None):
+        # tables 를 주면 해당 테이블 변경만 (예: 주문 갱신으로 설정을 다시 읽지 않도록)
+        sql, args = "SELECT MAX(seq) FROM change_log", ()
+        if tables:
+            sql += f" WHERE tbl IN ({', '.join('?' * len(tables))})"; args = tuple(tables)
+        with self.lock:
+            return self.conn.execute(sql, args).fetchone()[0] or 0
+
+    def changes_since(self, seq):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT seq, tbl, code FROM change_log WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+
+    # -----------------------------------------------------------
+    # [관심종목]
+    # -----------------------------------------------------------
+    def get_watchlist(self):
+        with self.lock:
+            return [r[0] for r in self.conn.execute("SELECT code FROM watchlist ORDER BY position")]
+
+    def add_stock(self, code, settings=None):
+        def fn(conn):
+            if conn.execute("SELECT 1 FROM watchlist WHERE code = ?", (code,)).fetchone():
+                return False
+            pos = conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM watchlist").fetchone()[0]
+            conn.execute("INSERT INTO watchlist (code, position) VALUES (?, ?)", (code, pos))
+            self._put_settings(conn, code, dict(DEFAULT_SETTINGS, **(settings or {})), replace=False)
+            return True
+        return self._write(fn, [("watchlist", code), ("stock_settings", code)])
+
+    def remove_stock(self, code):
+        def fn(conn):
+            conn.execute("DELETE FROM watchlist WHERE code = ?", (code,))
+            conn.execute("DELETE FROM stock_settings WHERE code = ?", (code,)) # 설정도 삭제
+        self._write(fn, [("watchlist", code), ("stock_settings", code)])
+
+    def move_stock(self, code, direction):
+        # 바로 위/아래 종목과 position 만 맞바꿈 (두 행만 갱신)
+        def fn(conn):
+            row = conn.execute("SELECT position FROM watchlist WHERE code = ?", (code,)).fetchone()
+            if row is None: return False
+            if direction == 'up':
+                other = conn.execute("SELECT code, position FROM watchlist WHERE position < ? "
+                                     "ORDER BY position DESC LIMIT 1", (row[0],)).fetchone()
+            else:
+                other = conn.execute("SELECT code, position FROM watchlist WHERE position > ? "
+                                     "ORDER BY position LIMIT 1", (row[0],)).fetchone()
+            if other is None: return False
+            conn.execute("UPDATE watchlist SET position = ? WHERE code = ?", (other[1], code))
+            conn.execute("UPDATE watchlist SET position = ? WHERE code = ?", (row[0], other[0]))
+            return True
+        return self._write(fn, [("watchlist", code)])
+
+    # -----------------------------------------------------------
+    # [종목명]
+    # -----------------------------------------------------------
+    def get_names(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT code, name FROM stock_names"))
+
+    def set_names(self, names):
+        names = dict(names)
+        if not names: return
+        self._write(lambda conn: conn.executemany("INSERT OR REPLACE INTO stock_names (code, name) VALUES (?, ?)",
+                                                  list(names.items())),
+                    [("stock_names", code) for code in names])
+
+    def set_name(self, code, name):
+        self.set_names({code: name})
+
+    # -----------------------------------------------------------
+    # [종목별 설정]
+    # -----------------------------------------------------------
+    def _put_settings(self, conn, code, setting, replace=True):
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        conn.execute(f"{verb} INTO stock_settings (code, {', '.join(SETTING_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (code, float(setting['buy_pct']), float(setting['sell_pct']), int(setting['manual_buy']),
+                      int(setting['manual_sell']), int(setting['qty']), int(bool(setting['auto_on']))))
+
+    @staticmethod
+    def _row_to_setting(row):
+        buy_pct, sell_pct, manual_buy, manual_sell, qty, auto_on = row
+        return {"buy_pct": buy_pct, "sell_pct": sell_pct, "manual_buy": manual_buy,
+                "manual_sell": manual_sell, "qty": qty, "auto_on": bool(auto_on)}
+
+    def get_settings(self, code):
+        with self.lock:
+            row = self.conn.execute(f"SELECT {', '.join(SETTING_FIELDS)} FROM stock_settings WHERE code = ?",
+                                    (code,)).fetchone()
+        return self._row_to_setting(row) if row else DEFAULT_SETTINGS.copy()
+
+    def get_all_settings(self):
+        with self.lock:
+            rows = self.conn.execute(f"SELECT code, {', '.join(SETTING_FIELDS)} FROM stock_settings").fetchall()
+        return {r[0]: self._row_to_setting(r[1:]) for r in rows}
+
+    def update_settings(self, code, **fields):
+        unknown = set(fields) - set(SETTING_FIELDS)
+        if unknown: raise ValueError(f"알 수 없는 설정: {unknown}")
+        def fn(conn):
+            self._put_settings(conn, code, DEFAULT_SETTINGS, replace=False) # 없으면 기본값으로 생성
+            assignments = ", ".join(f"{k} = ?" for k in fields)
+            values = [int(bool(v)) if k == "auto_on" else v for k, v in fields.items()]
+            conn.execute(f"UPDATE stock_settings SET {assignments} WHERE code = ?", (*values, code))
+        self._write(fn, [("stock_settings", code)])
+
+    # -----------------------------------------------------------
+    # [전체 로드] 예전 load_data() 와 같은 형태
+    # -----------------------------------------------------------
+    def load_all(self):
+        with self.lock:
+            return {
+                "watchlist": self.get_watchlist(),
+                "stock_names": self.get_names(),
+                "stock_settings": self.get_all_settings(),
+            }
+
+    # -----------------------------------------------------------
+    # [매매 기록] 체결 내역
+    # -----------------------------------------------------------
+    @staticmethod
+    def _insert_trades(conn, trades):
+        now = time.localtime()
+        ts, trade_date = time.strftime("%Y-%m-%d %H:%M:%S", now), time.strftime("%Y-%m-%d", now)
+        conn.executemany("INSERT INTO trade_history (ts, trade_date, code, side, price, qty, rt_cd, msg) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [(ts, trade_date, *t) for t in trades])
+
+    def record_trade(self, code, side, price, qty, rt_cd, msg=""):
+        self._write(lambda conn: self._insert_trades(conn, [(code, side, price, qty, rt_cd, msg)]),
+                    [("trade_history", code)])
+
+    def get_trades(self, trade_date=None, code=None, limit=200):
+        sql = "SELECT ts, code, side, price, qty, rt_cd, msg FROM trade_history WHERE 1 = 1"
+        args = []
+        if trade_date: sql += " AND trade_date = ?"; args.append(trade_date)
+        if code: sql += " AND code = ?"; args.append(code)
+        sql += " ORDER BY id DESC LIMIT ?"; args.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        keys = ("ts", "code", "side", "price", "qty", "rt_cd", "msg")
+        return [dict(zip(keys, r)) for r in rows]
+
+    # -----------------------------------------------------------
+    # [주문] 같은 날 같은 종목/방향에 거부되지 않은 주문이 있으면 새로 만들지 않음
+    #   (화면 재실행/엔진 재시작에도 중복 주문 방지 - 확인과 생성이 한 트랜잭션)
+    # -----------------------------------------------------------
+    def create_order(self, trade_date, code, side, qty, price):
+        def fn(conn):
+            rows = conn.execute("SELECT status FROM orders WHERE trade_date = ? AND code = ? AND side = ?",
+                                (trade_date, code, side)).fetchall()
+            if any(r[0] != "rejected" for r in rows):
+                return None
+            now = time.time()
+            order = dict(client_id=f"{trade_date}-{code}-{side}-{len(rows) + 1}", trade_date=trade_date,
+                         code=code, side=side, qty=int(qty), price=int(price), status="new", odno=None,
+                         filled_qty=0, avg_price=0.0, msg="", created_at=now, updated_at=now)
+            conn.execute(f"INSERT INTO orders ({', '.join(ORDER_FIELDS)}) "
+                         f"VALUES ({', '.join('?' * len(ORDER_FIELDS))})", [order[k] for k in ORDER_FIELDS])
+            return order
+        return self._write(fn, [("orders", code)])
+
+    def update_orders(self, updates, trades=()):
+        # updates: [(client_id, {필드: 값})], trades: [(code, side, price, qty, rt_cd, msg)] - 한 번에 커밋
+        if not updates and not trades: return
+        now = time.time()
+        def fn(conn):
+            for client_id, fields in updates:
+                fields = dict(fields, updated_at=now)
+                conn.execute(f"UPDATE orders SET {', '.join(f'{k} = ?' for k in fields)} WHERE client_id = ?",
+                             (*fields.values(), client_id))
+            if trades: self._insert_trades(conn, trades)
+        self._write(fn, [("orders", client_id) for client_id, _ in updates] +
+                        [("trade_history", t[0]) for t in trades])
+
+    def get_orders(self, trade_date=None, code=None, statuses=None, limit=500):
+        sql = f"SELECT {', '.join(ORDER_FIELDS)} FROM orders WHERE 1 = 1"
+        args = []
+        if trade_date: sql += " AND trade_date = ?"; args.append(trade_date)
+        if code: sql += " AND code = ?"; args.append(code)
+        if statuses:
+            sql += f" AND status IN ({', '.join('?' * len(statuses))})"; args.extend(statuses)
+        sql += " ORDER BY created_at DESC LIMIT ?"; args.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        return [dict(zip(ORDER_FIELDS, r)) for r in rows]
+
+    # -----------------------------------------------------------
+    # [알림 규칙] code 가 NULL 이면 관심종목 전체 (내용 검사는 alerts.normalize_rule)
+    # -----------------------------------------------------------
+    def add_alert_rule(self, rule):
+        fields = [k for k in ALERT_FIELDS if k in rule]
+        def fn(conn):
+            cur = conn.execute(f"INSERT INTO alert_rules ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})",
+                               [rule[k] for k in fields])
+            return cur.lastrowid
+        return self._write(fn, [("alert_rules", rule.get("code"))])
+
+    def update_alert_rule(self, rule_id, **fields):
+        unknown = set(fields) - set(ALERT_FIELDS)
+        if unknown: raise ValueError(f"알 수 없는 알림 필드: {unknown}")
+        self._write(lambda conn: conn.execute(
+            f"UPDATE alert_rules SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?", (*fields.values(), rule_id)),
+            [("alert_rules", None)])
+
+    def remove_alert_rule(self, rule_id):
+        self._write(lambda conn: conn.execute("DELETE FROM alert_rules WHERE id = ?", (rule_id,)),
+                    [("alert_rules", None)])
+
+    def get_alert_rules(self, code=None, enabled_only=False):
+        # code 를 주면 그 종목 규칙 + 관심종목 전체 규칙
+        sql = f"SELECT id, {', '.join(ALERT_FIELDS)} FROM alert_rules WHERE 1 = 1"
+        args = []
+        if code: sql += " AND (code = ? OR code IS NULL)"; args.append(code)
+        if enabled_only: sql += " AND enabled = 1"
+        with self.lock:
+            rows = self.conn.execute(sql + " ORDER BY id", args).fetchall()
+        rules = [dict(zip(("id",) + ALERT_FIELDS, r)) for r in rows]
+        for rule in rules: rule["enabled"] = bool(rule["enabled"])
+        return rules
+
+    def record_alerts(self, events):
+        # events: [(ts, trade_date, rule_id, code, price, msg)]
+        if not events: return
+        self._write(lambda conn: conn.executemany(
+            "INSERT INTO alert_log (ts, trade_date, rule_id, code, price, msg) VALUES (?, ?, ?, ?, ?, ?)", events),
+            [("alert_log", e[3]) for e in events])
+
+    def get_alert_log(self, trade_date=None, code=None, limit=200):
+        sql = "SELECT ts, rule_id, code, price, msg FROM alert_log WHERE 1 = 1"
+        args = []
+        if trade_date: sql += " AND trade_date = ?"; args.append(trade_date)
+        if code: sql += " AND code = ?"; args.append(code)
+        sql += " ORDER BY id DESC LIMIT ?"; args.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        return [dict(zip(("ts", "rule_id", "code", "price", "msg"), r)) for r in rows]
+
+    # -----------------------------------------------------------
+    # [이전] stock_data.json -> DB
+    # -----------------------------------------------------------
+    def import_json(self, path=DATA_FILE):
+        data = load_data(path)
+        watchlist = data.get("watchlist", [])
+        settings = data.get("stock_settings", {})
+        def fn(conn):
+            for pos, code in enumerate(watchlist):
+                conn.execute("INSERT OR REPLACE INTO watchlist (code, position) VALUES (?, ?)", (code, pos))
+            for code, name in data.get("stock_names", {}).items():
+                conn.execute("INSERT OR REPLACE INTO stock_names (code, name) VALUES (?, ?)", (code, name))
+            for code in set(watchlist) | set(settings):
+                self._put_settings(conn, code, dict(DEFAULT_SETTINGS, **settings.get(code, {})))
+        self._write(fn, [("import", None)])
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.load_all(), f, ensure_ascii=False, indent=4)
@@ -0,0 +1,36 @@
+import indicators
+import metrics
+
+# ==========================================
+# [매매 전략] 화면(main.py)과 엔진(engine.py)이 같이 쓰는 판단 로직
+# ==========================================
+
+@metrics.timed("call_seconds", fn="analyze_market_signal")
+def analyze_market_signal(df, current_price):
+    # 지표 계산은 indicators.py (입력 df 는 건드리지 않음)
+    if len(df) < 20: return "데이터 부족", "gray", 0, 0
+    result = indicators.signal_scores(df['Close'].to_numpy(), df['Volume'].to_numpy(), current_price)
+    signal, color = indicators.signal_label(result['score'])
+    return signal, color, result['rsi'], result['vol_ratio']
+
+# -----------------------------------------------------------
+# [목표가 계산] % 자동 계산 / 직접 입력가 중 최종 목표가 결정
+# -----------------------------------------------------------
+def calc_target_prices(setting, yesterday_price):
+    calc_buy_price = int(yesterday_price * (1 + setting['buy_pct'] / 100))
+    calc_sell_price = int(yesterday_price * (1 + setting['sell_pct'] / 100))
+
+    final_buy_price = setting['manual_buy'] if setting['manual_buy'] > 0 else calc_buy_price
+    final_sell_price = setting['manual_sell'] if setting['manual_sell'] > 0 else calc_sell_price
+    return final_buy_price, final_sell_price
+
+# -----------------------------------------------------------
+# [주문 판단] 하루 1회씩 매수/매도 ('buy' / 'sell' 목록 반환)
+# -----------------------------------------------------------
+def decide_orders(current_price, final_buy_price, final_sell_price, history):
+    orders = []
+    if current_price <= final_buy_price and not history['buy_ordered']:
+        orders.append('buy')
+    if current_price >= final_sell_price and not history['sell_ordered']:
+        orders.append('sell')
+    return orders
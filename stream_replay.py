@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import websockets
+
+from kis_stream import KisStream, TR_EXEC, tick_to_price_output
+from strategy import calc_target_prices, decide_orders
+from data_store import DEFAULT_SETTINGS
+
+# ==========================================
+# [실시간 시세 재생 서버] 실서버 없이 웹소켓 구독/틱 수신 테스트용
+#   서버:  python stream_replay.py serve --file ticks.txt --port 8765
+#   측정:  python stream_replay.py bench --codes 005930,000660 --count 5000
+#   - 기록 파일 형식은 KisStream(record_path=...) 이 남기는 "수신시각<TAB>원문"
+#   - 기록 파일이 없으면 랜덤워크 틱을 만들어서 보냄
+# ==========================================
+
+def load_recording(path):
+    frames = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            ts, _, raw = line.rstrip("\n").partition("\t")
+            if raw and raw[0] == "0":
+                frames.append((float(ts), raw))
+    return frames
+
+def synthetic_frame(code, price, prev_close, volume):
+    change = price - prev_close
+    rate = round(change / prev_close * 100, 2)
+    now = time.strftime("%H%M%S")
+    fields = [code, now, str(price), "2" if change >= 0 else "5", str(change), str(rate), str(price),
+              str(prev_close), str(price), str(price), str(price + 100), str(price - 100), "10", str(volume)]
+    fields += ["0"] * (46 - len(fields)) # H0STCNT0 레코드는 46개 필드
+    return f"0|{TR_EXEC}|001|{'^'.join(fields)}"
+
+def synthetic_frames(codes, count, seed=0):
+    rnd = random.Random(seed)
+    prices = {code: 10000 * (i + 1) for i, code in enumerate(codes)}
+    prev = dict(prices)
+    volume = 0
+    for i in range(count):
+        code = codes[i % len(codes)]
+        prices[code] = max(100, prices[code] + rnd.choice((-100, -50, 0, 50, 100)))
+        volume += 10
+        yield synthetic_frame(code, prices[code], prev[code], volume)
+
+# -----------------------------------------------------------
+# [재생 서버] 구독 요청에 응답하고, 구독한 종목의 틱만 재생
+# -----------------------------------------------------------
+async def serve(frames, host="127.0.0.1", port=8765, speed=1.0, ready=None):
+    async def handler(ws):
+        subscribed = set()
+
+        async def receive():
+            async for msg in ws:
+                req = json.loads(msg)
+                code = req["body"]["input"]["tr_key"]
+                if req["header"]["tr_type"] == "1": subscribed.add(code)
+                else: subscribed.discard(code)
+                await ws.send(json.dumps({
+                    "header": {"tr_id": TR_EXEC, "tr_key": code, "encrypt": "N"},
+                    "body": {"rt_cd": "0", "msg_cd": "OPSP0000", "msg1": "SUBSCRIBE SUCCESS"}
+                }))
+
+        receiver = asyncio.ensure_future(receive())
+        try:
+            await asyncio.sleep(0.05) # 구독 요청 수신 대기
+            prev_ts = None
+            for ts, raw in frames:
+                if speed > 0 and prev_ts is not None and ts > prev_ts:
+                    await asyncio.sleep((ts - prev_ts) / speed)
+                prev_ts = ts
+                code = raw.split("|", 3)[3].split("^", 1)[0]
+                if code in subscribed:
+                    await ws.send(raw)
+            await ws.close()
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            receiver.cancel()
+
+    async with websockets.serve(handler, host, port):
+        if ready is not None: ready.set()
+        await asyncio.Future()
+
+# -----------------------------------------------------------
+# [지연 측정] 프레임 수신 -> 주문 판단까지 걸린 시간
+# -----------------------------------------------------------
+def bench(codes, count, port):
+    frames = [(0.0, raw) for raw in synthetic_frames(codes, count)]
+    latencies = []
+    history = {}
+    done = asyncio.Event()
+
+    def on_tick(tick):
+        curr = tick_to_price_output(tick)
+        buy, sell = calc_target_prices(DEFAULT_SETTINGS, int(curr['stck_sdpr']))
+        decide_orders(tick.price, buy, sell, history.setdefault(tick.code, {'buy_ordered': False, 'sell_ordered': False}))
+        latencies.append(time.perf_counter() - tick.recv_ts)
+        if len(latencies) >= count: done.set()
+
+    async def run():
+        ready = asyncio.Event()
+        server = asyncio.ensure_future(serve(frames, port=port, speed=0, ready=ready))
+        await ready.wait()
+        # 재생이 끝나면 재접속하지 않음
+        stream = KisStream("replay", f"ws://127.0.0.1:{port}", codes, reconnect=False)
+        stream.add_listener(on_tick)
+        started = time.perf_counter()
+        client = asyncio.ensure_future(stream.run())
+        try:
+            await asyncio.wait_for(done.wait(), timeout=60)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - started
+        client.cancel(); server.cancel()
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    if not latencies:
+        print("수신한 틱이 없습니다.")
+        return
+    us = sorted(x * 1e6 for x in latencies)
+    print(f"틱 {len(us)}건 / {elapsed:.2f}초 ({len(us) / elapsed:,.0f} ticks/s)")
+    print(f"수신->판단 지연(us) p50={statistics.median(us):.1f} p99={us[int(len(us) * 0.99) - 1]:.1f} max={us[-1]:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="KIS 실시간 시세 재생 서버")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_serve = sub.add_parser("serve")
+    p_serve.add_argument("--file", help="KisStream 기록 파일 (없으면 랜덤 틱)")
+    p_serve.add_argument("--codes", default="005930")
+    p_serve.add_argument("--count", type=int, default=10000)
+    p_serve.add_argument("--port", type=int, default=8765)
+    p_serve.add_argument("--speed", type=float, default=1.0, help="재생 배속 (0 = 대기 없이)")
+    p_bench = sub.add_parser("bench")
+    p_bench.add_argument("--codes", default="005930,000660,035720")
+    p_bench.add_argument("--count", type=int, default=5000)
+    p_bench.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        if args.file:
+            frames = load_recording(args.file)
+        else:
+            frames = [(i * 0.01, raw) for i, raw in enumerate(synthetic_frames(args.codes.split(","), args.count))]
+        try:
+            asyncio.run(serve(frames, port=args.port, speed=args.speed))
+        except KeyboardInterrupt:
+            pass
+    else:
+        bench(args.codes.split(","), args.count, args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import bisect
+import datetime
+import logging
+import sqlite3
+import threading
+import time
+
+# ==========================================
+# [종목 마스터] 코스피/코스닥 전 종목 (이름/시장/업종/상장 여부) 로컬 캐시
+#   - 하루 한 번 pykrx 에서 시장별로 한꺼번에 받음 (종목당 호출 없음)
+#   - 조회는 메모리 딕셔너리 (O(1)), 검색은 정렬된 이름/코드 목록에서 이분 탐색
+#   - 오늘 받은 적이 있으면 시작할 때 네트워크 호출 없음
+# ==========================================
+SYMBOL_DB = "symbols.db"
+MARKETS = ("KOSPI", "KOSDAQ")
+LOOKBACK_DAYS = 7 # 휴장일이면 최근 영업일까지 거슬러 올라감
+RETRY_SEC = 600 # 백그라운드 갱신 실패 후 다시 시도하기까지
+
+logger = logging.getLogger("symbols")
+
+class SymbolMaster:
+    def __init__(self, path=SYMBOL_DB, markets=MARKETS):
+        self.path = path
+        self.markets = markets
+        self.lock = threading.Lock()
+        self.refreshing = None
+        self.last_attempt = None
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS symbols (
+                code TEXT PRIMARY KEY, name TEXT NOT NULL, market TEXT NOT NULL,
+                sector TEXT, listed INTEGER NOT NULL, updated TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.conn.commit()
+        self._load()
+
+    def close(self):
+        self.conn.close()
+
+    # -----------------------------------------------------------
+    # [메모리 색인] 코드 -> 행, 정렬된 (이름, 코드) / 코드 목록
+    # -----------------------------------------------------------
+    def _load(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT code, name, market, sector, listed FROM symbols").fetchall()
+            synced = self.conn.execute("SELECT value FROM meta WHERE key = 'synced_date'").fetchone()
+        by_code = {
+            code: {"code": code, "name": name, "market": market, "sector": sector, "listed": bool(listed)}
+            for code, name, market, sector, listed in rows
+        }
+        listed = [r for r in by_code.values() if r["listed"]]
+        self.by_code = by_code
+        self.name_index = sorted((r["name"].lower(), r["code"]) for r in listed)
+        self.code_index = sorted(r["code"] for r in listed)
+        self.synced_date = synced[0] if synced else None
+
+    def __len__(self):
+        return len(self.by_code)
+
+    def get(self, code):
+        return self.by_code.get(code)
+
+    def name(self, code, default=None):
+        row = self.by_code.get(code)
+        return row["name"] if row else (code if default is None else default)
+
+    def names(self, codes=None):
+        if codes is None: return {c: r["name"] for c, r in self.by_code.items()}
+        return {c: self.name(c) for c in codes}
+
+    def codes(self, market=None):
+        return [r["code"] for r in self.by_code.values() if r["listed"] and (market is None or r["market"] == market)]
+
+    # -----------------------------------------------------------
+    # [검색] 숫자면 코드 앞부분, 아니면 이름 앞부분 -> 부족하면 이름 포함 검색으로 채움
+    # -----------------------------------------------------------
+    def search(self, query, limit=10):
+        query = (query or "").strip().lower()
+        if not query: return []
+        if query.isdigit():
+            i = bisect.bisect_left(self.code_index, query)
+            codes = []
+            while i < len(self.code_index) and self.code_index[i].startswith(query) and len(codes) < limit:
+                codes.append(self.code_index[i]); i += 1
+        else:
+            i = bisect.bisect_left(self.name_index, (query, ""))
+            codes = []
+            while i < len(self.name_index) and self.name_index[i][0].startswith(query) and len(codes) < limit:
+                codes.append(self.name_index[i][1]); i += 1
+            if len(codes) < limit:
+                seen = set(codes)
+                for name, code in self.name_index:
+                    if query in name and code not in seen:
+                        codes.append(code)
+                        if len(codes) >= limit: break
+        return [self.by_code[c] for c in codes]
+
+    # -----------------------------------------------------------
+    # [동기화] 하루 한 번 시장별 일괄 조회
+    # -----------------------------------------------------------
+    def is_fresh(self, today=None):
+        today = today or datetime.date.today().isoformat()
+        return self.synced_date == today and len(self.by_code) > 0
+
+    def refresh(self, force=False, now=None):
+        now = now or datetime.datetime.now()
+        today = now.date().isoformat()
+        if not force and self.is_fresh(today): return 0
+
+        rows = []
+        for market in self.markets:
+            rows += [(code, name, market, sector) for code, name, sector in self._fetch_market(market, now)]
+        if not rows:
+            raise RuntimeError("종목 목록을 받지 못했습니다.")
+
+        with self.lock, self.conn:
+            # 목록에서 빠진 종목은 상장폐지로 표시 (이름은 남겨 둠)
+            self.conn.execute(f"UPDATE symbols SET listed = 0 WHERE market IN ({', '.join('?' * len(self.markets))})",
+                              self.markets)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO symbols (code, name, market, sector, listed, updated) VALUES (?, ?, ?, ?, 1, ?)",
+                [(code, name, market, sector, today) for code, name, market, sector in rows])
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('synced_date', ?)", (today,))
+        self._load()
+        return len(rows)
+
+    def refresh_async(self):
+        # 화면을 막지 않도록 백그라운드에서 갱신 (이미 돌고 있으면 그대로)
+        if self.is_fresh() or (self.refreshing and self.refreshing.is_alive()): return
+        if self.last_attempt and time.monotonic() - self.last_attempt < RETRY_SEC: return
+        self.last_attempt = time.monotonic()
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("종목 마스터 갱신 실패: %s", e)
+        self.refreshing = threading.Thread(target=run, name="symbol-master", daemon=True)
+        self.refreshing.start()
+
+    def _fetch_market(self, market, now):
+        from pykrx import stock
+
+        for back in range(LOOKBACK_DAYS):
+            date = (now - datetime.timedelta(days=back)).strftime("%Y%m%d")
+            try:
+                # 업종 분류 한 번으로 전 종목 이름/업종 (휴장일은 빈 표)
+                df = stock.get_market_sector_classifications(date, market)
+            except Exception as e:
+                logger.info("업종 분류 조회 실패 %s %s: %s", market, date, e)
+                df = None
+            if df is not None and not df.empty:
+                return [(code, name, sector) for code, name, sector in zip(df.index, df['종목명'], df['업종명'])]
+
+        # 업종 분류를 못 받으면 종목 목록 + 이름만
+        codes = stock.get_market_ticker_list(now.strftime("%Y%m%d"), market=market)
+        return [(code, stock.get_market_ticker_name(code), None) for code in codes]
@@ -0,0 +1,183 @@
+import contextlib
+import datetime
+import logging
+import threading
+import time
+
+import metrics
+from data_store import read_json, write_json_atomic
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+# ==========================================
+# [접근토큰 관리] 프로세스/세션이 토큰 하나를 같이 씀
+#   - 발급 응답의 expires_in 으로 만료 시각 기록 (token_cache.json)
+#   - 파일 잠금으로 한 프로세스만 발급, 나머지는 파일에서 읽어 옴
+#     (KIS 는 1분에 1회만 발급 가능 + 발급할 때마다 알림이 옴)
+#   - 만료 REFRESH_MARGIN_SEC 전에 백그라운드 스레드가 미리 재발급 (start() 를 부른 곳만: 엔진)
+#     그 밖의 화면/스크립트는 get() 할 때 만료됐으면 그때 발급
+#   - 같은 앱키의 클라이언트(KisApi/AsyncKisApi)는 get_token_manager 로 하나를 공유
+# ==========================================
+TOKEN_FILE = "token_cache.json"
+REFRESH_MARGIN_SEC = 3600 # 만료 1시간 전에 재발급
+EXPIRY_SAFETY_SEC = 60 # 이 시간 안에 만료되면 쓰지 않음
+MIN_ISSUE_INTERVAL_SEC = 60 # 발급 제한 (1분당 1회)
+RETRY_SEC = 60
+LEGACY_TTL_SEC = 21600 # 예전 캐시 파일(timestamp 만 있음)은 6시간으로 봄
+
+logger = logging.getLogger("token")
+
+@contextlib.contextmanager
+def file_lock(path):
+    # 프로세스 간 배타 잠금 (잠금 전용 파일 사용)
+    with open(path, "a+") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class TokenManager:
+    def __init__(self, issue, cache_key, path=TOKEN_FILE, margin=REFRESH_MARGIN_SEC):
+        self.issue = issue # () -> (토큰, expires_in 초)
+        self.cache_key = cache_key
+        self.path = path
+        self.margin = margin
+        self.lock = threading.Lock()
+        self.token = None
+        self.expires_at = 0.0
+        self.rejected = None # 서버가 만료/무효라고 한 토큰 (캐시 파일에 남아 있어도 쓰지 않음)
+        self.issued = 0 # 이 프로세스에서 실제로 발급한 횟수
+        self.last_error = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def valid(self, now=None):
+        return self.token is not None and (now or time.time()) < self.expires_at - EXPIRY_SAFETY_SEC
+
+    # -----------------------------------------------------------
+    # [토큰 조회] 메모리 -> 캐시 파일 -> 발급 순서
+    # -----------------------------------------------------------
+    def get(self):
+        if self.valid(): return self.token
+        return self.refresh()
+
+    def invalidate(self, token):
+        # 서버가 만료/무효 응답을 준 토큰이면 다음 get() 에서 새로 받음
+        with self.lock:
+            self.rejected = token
+            if self.token == token:
+                self.expires_at = 0.0
+
+    def refresh(self, force=False):
+        with self.lock:
+            if not force and self.valid(): return self.token
+            current = self.token
+            with file_lock(f"{self.path}.lock"):
+                cached = self._read_cache()
+                if cached:
+                    token, expires_at, issued_at = cached
+                    usable = time.time() < expires_at - EXPIRY_SAFETY_SEC and token != self.rejected
+                    newer = token != current and expires_at > self.expires_at # 다른 프로세스가 재발급함
+                    just_issued = time.time() - issued_at < MIN_ISSUE_INTERVAL_SEC
+                    if usable and (not force or newer or just_issued):
+                        self.token, self.expires_at = token, expires_at
+                        return self.token
+
+                with metrics.timer("call_seconds", fn="token_issue"):
+                    token, expires_in = self.issue()
+                now = time.time()
+                self.token, self.expires_at = token, now + expires_in
+                self.issued += 1
+                write_json_atomic(self.path, {
+                    "key": self.cache_key,
+                    "token": token,
+                    "issued_at": now,
+                    "expires_at": self.expires_at,
+                    "timestamp": datetime.datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S"),
+                })
+                logger.info("접근토큰 발급 (만료 %s)",
+                            datetime.datetime.fromtimestamp(self.expires_at).strftime("%m-%d %H:%M"))
+                return self.token
+
+    def _read_cache(self):
+        data = read_json(self.path)
+        if not data or not data.get("token"): return None
+        if "expires_at" in data:
+            if data.get("key") != self.cache_key: return None # 다른 앱키/서버 토큰
+            return data["token"], float(data["expires_at"]), float(data.get("issued_at", 0))
+        try:
+            issued_at = datetime.datetime.strptime(data["timestamp"], "%Y-%m-%d %H:%M:%S").timestamp()
+        except (KeyError, ValueError):
+            return None
+        return data["token"], issued_at + LEGACY_TTL_SEC, issued_at
+
+    # -----------------------------------------------------------
+    # [백그라운드 갱신] 만료 margin 초 전에 재발급 (실패하면 RETRY_SEC 후 재시도)
+    # -----------------------------------------------------------
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name="token-refresh", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+
+    def _run(self):
+        while not self.stopping.is_set():
+            wait = self.expires_at - self.margin - time.time() if self.token else 0
+            if wait > 0:
+                if self.stopping.wait(min(wait, 600)): return # 길게 자지 않고 주기적으로 다시 계산
+                continue
+            try:
+                self.refresh(force=self.token is not None)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning("접근토큰 갱신 실패: %s", e)
+                if self.stopping.wait(RETRY_SEC): return
+                continue
+            if self.expires_at - self.margin - time.time() <= 0:
+                # 남은 시간이 margin 보다 짧은 토큰 (모의투자 등) -> 제한 간격만큼 쉬고 다시
+                if self.stopping.wait(max(MIN_ISSUE_INTERVAL_SEC, (self.expires_at - time.time()) / 2)): return
+
+    def status(self):
+        return {
+            "expires_at": datetime.datetime.fromtimestamp(self.expires_at).strftime("%Y-%m-%d %H:%M:%S")
+                          if self.token else None,
+            "issued": self.issued,
+            "last_error": self.last_error,
+        }
+
+# 같은 앱키/서버/캐시 파일을 쓰는 클라이언트끼리 토큰 관리자 하나를 공유
+#   - 백그라운드 갱신은 여기서 시작하지 않음 (오래 도는 엔진이 tokens.start() 로 직접 시작)
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_token_manager(app_key, base_url, issue, path=TOKEN_FILE):
+    key = (app_key, base_url, path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = TokenManager(issue, cache_key=f"{base_url}|{app_key[:8]}", path=path)
+            _managers[key] = manager
+        return manager
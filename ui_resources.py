@@ -0,0 +1,30 @@
+import streamlit as st
+
+from candle_store import CandleStore
+from kis_api import KisApi
+from state_store import StateStore
+from symbol_master import SymbolMaster
+
+# ==========================================
+# [화면 공용 자원] 프로세스에 하나만 만들어 모든 세션/재실행/페이지가 같이 씀
+#   - Streamlit 은 상호작용마다 스크립트 전체를 다시 실행 -> 자원을 매번 만들면
+#     DB 연결/세션 풀/스키마 확인 비용을 재실행마다 냄
+#   - st.cache_resource: 첫 호출 때만 생성, 이후에는 같은 객체 반환
+#   - 아래 클래스는 모두 내부 잠금으로 여러 세션에서 동시에 써도 됨
+# ==========================================
+@st.cache_resource(show_spinner=False)
+def get_api():
+    return KisApi()
+
+@st.cache_resource(show_spinner=False)
+def get_store():
+    return StateStore()
+
+@st.cache_resource(show_spinner=False)
+def get_symbols():
+    return SymbolMaster()
+
+@st.cache_resource(show_spinner=False)
+def get_candle_store():
+    # 일봉은 로컬 저장소(candles.db)에서 읽고 빠진 구간만 API 로 받음
+    return CandleStore(get_api())